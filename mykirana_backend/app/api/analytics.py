@@ -1,21 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from sqlmodel import Session, select, func, and_
-from datetime import datetime, timedelta
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Any, Optional, Tuple
+from sqlmodel import Session
+from datetime import datetime
 from app.db.database import get_session
-from app.db.models import Bill, SaleItem, Item
 from app.api.items import get_current_user
-import json
+from app.services.bill_writes import bill_row, insert_bills
+from app.services.dashboard_cache import dashboard_cache
+from app.services.bill_history import bill_page, bill_detail, parse_fields, from_cursor
 
 router = APIRouter()
 
+# Bills per /bills/batch request (a day's offline backlog is well under this)
+MAX_BATCH_BILLS = 1000
+
 class BillCreate(BaseModel):
     total_amount: float
     items: List[Dict[str, Any]]
     customer_phone: Optional[str] = None
     customer_name: Optional[str] = None
     payment_method: str = "cash"
+    # Idempotency key generated by the app: re-sending the same bill returns the saved one
+    client_id: Optional[str] = Field(default=None, min_length=1, max_length=64)
+    # When the bill was made, for bills queued offline (default: now)
+    bill_date: Optional[datetime] = None
+
+class BatchBill(BillCreate):
+    client_id: str = Field(min_length=1, max_length=64)
+
+class BillBatchRequest(BaseModel):
+    # Validated one by one (BatchBill): a malformed bill is reported "invalid" so the app can
+    # drop it from its queue, instead of failing the whole batch on every retry
+    bills: List[Any]
+
+def _bill_row(bill_data: BillCreate) -> Dict[str, Any]:
+    return bill_row(
+        total_amount=bill_data.total_amount,
+        items=bill_data.items,
+        customer_phone=bill_data.customer_phone,
+        customer_name=bill_data.customer_name,
+        payment_method=bill_data.payment_method,
+        bill_date=bill_data.bill_date,
+        client_id=bill_data.client_id,
+    )
+
+def _bills_saved(user_id: int) -> None:
+    """After committing new bills: the cached dashboard is stale (cached voice answers key on the bill count)"""
+    dashboard_cache.invalidate(user_id)
 
 @router.post("/bills")
 def create_bill(
@@ -23,48 +54,18 @@ def create_bill(
     session: Session = Depends(get_session),
     user_id: int = Depends(get_current_user)
 ):
-    """Save a new bill"""
+    """Save a new bill (with its sale items and dashboard rollups, in one transaction)"""
     try:
-        # Create bill
-        bill = Bill(
-            owner_id=user_id,
-            total_amount=bill_data.total_amount,
-            total_items=len(bill_data.items),
-            items_json=json.dumps(bill_data.items),
-            customer_phone=bill_data.customer_phone,
-            customer_name=bill_data.customer_name,
-            payment_method=bill_data.payment_method,
-            bill_date=datetime.utcnow()
-        )
-        
-        session.add(bill)
-        session.flush()  # Get bill ID
-        
-        # Create sale items for analytics
-        current_hour = datetime.utcnow().hour
-        
-        for item in bill_data.items:
-            sale_item = SaleItem(
-                owner_id=user_id,
-                bill_id=bill.id,
-                item_name=item.get('name', ''),
-                item_category=item.get('category', 'Other'),
-                quantity=item.get('quantity', 0),
-                unit=item.get('unit', ''),
-                price_per_unit=item.get('price', 0),
-                total_price=item.get('total', 0),
-                sale_date=datetime.utcnow(),
-                hour_of_day=current_hour
-            )
-            session.add(sale_item)
-        
+        [(bill_id, status)] = insert_bills(session, user_id, [_bill_row(bill_data)])
         session.commit()
-        session.refresh(bill)
+        if status == "created":
+            _bills_saved(user_id)
         
         return {
             "success": True,
-            "bill_id": bill.id,
-            "message": "Bill saved successfully"
+            "bill_id": bill_id,
+            "duplicate": status == "duplicate",
+            "message": "Bill saved successfully" if status == "created" else "Bill was already saved"
         }
         
     except Exception as e:
@@ -72,36 +73,138 @@ def create_bill(
         print(f"Error saving bill: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/bills/batch")
+def create_bills_batch(
+    request: BillBatchRequest,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Save bills queued while offline, all in one transaction.
+    Safe to retry: bills whose client_id was already saved come back as "duplicate"
+    with their original bill_id. Bills that can never be saved come back as "invalid"
+    (with an "error"); the rest of the batch is still saved.
+    """
+    if len(request.bills) > MAX_BATCH_BILLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_BILLS} bills per request")
+    
+    # (client_id, row to insert, validation error) per bill, in request order
+    entries = []
+    for raw in request.bills:
+        client_id = raw.get("client_id") if isinstance(raw, dict) else None
+        client_id = client_id if isinstance(client_id, str) else None
+        try:
+            entries.append((client_id, _bill_row(BatchBill.model_validate(raw)), None))
+        except ValidationError as e:
+            entries.append((client_id, None, _validation_message(e)))
+    rows = [row for _, row, _ in entries if row is not None]
+    
+    try:
+        saved = [(bill_id, status, None) for bill_id, status in insert_bills(session, user_id, rows)]
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        # One row the database rejects must not block the others: retry bill by bill
+        print(f"⚠️ Bill batch insert failed ({e}), saving bills one by one")
+        saved = _insert_bills_one_by_one(session, user_id, rows)
+    
+    results = iter(saved)
+    bills = []
+    for client_id, row, error in entries:
+        if row is not None:
+            bill_id, status, error = next(results)
+        else:
+            bill_id, status = None, "invalid"
+        bill = {"client_id": client_id, "bill_id": bill_id, "status": status}
+        if error:
+            bill["error"] = error
+        bills.append(bill)
+    
+    counts = {status: sum(1 for bill in bills if bill["status"] == status) for status in ("created", "duplicate", "invalid")}
+    if counts["created"]:
+        _bills_saved(user_id)
+    print(f"🧾 Bill batch for user {user_id}: {counts['created']} saved, {counts['duplicate']} already saved, "
+          f"{counts['invalid']} invalid")
+    
+    return {
+        "success": True,
+        "created": counts["created"],
+        "duplicates": counts["duplicate"],
+        "invalid": counts["invalid"],
+        "bills": bills
+    }
+
+def _insert_bills_one_by_one(session: Session, user_id: int, rows: List[Dict[str, Any]]) -> List[Tuple[Optional[int], str, Optional[str]]]:
+    """Fallback when the set-based insert fails: one savepoint per bill, failures are "invalid" """
+    saved = []
+    for row in rows:
+        try:
+            with session.begin_nested():
+                [(bill_id, status)] = insert_bills(session, user_id, [row])
+            saved.append((bill_id, status, None))
+        except Exception as e:
+            print(f"❌ Bill {row['client_id']} rejected: {e}")
+            saved.append((None, "invalid", "Could not be saved"))
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"Error saving bill batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return saved
+
+def _validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    field = ".".join(str(part) for part in first["loc"]) or "bill"
+    return f"{field}: {first['msg']}"
+
 @router.get("/bills")
 def get_bills(
     limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     offset: int = 0,
     session: Session = Depends(get_session),
     user_id: int = Depends(get_current_user)
 ):
-    """Get bill history"""
-    statement = select(Bill).where(
-        Bill.owner_id == user_id
-    ).order_by(Bill.bill_date.desc()).offset(offset).limit(limit)
+    """
+    Get bill history, newest first.
+    Pass the previous response's next_cursor to get the next page (null on the last page).
+    fields=id,total_amount,... returns only those fields; leave out "items" for list views.
+    offset still works for older app versions but gets slower the deeper it goes.
+    """
+    after = None
+    if cursor:
+        after = from_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    bills = session.exec(statement).all()
+    bills, next_cursor = bill_page(session, user_id, limit, after, selected, offset)
     
     return {
         "success": True,
-        "bills": [
-            {
-                "id": bill.id,
-                "total_amount": bill.total_amount,
-                "total_items": bill.total_items,
-                "items": json.loads(bill.items_json),
-                "customer_phone": bill.customer_phone,
-                "customer_name": bill.customer_name,
-                "payment_method": bill.payment_method,
-                "bill_date": bill.bill_date.isoformat(),
-                "created_at": bill.created_at.isoformat()
-            }
-            for bill in bills
-        ]
+        "bills": bills,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/bills/{bill_id}")
+def get_bill(
+    bill_id: int,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """Get one bill with its items"""
+    bill = bill_detail(session, user_id, bill_id)
+    if bill is None:
+        raise HTTPException(status_code=404, detail="Bill not found")
+    
+    return {
+        "success": True,
+        "bill": bill
     }
 
 @router.get("/dashboard")
@@ -110,140 +213,9 @@ def get_dashboard(
     session: Session = Depends(get_session),
     user_id: int = Depends(get_current_user)
 ):
-    """Get dashboard analytics"""
+    """Get dashboard analytics (cached per owner until the next bill; computed from the sales rollups)"""
     try:
-        # Date range
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        # Total revenue
-        revenue_stmt = select(func.sum(Bill.total_amount)).where(
-            and_(
-                Bill.owner_id == user_id,
-                Bill.bill_date >= start_date
-            )
-        )
-        total_revenue = session.exec(revenue_stmt).first() or 0.0
-        
-        # Total bills
-        bills_stmt = select(func.count(Bill.id)).where(
-            and_(
-                Bill.owner_id == user_id,
-                Bill.bill_date >= start_date
-            )
-        )
-        total_bills = session.exec(bills_stmt).first() or 0
-        
-        # Average bill value
-        avg_bill_value = total_revenue / total_bills if total_bills > 0 else 0.0
-        
-        # Total inventory items
-        inventory_stmt = select(func.count(Item.id)).where(Item.owner_id == user_id)
-        total_inventory = session.exec(inventory_stmt).first() or 0
-        
-        # Top selling items
-        top_items_stmt = select(
-            SaleItem.item_name,
-            SaleItem.unit,
-            func.sum(SaleItem.quantity).label('total_quantity'),
-            func.count(SaleItem.id).label('times_sold')
-        ).where(
-            and_(
-                SaleItem.owner_id == user_id,
-                SaleItem.sale_date >= start_date
-            )
-        ).group_by(SaleItem.item_name, SaleItem.unit).order_by(
-            func.sum(SaleItem.quantity).desc()
-        ).limit(5)
-        
-        top_items = session.exec(top_items_stmt).all()
-        
-        # Category wise sales (for pie chart)
-        category_stmt = select(
-            SaleItem.item_category,
-            func.sum(SaleItem.total_price).label('total_sales'),
-            func.sum(SaleItem.quantity).label('total_quantity')
-        ).where(
-            and_(
-                SaleItem.owner_id == user_id,
-                SaleItem.sale_date >= start_date
-            )
-        ).group_by(SaleItem.item_category)
-        
-        categories = session.exec(category_stmt).all()
-        
-        # Peak hour sales
-        peak_hours_stmt = select(
-            SaleItem.hour_of_day,
-            func.count(SaleItem.id).label('sales_count'),
-            func.sum(SaleItem.total_price).label('total_sales')
-        ).where(
-            and_(
-                SaleItem.owner_id == user_id,
-                SaleItem.sale_date >= start_date
-            )
-        ).group_by(SaleItem.hour_of_day).order_by(SaleItem.hour_of_day)
-        
-        peak_hours = session.exec(peak_hours_stmt).all()
-        
-        # Peak day of week
-        day_stmt = select(
-            func.extract('dow', Bill.bill_date).label('day_of_week'),
-            func.count(Bill.id).label('bill_count'),
-            func.sum(Bill.total_amount).label('total_sales')
-        ).where(
-            and_(
-                Bill.owner_id == user_id,
-                Bill.bill_date >= start_date
-            )
-        ).group_by('day_of_week').order_by(func.sum(Bill.total_amount).desc())
-        
-        days_data = session.exec(day_stmt).all()
-        peak_day = days_data[0] if days_data else None
-        
-        # Day names
-        day_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        
-        return {
-            "success": True,
-            "summary": {
-                "total_revenue": round(total_revenue, 2),
-                "total_bills": total_bills,
-                "average_bill_value": round(avg_bill_value, 2),
-                "total_inventory_items": total_inventory
-            },
-            "top_selling_items": [
-                {
-                    "name": item[0],
-                    "unit": item[1],
-                    "quantity": float(item[2]),
-                    "times_sold": item[3]
-                }
-                for item in top_items
-            ],
-            "category_breakdown": [
-                {
-                    "category": cat[0],
-                    "total_sales": float(cat[1]),
-                    "quantity": float(cat[2]),
-                    "percentage": round((float(cat[1]) / total_revenue * 100) if total_revenue > 0 else 0, 1)
-                }
-                for cat in categories
-            ],
-            "peak_hours": [
-                {
-                    "hour": int(hour[0]),
-                    "sales_count": hour[1],
-                    "total_sales": float(hour[2])
-                }
-                for hour in peak_hours
-            ],
-            "peak_day": {
-                "day": day_names[int(peak_day[0])] if peak_day else "N/A",
-                "bill_count": peak_day[1] if peak_day else 0,
-                "total_sales": float(peak_day[2]) if peak_day else 0.0
-            } if peak_day else None
-        }
+        return {"success": True, **dashboard_cache.get_dashboard(session, user_id, days)}
         
     except Exception as e:
         print(f"Dashboard error: {e}")
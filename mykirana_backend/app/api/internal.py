@@ -0,0 +1,48 @@
+"""
+Internal API
+Operational state of this worker (model routing health, metrics).
+Not for shop owners: every endpoint needs the X-Internal-Token header matching INTERNAL_TOKEN,
+and the endpoints answer 404 when INTERNAL_TOKEN is not set.
+"""
+import hmac
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.services.model_router import model_router
+from app.core import metrics
+from app.services.response_cache import response_cache
+from app.services.alias_lexicon import alias_lexicon
+from app.services.dashboard_cache import dashboard_cache
+
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(default=None)):
+    if not INTERNAL_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/models")
+def get_model_health():
+    """Per-model success rate, latency EWMA, failure streak and circuit state"""
+    return {
+        "success": True,
+        "models": model_router.state()
+    }
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Counters and summaries collected by this worker since startup"""
+    return {
+        "success": True,
+        **metrics.snapshot(),
+        "voice_cache": response_cache.stats(),
+        "alias_lexicon": alias_lexicon.stats(),
+        "dashboard_cache": dashboard_cache.stats()
+    }
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 from app.db.database import get_session
-from app.db.models import Item
-from app.db.schemas import ItemCreate, ItemUpdate, ItemResponse
+from app.db.models import Item, PriceChange
+from app.db.schemas import ItemCreate, ItemUpdate, ItemResponse, BulkItemsRequest, BulkDeleteRequest, RepriceRequest
 from app.core.security import jwt, SECRET_KEY, ALGORITHM
+from app.services.inventory_snapshot import bump_inventory_version
+from app.services.inventory_writes import item_row, upsert_items, delete_items, record_tombstones, clear_tombstones
+from app.services.inventory_sync import item_to_dict, inventory_etag, inventory_changes, from_cursor, next_cursor
+from app.db.name_search import has_name, names_contain
+from app.services.repricing import preview_reprice, apply_reprice, rollback_reprice, changed_rows
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import json
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 router = APIRouter()
 
+# Largest array accepted by the /items/bulk endpoints
+MAX_BULK_ROWS = 5000
+
 # Helper: Get current user from Token
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), session: Session = Depends(get_session)):
     token = credentials.credentials  # Extract the token string
@@ -27,6 +35,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         print(f"DEBUG: Token Error: {e}")
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+# Helper: Same as get_current_user, but anonymous requests get None instead of a 401
+def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[int]:
+    if credentials is None:
+        return None
+    return get_current_user(credentials)
+
 @router.post("/", response_model=ItemResponse)
 def create_item(
     item: ItemCreate, 
@@ -47,7 +61,7 @@ def create_item(
     
     if existing_item:
         # Item already exists, update it instead
-        existing_item.names = json.dumps(item.names, ensure_ascii=False)
+        existing_item.names = item.names
         existing_item.price = item.price
         existing_item.unit = item.unit
         existing_item.category = item.category
@@ -55,6 +69,7 @@ def create_item(
         session.add(existing_item)
         session.commit()
         session.refresh(existing_item)
+        bump_inventory_version(user_id)
         
         print(f"✅ Updated existing item: {item.id}")
         
@@ -69,11 +84,9 @@ def create_item(
         }
     
     # Create new item
-    names_json = json.dumps(item.names, ensure_ascii=False)
-    
     new_item = Item(
         master_id=item.id,
-        names=names_json,
+        names=item.names,
         category=item.category,
         price=item.price,
         unit=item.unit,
@@ -81,8 +94,10 @@ def create_item(
     )
     
     session.add(new_item)
+    clear_tombstones(session, user_id, [item.id])
     session.commit()
     session.refresh(new_item)
+    bump_inventory_version(user_id)
     
     print(f"✅ Created new item: {item.id}")
     
@@ -99,14 +114,26 @@ def create_item(
 
 @router.get("/")
 def get_items(
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session),
     user_id: int = Depends(get_current_user)
 ):
     """
     Gets ALL items belonging to the logged-in user.
     MODIFIED: Returns items as objects with 'names' array
+    Sends an ETag; a matching If-None-Match gets an empty 304 instead of the catalog.
+    X-Inventory-Cursor is the `since` for the next /items/changes call.
     """
     try:
+        cursor = next_cursor()
+        etag = inventory_etag(session, user_id)
+        headers = {"ETag": etag, "X-Inventory-Cursor": cursor, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            print(f"📦 Items unchanged for user {user_id} (304)")
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        
         statement = select(Item).where(Item.owner_id == user_id)
         items = session.exec(statement).all()
         
@@ -114,16 +141,7 @@ def get_items(
         response_items = []
         for item in items:
             try:
-                names_array = json.loads(item.names) if item.names else []
-                response_items.append({
-                    "id": item.master_id,  # CRITICAL: Return master_id as id
-                    "names": names_array,
-                    "price": item.price,
-                    "unit": item.unit,
-                    "category": item.category,
-                    "owner_id": item.owner_id,
-                    "master_id": item.master_id
-                })
+                response_items.append(item_to_dict(item))
             except Exception as e:
                 print(f"❌ Error processing item {item.id}: {e}")
                 continue
@@ -135,6 +153,44 @@ def get_items(
         # Return empty list instead of error to prevent frontend crash
         return []
 
+@router.get("/changes")
+def get_item_changes(
+    since: str,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Items changed and deleted since a cursor (from X-Inventory-Cursor or a previous call).
+    Returns {"items": [...], "deleted": [ids], "cursor": next cursor, "reset": bool};
+    reset=true means the cursor is too old and the full list must be reloaded.
+    """
+    since_at = from_cursor(since)
+    if since_at is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    changes = inventory_changes(session, user_id, since_at)
+    print(f"📦 Item changes for user {user_id}: {len(changes['items'])} changed, {len(changes['deleted'])} deleted")
+    return changes
+
+@router.get("/lookup")
+def lookup_items(
+    name: str,
+    partial: bool = False,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Finds items by any of their names, in the database (trigram-indexed on Postgres).
+    partial=false: some name equals `name`; partial=true: some name contains it. Case-insensitive.
+    """
+    name = name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="name is required")
+    
+    condition = names_contain(name) if partial else has_name(name)
+    items = session.exec(select(Item).where(Item.owner_id == user_id, condition).limit(50)).all()
+    return [item_to_dict(item) for item in items]
+
 @router.put("/{item_id}/", response_model=ItemResponse)
 def update_item(
     item_id: str,  # This is the master_id from frontend
@@ -158,7 +214,7 @@ def update_item(
         raise HTTPException(status_code=404, detail="Item not found")
     
     # Update fields
-    existing_item.names = json.dumps(item.names, ensure_ascii=False)
+    existing_item.names = item.names
     existing_item.price = item.price
     existing_item.unit = item.unit
     existing_item.category = item.category
@@ -166,6 +222,7 @@ def update_item(
     session.add(existing_item)
     session.commit()
     session.refresh(existing_item)
+    bump_inventory_version(user_id)
     
     print(f"🔄 Updated item: {item_id}")
     
@@ -202,8 +259,177 @@ def delete_item(
         raise HTTPException(status_code=404, detail="Item not found")
     
     session.delete(existing_item)
+    record_tombstones(session, user_id, [item_id])
     session.commit()
+    bump_inventory_version(user_id)
     
     print(f"🗑️ Deleted item: {item_id}")
     
-    return {"message": "Item deleted successfully"}
\ No newline at end of file
+    return {"message": "Item deleted successfully"}
+
+@router.post("/bulk")
+def bulk_upsert_items(
+    request: BulkItemsRequest,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Creates or updates many items in one transaction (seeding the master list,
+    repricing a category). Same per-item semantics as POST /items/.
+    Returns a status per row, in request order.
+    """
+    if len(request.items) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ROWS} items per request")
+
+    rows = []
+    errors = {}
+    for index, item in enumerate(request.items):
+        names = [name.strip() for name in item.names if name and name.strip()]
+        if not item.id.strip() or not names:
+            errors[index] = "id and at least one name are required"
+        elif item.price < 0:
+            errors[index] = "price cannot be negative"
+        else:
+            rows.append(item_row(user_id, item.id, names, item.price, item.unit, item.category or "General"))
+
+    try:
+        outcome = upsert_items(session, user_id, rows)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Bulk upsert failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Bulk upsert failed: {str(e)}")
+
+    if outcome:
+        bump_inventory_version(user_id)
+
+    results = []
+    for index, item in enumerate(request.items):
+        if index in errors:
+            results.append({"id": item.id, "status": "invalid", "error": errors[index]})
+        else:
+            results.append({"id": item.id, "status": outcome[item.id]})
+
+    created = sum(1 for status in outcome.values() if status == "created")
+    print(f"📦 Bulk upsert: {created} created, {len(outcome) - created} updated, {len(errors)} invalid")
+
+    return {
+        "success": True,
+        "created": created,
+        "updated": len(outcome) - created,
+        "invalid": len(errors),
+        "items": results,
+    }
+
+@router.post("/bulk/delete")
+def bulk_delete_items(
+    request: BulkDeleteRequest,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Deletes many items (by master_id) in one transaction.
+    Returns a status per id: deleted / not_found.
+    """
+    if len(request.ids) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ROWS} ids per request")
+
+    try:
+        outcome = delete_items(session, user_id, request.ids)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Bulk delete failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Bulk delete failed: {str(e)}")
+
+    deleted = sum(1 for status in outcome.values() if status == "deleted")
+    if deleted:
+        bump_inventory_version(user_id)
+
+    print(f"🗑️ Bulk delete: {deleted} deleted, {len(outcome) - deleted} not found")
+
+    return {
+        "success": True,
+        "deleted": deleted,
+        "not_found": len(outcome) - deleted,
+        "items": [{"id": item_id, "status": outcome[item_id]} for item_id in request.ids],
+    }
+
+@router.post("/reprice")
+def reprice_items(
+    request: RepriceRequest,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Changes the price of every item matching a filter in one UPDATE
+    (e.g. category "Dal" +8%, category "Tel" +₹5, then round to ₹1).
+    dry_run=true returns the preview only. Otherwise prior prices are recorded
+    and the returned reprice_id can be passed to /items/reprice/{id}/rollback.
+    """
+    if request.operation == "round" and request.value <= 0:
+        raise HTTPException(status_code=400, detail="round needs a positive step as value")
+    if request.round_to is not None and request.round_to <= 0:
+        raise HTTPException(status_code=400, detail="round_to must be positive")
+
+    try:
+        if request.dry_run:
+            rows = preview_reprice(session, user_id, request)
+            print(f"💱 Reprice preview for user {user_id}: {len(rows)} items")
+            return {"success": True, "dry_run": True, "count": len(rows), "items": rows}
+
+        change = apply_reprice(session, user_id, request)
+        session.commit()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Reprice failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Reprice failed: {str(e)}")
+
+    if change.item_count:
+        bump_inventory_version(user_id)
+    print(f"💱 Repriced {change.item_count} items for user {user_id} ({request.operation} {request.value})")
+
+    return {
+        "success": True,
+        "dry_run": False,
+        "reprice_id": change.id,
+        "count": change.item_count,
+        "items": changed_rows(session, change.id),
+    }
+
+@router.post("/reprice/{reprice_id}/rollback")
+def rollback_reprice_items(
+    reprice_id: int,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Restores the prices a repricing replaced, in one UPDATE.
+    Items edited again since the repricing keep their newer price.
+    """
+    change = session.get(PriceChange, reprice_id)
+    if change is None or change.owner_id != user_id:
+        raise HTTPException(status_code=404, detail="Reprice not found")
+    if change.rolled_back_at is not None:
+        raise HTTPException(status_code=409, detail="Reprice already rolled back")
+
+    try:
+        restored = rollback_reprice(session, change)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Reprice rollback failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Rollback failed: {str(e)}")
+
+    if restored:
+        bump_inventory_version(user_id)
+    print(f"↩️ Rolled back reprice {reprice_id}: {restored} of {change.item_count} items restored")
+
+    return {
+        "success": True,
+        "reprice_id": reprice_id,
+        "restored": restored,
+        "skipped": change.item_count - restored,
+    }
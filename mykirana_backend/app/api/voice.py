@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from sqlmodel import Session, select, func, and_
-from datetime import datetime, timedelta
-from app.db.database import get_session
-from app.db.models import Item, Bill, SaleItem
-from app.services.ai_service import AIService
-from app.api.items import get_current_user # Re-use the login logic
+from sqlmodel import Session, select
+from app.db.database import get_session, engine
+from app.db.models import Bill
+from app.services.ai_service import AIService, PROMPT_PRUNE_MIN_ITEMS, is_system_error
+from app.services.response_cache import response_cache
+from app.services.inventory_snapshot import InventorySnapshot, get_inventory_snapshot, get_frequent_item_names
+from app.services.analytics_version import get_analytics_version
+from app.services.intent_classifier import classify_intent
+from app.services.voice_session import VoiceSession
+from app.services.dashboard_cache import dashboard_cache
+from app.core.security import jwt, SECRET_KEY, ALGORITHM
+from app.api.items import get_current_user, get_optional_user # Re-use the login logic
 import json
 
 router = APIRouter()
@@ -18,151 +26,293 @@ class VoiceRequest(BaseModel):
 class PremiumVoiceRequest(BaseModel):
     transcript: str
     user_id: int
-    inventory: List[Dict[str, Any]]
+    # Either reference the server's copy of the inventory (send the version/hash from
+    # /voice/inventory-ref or a previous response, with a Bearer token) or upload it.
+    # The upload is only used when the reference is missing or stale.
+    inventory: Optional[List[Dict[str, Any]]] = None
+    inventory_version: Optional[int] = None
+    inventory_hash: Optional[str] = None
 
 @router.post("/process")
-def process_voice(
+async def process_voice(
     request: VoiceRequest,
     session: Session = Depends(get_session),
     user_id: int = Depends(get_current_user)
 ):
     """
-    Enhanced endpoint - Receives text -> Fetches Inventory + Analytics -> Calls AI -> Returns Response
+    Enhanced endpoint - Receives text -> Classifies intent -> Cache -> Fetches only the needed context -> Calls AI -> Returns Response
+    DB work runs in the threadpool and the model call is awaited, so a slow model never blocks the worker.
     """
-    # 1. Get THIS user's inventory
-    statement = select(Item).where(Item.owner_id == user_id)
-    inventory = session.exec(statement).all()
+    # 1. Inventory snapshot + intent (a locally parsed bill returns right here)
+    inventory, intent, analytics_version = await run_in_threadpool(_classify_voice, session, user_id, request.text)
+    if intent.local_result is not None:
+        return intent.local_result
     
-    # 2. Get Dashboard Analytics (Last 30 days)
-    dashboard_data = _get_dashboard_data(session, user_id, days=30)
+    # 2. Repeated phrase? Answer from the cache (keyed on inventory/analytics versions)
+    cache_key = response_cache.key_for(user_id, request.text, inventory.version, analytics_version)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"⚡ Voice cache hit: {cache_key[1]}")
+        return cached
     
-    # 3. Get Recent Bills (Last 10)
-    recent_bills = _get_recent_bills(session, user_id, limit=10)
+    # 3. Only the context this utterance needs
+    dashboard_data, recent_bills, frequent_items = await run_in_threadpool(
+        _load_voice_context, session, user_id, intent, inventory
+    )
     
-    # 4. Call the AI Service with full context
-    ai_response = ai_service.process_voice_command(
+    # 4. Call the AI Service with the required context
+    ai_response = await ai_service.process_voice_command(
         request.text, 
         inventory,
         dashboard_data=dashboard_data,
-        recent_bills=recent_bills
+        recent_bills=recent_bills,
+        frequent_items=frequent_items,
+        intent=intent
     )
     
+    if not is_system_error(ai_response):
+        response_cache.put(cache_key, ai_response)
+    
     return ai_response
 
+@router.post("/process/stream")
+async def process_voice_stream(
+    request: VoiceRequest,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Same as /voice/process, streamed as Server-Sent Events so the app can speak the
+    reply and show bill lines while the model is still writing.
+    Events: `field` ({"name", "value"} for type/customer_name/msg), `item` (one bill line),
+    then `done` with the full response (identical to what /voice/process would return).
+    """
+    inventory, intent, analytics_version = await run_in_threadpool(_classify_voice, session, user_id, request.text)
+    
+    if intent.local_result is not None:
+        return _sse_response(_replay_events(intent.local_result))
+    
+    cache_key = response_cache.key_for(user_id, request.text, inventory.version, analytics_version)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        print(f"⚡ Voice cache hit: {cache_key[1]}")
+        return _sse_response(_replay_events(cached))
+    
+    dashboard_data, recent_bills, frequent_items = await run_in_threadpool(
+        _load_voice_context, session, user_id, intent, inventory
+    )
+    
+    async def events():
+        async for name, data in ai_service.stream_voice_command(
+            request.text,
+            inventory,
+            dashboard_data=dashboard_data,
+            recent_bills=recent_bills,
+            frequent_items=frequent_items
+        ):
+            if name == "done" and not is_system_error(data):
+                response_cache.put(cache_key, data)
+            yield _sse(name, data)
+    
+    return _sse_response(events())
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Stop proxies (Render/nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _replay_events(response: Dict[str, Any]):
+    """A response we already have in full, in the same event order the model stream uses"""
+    for field in ("type", "customer_name", "msg"):
+        if field in response:
+            yield _sse("field", {"name": field, "value": response[field]})
+    for item in response.get("items") or []:
+        yield _sse("item", item)
+    yield _sse("done", response)
+
+@router.websocket("/session")
+async def voice_session(websocket: WebSocket):
+    """
+    Continuous-listening session. Authenticate once (?token=<jwt> or an Authorization
+    header), then send one message per utterance instead of one HTTPS request each:
+
+        -> {"type": "transcript", "text": "do kilo chawal"}
+        <- {"type": "result", "text": ..., "response": {/voice/process reply},
+            "delta": {"added": [...], "updated": [...], "total": 100.0}, "bill": {...}}
+        -> {"type": "reset"}   starts a new bill      -> {"type": "ping"}   keep-alive
+        <- {"type": "error", "msg": ...}   for a malformed message or a failed turn (the session stays open)
+
+    The owner's inventory snapshot and the bill so far stay pinned in memory, so follow-ups
+    ("aur ek packet", answering "Aam ki keemat kya hai?") resolve without resending history.
+    """
+    user_id = _websocket_user(websocket)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    snapshot = await run_in_threadpool(_load_snapshot, user_id)
+    session_state = VoiceSession(user_id, snapshot)
+    await websocket.send_json({"type": "ready", "inventory_version": snapshot.version, "items": len(snapshot.records)})
+    print(f"🔗 Voice session opened for user {user_id}")
+    
+    try:
+        while True:
+            # One bad message gets an error reply; the session and its pinned bill stay open
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                await websocket.send_json({"type": "error", "msg": "Invalid JSON"})
+                continue
+            kind = message.get("type") if isinstance(message, dict) else None
+            text = message.get("text") if kind == "transcript" else None
+            
+            if kind == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif kind == "reset":
+                session_state.reset()
+                await websocket.send_json({"type": "bill", "bill": session_state.bill()})
+            elif isinstance(text, str) and text.strip():
+                text = text.strip()
+                try:
+                    response = await _session_turn(session_state, text)
+                    delta = session_state.apply(text, response)
+                except Exception as e:
+                    print(f"❌ Voice session turn failed for user {user_id}: {e}")
+                    await websocket.send_json({"type": "error", "text": text, "msg": "Could not process that, please try again"})
+                    continue
+                await websocket.send_json({
+                    "type": "result",
+                    "text": text,
+                    "response": response,
+                    "delta": delta,
+                    "bill": session_state.bill(),
+                })
+            else:
+                await websocket.send_json({"type": "error", "msg": "Unknown message"})
+    except WebSocketDisconnect:
+        print(f"🔌 Voice session closed for user {user_id}")
+    except Exception as e:
+        print(f"❌ Voice session error for user {user_id}: {e}")
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+def _websocket_user(websocket: WebSocket) -> Optional[int]:
+    """JWT from ?token= (browsers can't set WebSocket headers) or the Authorization header"""
+    token = websocket.query_params.get("token")
+    if not token:
+        header = websocket.headers.get("authorization", "")
+        token = header[7:] if header.lower().startswith("bearer ") else None
+    if not token:
+        return None
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        return int(user_id) if user_id is not None else None
+    except Exception as e:
+        print(f"DEBUG: WebSocket Token Error: {e}")
+        return None
+
+def _load_snapshot(user_id: int) -> InventorySnapshot:
+    with Session(engine) as session:
+        return get_inventory_snapshot(session, user_id)
+
+def _load_session_context(user_id: int, intent, inventory: InventorySnapshot):
+    # Short-lived DB session per turn; the socket itself never holds a connection
+    with Session(engine) as session:
+        return _load_voice_context(session, user_id, intent, inventory)
+
+async def _session_turn(session_state: VoiceSession, text: str) -> Dict[str, Any]:
+    """One utterance of a voice session -> /voice/process-shaped response"""
+    user_id = session_state.owner_id
+    
+    # Swap in the current inventory only if it was edited (by any worker) since the session pinned it
+    snapshot = await run_in_threadpool(_load_snapshot, user_id)
+    if snapshot.version != session_state.snapshot.version:
+        session_state.refresh(snapshot)
+    inventory = session_state.snapshot
+    
+    followup = session_state.resolve_locally(text)
+    if followup is not None:
+        print(f"⚡ Session follow-up handled locally: {text}")
+        return followup
+    
+    intent = classify_intent(text, inventory)
+    print(f"🧭 Intent: {intent}")
+    if intent.local_result is not None:
+        return intent.local_result
+    
+    # Answers that depend on the previous turn are not cacheable
+    conversation = session_state.conversation()
+    cache_key = None
+    if conversation is None:
+        analytics_version = None
+        if _uses_analytics(intent):
+            analytics_version = await run_in_threadpool(_load_analytics_version, user_id)
+        cache_key = response_cache.key_for(user_id, text, inventory.version, analytics_version)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print(f"⚡ Voice cache hit: {cache_key[1]}")
+            return cached
+    
+    dashboard_data, recent_bills, frequent_items = await run_in_threadpool(
+        _load_session_context, user_id, intent, inventory
+    )
+    ai_response = await ai_service.process_voice_command(
+        text,
+        inventory,
+        dashboard_data=dashboard_data,
+        recent_bills=recent_bills,
+        frequent_items=frequent_items,
+        conversation=conversation,
+        intent=intent
+    )
+    
+    if cache_key is not None and not is_system_error(ai_response):
+        response_cache.put(cache_key, ai_response)
+    
+    return ai_response
+
+def _classify_voice(session: Session, user_id: int, text: str):
+    """
+    THIS user's inventory (cached snapshot, rebuilt only after inventory changes), the utterance's
+    intent, and the sales-data version when the answer will be built from analytics (else None)
+    """
+    inventory = get_inventory_snapshot(session, user_id)
+    intent = classify_intent(text, inventory)
+    print(f"🧭 Intent: {intent}")
+    analytics_version = None
+    if intent.local_result is None and _uses_analytics(intent):
+        analytics_version = get_analytics_version(session, user_id)
+    return inventory, intent, analytics_version
+
+def _uses_analytics(intent) -> bool:
+    return intent.needs_dashboard or intent.needs_recent_bills
+
+def _load_analytics_version(user_id: int) -> int:
+    with Session(engine) as session:
+        return get_analytics_version(session, user_id)
+
+def _load_voice_context(session: Session, user_id: int, intent, inventory: InventorySnapshot):
+    """Blocking part of /voice/process: the context slices the intent needs"""
+    # Dashboard Analytics (Last 30 days) and Recent Bills (Last 10) - only for BI questions
+    dashboard_data = _get_dashboard_data(session, user_id, days=30) if intent.needs_dashboard else None
+    recent_bills = _get_recent_bills(session, user_id, limit=10) if intent.needs_recent_bills else None
+    
+    # Frequent sellers keep the pruned prompt inventory useful for big shops
+    frequent_items = get_frequent_item_names(session, user_id) if len(inventory.priced) > PROMPT_PRUNE_MIN_ITEMS else None
+    
+    return dashboard_data, recent_bills, frequent_items
+
 def _get_dashboard_data(session: Session, user_id: int, days: int = 30) -> Dict[str, Any]:
-    """Get dashboard analytics for AI context"""
+    """Get dashboard analytics for AI context (shares the dashboard endpoint's cache)"""
     try:
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        # Total revenue
-        revenue_stmt = select(func.sum(Bill.total_amount)).where(
-            and_(Bill.owner_id == user_id, Bill.bill_date >= start_date)
-        )
-        total_revenue = session.exec(revenue_stmt).first() or 0.0
-        
-        # Total bills
-        bills_stmt = select(func.count(Bill.id)).where(
-            and_(Bill.owner_id == user_id, Bill.bill_date >= start_date)
-        )
-        total_bills = session.exec(bills_stmt).first() or 0
-        
-        # Average bill value
-        avg_bill_value = total_revenue / total_bills if total_bills > 0 else 0.0
-        
-        # Total inventory
-        inventory_stmt = select(func.count(Item.id)).where(Item.owner_id == user_id)
-        total_inventory = session.exec(inventory_stmt).first() or 0
-        
-        # Top selling items
-        top_items_stmt = select(
-            SaleItem.item_name,
-            SaleItem.unit,
-            func.sum(SaleItem.quantity).label('total_quantity'),
-            func.count(SaleItem.id).label('times_sold')
-        ).where(
-            and_(SaleItem.owner_id == user_id, SaleItem.sale_date >= start_date)
-        ).group_by(SaleItem.item_name, SaleItem.unit).order_by(
-            func.sum(SaleItem.quantity).desc()
-        ).limit(5)
-        
-        top_items = session.exec(top_items_stmt).all()
-        
-        # Category breakdown
-        category_stmt = select(
-            SaleItem.item_category,
-            func.sum(SaleItem.total_price).label('total_sales'),
-            func.sum(SaleItem.quantity).label('total_quantity')
-        ).where(
-            and_(SaleItem.owner_id == user_id, SaleItem.sale_date >= start_date)
-        ).group_by(SaleItem.item_category)
-        
-        categories = session.exec(category_stmt).all()
-        
-        # Peak hours
-        peak_hours_stmt = select(
-            SaleItem.hour_of_day,
-            func.count(SaleItem.id).label('sales_count'),
-            func.sum(SaleItem.total_price).label('total_sales')
-        ).where(
-            and_(SaleItem.owner_id == user_id, SaleItem.sale_date >= start_date)
-        ).group_by(SaleItem.hour_of_day).order_by(SaleItem.hour_of_day)
-        
-        peak_hours = session.exec(peak_hours_stmt).all()
-        
-        # Peak day
-        day_stmt = select(
-            func.extract('dow', Bill.bill_date).label('day_of_week'),
-            func.count(Bill.id).label('bill_count'),
-            func.sum(Bill.total_amount).label('total_sales')
-        ).where(
-            and_(Bill.owner_id == user_id, Bill.bill_date >= start_date)
-        ).group_by('day_of_week').order_by(func.sum(Bill.total_amount).desc())
-        
-        days_data = session.exec(day_stmt).all()
-        peak_day = days_data[0] if days_data else None
-        
-        day_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        
-        return {
-            "summary": {
-                "total_revenue": round(total_revenue, 2),
-                "total_bills": total_bills,
-                "average_bill_value": round(avg_bill_value, 2),
-                "total_inventory_items": total_inventory
-            },
-            "top_selling_items": [
-                {
-                    "name": item[0],
-                    "unit": item[1],
-                    "quantity": float(item[2]),
-                    "times_sold": item[3]
-                }
-                for item in top_items
-            ],
-            "category_breakdown": [
-                {
-                    "category": cat[0],
-                    "total_sales": float(cat[1]),
-                    "quantity": float(cat[2]),
-                    "percentage": round((float(cat[1]) / total_revenue * 100) if total_revenue > 0 else 0, 1)
-                }
-                for cat in categories
-            ],
-            "peak_hours": [
-                {
-                    "hour": int(hour[0]),
-                    "sales_count": hour[1],
-                    "total_sales": float(hour[2])
-                }
-                for hour in peak_hours
-            ],
-            "peak_day": {
-                "day": day_names[int(peak_day[0])] if peak_day else "N/A",
-                "bill_count": peak_day[1] if peak_day else 0,
-                "total_sales": float(peak_day[2]) if peak_day else 0.0
-            } if peak_day else None
-        }
+        return dashboard_cache.get_dashboard(session, user_id, days)
     except Exception as e:
         print(f"Error getting dashboard data: {e}")
         return {}
@@ -191,12 +341,51 @@ def _get_recent_bills(session: Session, user_id: int, limit: int = 10) -> List[D
         print(f"Error getting recent bills: {e}")
         return []
 
+@router.get("/inventory-ref")
+def inventory_ref(
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """Current inventory version/hash to send instead of the full list on /process-query and /process-billing"""
+    snapshot = get_inventory_snapshot(session, user_id)
+    return {"inventory_version": snapshot.version, "inventory_hash": snapshot.content_hash, "items": len(snapshot.records)}
+
+def _request_inventory(session: Session, request: PremiumVoiceRequest, owner_id: Optional[int]):
+    """
+    Inventory for a premium voice request -> (snapshot, reference to send back or {}).
+    Authenticated clients that reference the current version/hash use the server's cached
+    snapshot (constant-size request); otherwise fall back to the uploaded list. A stale
+    reference with nothing uploaded gets a 409 carrying the current reference.
+    """
+    has_reference = request.inventory_hash is not None or request.inventory_version is not None
+    if owner_id is not None and (has_reference or request.inventory is None):
+        snapshot = get_inventory_snapshot(session, owner_id)
+        ref = {"inventory_version": snapshot.version, "inventory_hash": snapshot.content_hash}
+        if request.inventory_hash is not None:
+            current = request.inventory_hash == snapshot.content_hash
+        else:
+            current = request.inventory_version is None or request.inventory_version == snapshot.version
+        if current:
+            return snapshot, ref
+        if request.inventory is None:
+            raise HTTPException(status_code=409, detail={"error": "inventory_mismatch", **ref})
+        print(f"📤 Stale inventory reference from user {owner_id}, using uploaded list")
+
+    if request.inventory is None:
+        raise HTTPException(status_code=400, detail="Send inventory, or inventory_version/inventory_hash with a Bearer token")
+    return InventorySnapshot.from_dicts(request.inventory, owner_id=owner_id or request.user_id), {}
+
 @router.post("/process-query")
-def process_query(request: PremiumVoiceRequest):
+def process_query(
+    request: PremiumVoiceRequest,
+    session: Session = Depends(get_session),
+    owner_id: Optional[int] = Depends(get_optional_user)
+):
     """
     Process a query (question) from the user
     Returns answer and whether to continue listening
     """
+    inventory, ref = _request_inventory(session, request, owner_id)
     try:
         # Detect query type
         transcript_lower = request.transcript.lower()
@@ -207,15 +396,11 @@ def process_query(request: PremiumVoiceRequest):
             item_name = _extract_item_from_query(transcript_lower)
             
             if item_name:
-                # Find item in inventory
-                matching_item = None
-                for item in request.inventory:
-                    if any(item_name in name.lower() for name in item.get('names', [])):
-                        matching_item = item
-                        break
+                # Find item in inventory (exact, prefix, then fuzzy - any script)
+                matching_item = inventory.resolve(item_name)
                 
                 if matching_item:
-                    answer = f"{matching_item['names'][0]} ka price hai {matching_item['price']} rupaye per {matching_item['unit']}"
+                    answer = f"{matching_item.names[0]} ka price hai {matching_item.price:g} rupaye per {matching_item.unit}"
                     
                     # Check if query includes billing intent
                     if any(word in transcript_lower for word in ['de do', 'dena', 'chahiye', 'add']):
@@ -224,7 +409,8 @@ def process_query(request: PremiumVoiceRequest):
                             "success": True,
                             "answer": answer,
                             "continue_listening": True,
-                            "mode": "billing"
+                            "mode": "billing",
+                            **ref
                         }
                     else:
                         # Just answer, stop listening
@@ -232,7 +418,8 @@ def process_query(request: PremiumVoiceRequest):
                             "success": True,
                             "answer": answer,
                             "continue_listening": False,
-                            "mode": "query"
+                            "mode": "query",
+                            **ref
                         }
                 else:
                     answer = f"{item_name} inventory mein nahi hai"
@@ -240,7 +427,8 @@ def process_query(request: PremiumVoiceRequest):
                         "success": True,
                         "answer": answer,
                         "continue_listening": False,
-                        "mode": "query"
+                        "mode": "query",
+                        **ref
                     }
         
         # Generic query - use AI
@@ -249,7 +437,8 @@ def process_query(request: PremiumVoiceRequest):
             "success": True,
             "answer": answer,
             "continue_listening": False,
-            "mode": "query"
+            "mode": "query",
+            **ref
         }
         
     except Exception as e:
@@ -261,44 +450,40 @@ def process_query(request: PremiumVoiceRequest):
         }
 
 @router.post("/process-billing")
-def process_billing(request: PremiumVoiceRequest):
+async def process_billing(
+    request: PremiumVoiceRequest,
+    session: Session = Depends(get_session),
+    owner_id: Optional[int] = Depends(get_optional_user)
+):
     """
     Process billing transcript
     Returns bill updates
     """
+    # Server's cached snapshot when the client's reference is current, else the uploaded list
+    inventory, ref = await run_in_threadpool(_request_inventory, session, request, owner_id)
     try:
-        # Use AI service to parse billing items
-        inventory_items = []
-        for item_data in request.inventory:
-            # Create mock Item objects for AI service
-            item = type('Item', (), {
-                'id': item_data.get('id'),
-                'names': item_data.get('names', []),
-                'price': item_data.get('price'),
-                'unit': item_data.get('unit'),
-                'category': item_data.get('category', '')
-            })()
-            inventory_items.append(item)
-        
         # Process with AI
-        ai_response = ai_service.process_voice_command(request.transcript, inventory_items)
+        ai_response = await ai_service.process_voice_command(request.transcript, inventory)
         
         # Extract bill items
         bill_updates = []
-        if ai_response.get('success') and 'bill' in ai_response:
-            for item in ai_response['bill']:
+        if ai_response.get('type') == 'BILL':
+            for item in ai_response.get('items') or []:
                 bill_updates.append({
-                    'name': item.get('item_name'),
-                    'quantity': item.get('quantity', 1.0),
+                    'name': item.get('name'),
+                    'quantity': item.get('qty', 1.0),
+                    'quantity_display': item.get('qty_display', ''),
                     'unit': item.get('unit', ''),
-                    'price': item.get('price_per_unit', 0.0),
-                    'total': item.get('total_price', 0.0)
+                    'price': item.get('rate', 0.0),
+                    'total': item.get('total', 0.0)
                 })
         
         return {
             "success": True,
             "bill_updates": bill_updates,
-            "total_items": len(bill_updates)
+            "total_items": len(bill_updates),
+            "msg": ai_response.get('msg', ''),
+            **ref
         }
         
     except Exception as e:
@@ -1,17 +1,25 @@
 """
 Voice Inventory API
-Handles voice-based inventory addition
+Handles voice-based inventory addition: parse dictation into a staged batch,
+then commit the accepted items in one transaction
 """
+import json
+import math
+import re
+import time
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, update
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.db.database import get_session
-from app.db.models import Item
+from app.db.models import InventoryImportBatch
 from app.core.security import jwt, SECRET_KEY, ALGORITHM
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.services.voice_inventory_service import parse_voice_inventory
-import json
+from app.services.inventory_snapshot import get_inventory_snapshot, bump_inventory_version
+from app.services.inventory_writes import item_row, upsert_items
 
 security = HTTPBearer()
 router = APIRouter()
@@ -25,6 +33,30 @@ class VoiceInventoryRequest(BaseModel):
 class VoiceInventoryResponse(BaseModel):
     categories: List[Dict[str, Any]]
     raw_text: str
+    unparsed_segments: List[str] = []   # Dictation chunks no model could parse (ask the user to repeat)
+    batch_id: Optional[int] = None      # Staged batch to commit; every item carries its "line" number
+
+
+class AcceptedLine(BaseModel):
+    """One staged line to save, with any edits the owner made on the review screen"""
+    line: int
+    name: Optional[str] = None
+    price: Optional[float] = None
+    unit: Optional[str] = None
+    category: Optional[str] = None
+    aliases: Optional[List[str]] = None
+    # The staged match to existing stock can be wrong: save over another item instead,
+    # or as a new item (as_new wins)
+    existing_id: Optional[str] = None
+    as_new: bool = False
+
+
+class CommitBatchRequest(BaseModel):
+    items: Optional[List[AcceptedLine]] = None   # None = accept every staged line as parsed
+
+
+# Staged batches older than this must be parsed again
+BATCH_TTL_SECONDS = 24 * 60 * 60
 
 
 # Helper: Get current user from Token
@@ -61,44 +93,177 @@ async def parse_voice_inventory_endpoint(
         print(f"🎙️ Voice inventory parse request from user {user_id}")
         print(f"📝 Raw text: {request.raw_text}")
         
-        # Get user's existing inventory
-        statement = select(Item).where(Item.owner_id == user_id)
-        existing_items = session.exec(statement).all()
-        
-        # Convert to dict format
-        items_data = []
-        categories_set = set()
-        
-        for item in existing_items:
-            try:
-                names_array = json.loads(item.names) if item.names else []
-                items_data.append({
-                    "id": item.master_id,
-                    "names": names_array,
-                    "price": item.price,
-                    "unit": item.unit,
-                    "category": item.category
-                })
-                categories_set.add(item.category)
-            except Exception as e:
-                print(f"❌ Error processing item {item.id}: {e}")
-                continue
+        # Get user's existing inventory (cached snapshot, loaded off the event loop)
+        snapshot = await run_in_threadpool(get_inventory_snapshot, session, user_id)
         
-        existing_categories = list(categories_set)
-        
-        print(f"📦 User has {len(items_data)} items in {len(existing_categories)} categories")
+        print(f"📦 User has {len(snapshot.records)} items in {len(snapshot.categories)} categories")
         
         # Parse voice input using AI
-        parsed_data = parse_voice_inventory(
+        parsed_data = await parse_voice_inventory(
             raw_text=request.raw_text,
-            existing_items=items_data,
-            existing_categories=existing_categories
+            snapshot=snapshot
         )
         
         print(f"✅ Parsed {len(parsed_data.get('categories', []))} categories")
         
+        # Keep the result server-side so the review screen commits it in one call
+        lines = _stageable_lines(parsed_data)
+        if lines:
+            batch = await run_in_threadpool(_stage_batch, session, user_id, request.raw_text, lines)
+            parsed_data["batch_id"] = batch.id
+            print(f"📥 Staged batch {batch.id} with {batch.item_count} items")
+        
         return parsed_data
         
     except Exception as e:
         print(f"❌ Voice inventory parse error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to parse voice inventory: {str(e)}")
+
+
+@router.post("/voice-parse/{batch_id}/commit")
+def commit_voice_inventory_batch(
+    batch_id: int,
+    request: Optional[CommitBatchRequest] = None,
+    session: Session = Depends(get_session),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Save the accepted items of a staged batch to the inventory.
+    All rows are upserted on (owner_id, master_id) in one transaction,
+    so a 150-item dictation is one round trip and one commit.
+    """
+    batch = session.get(InventoryImportBatch, batch_id)
+    if batch is None or batch.owner_id != user_id:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if batch.status != "staged":
+        raise HTTPException(status_code=409, detail=f"Batch already {batch.status}")
+    if (datetime.utcnow() - batch.created_at).total_seconds() > BATCH_TTL_SECONDS:
+        raise HTTPException(status_code=410, detail="Batch expired, please parse the dictation again")
+
+    # Claim the batch in this transaction: a concurrent commit (double tap, retry) blocks on
+    # the row until this one finishes, then matches no row and gets a 409 instead of
+    # inserting the new items a second time. A failed commit rolls the claim back.
+    claimed = session.exec(
+        update(InventoryImportBatch)
+        .where(InventoryImportBatch.id == batch_id, InventoryImportBatch.status == "staged")
+        .values(status="committing")
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Batch already committed")
+
+    staged = {line["line"]: line for line in json.loads(batch.items_json)}
+    accepted = request.items if request is not None and request.items is not None else [
+        AcceptedLine(line=number) for number in staged
+    ]
+
+    results = []
+    rows = []
+    for edit in accepted:
+        line = staged.get(edit.line)
+        if line is None:
+            results.append({"line": edit.line, "status": "unknown_line"})
+            continue
+        # Staged values come from the model: any of them may be the wrong type
+        name = str(edit.name if edit.name is not None else line.get("name") or "").strip()
+        price = _line_price(edit.price if edit.price is not None else line.get("price"))
+        if price is None:
+            results.append({"line": edit.line, "status": "invalid", "error": "price is not a number"})
+            continue
+        if not name or price <= 0:
+            results.append({"line": edit.line, "status": "skipped"})
+            continue
+
+        if edit.as_new:
+            master_id = _custom_id(name, edit.line)
+        else:
+            master_id = edit.existing_id or line.get("existing_id") or _custom_id(name, edit.line)
+        aliases = edit.aliases if edit.aliases is not None else line.get("aliases") or []
+        if not isinstance(aliases, list):
+            aliases = [aliases]
+        names = list(dict.fromkeys([name] + [str(a).strip() for a in aliases if a and str(a).strip()]))
+        rows.append(item_row(
+            owner_id=user_id,
+            master_id=str(master_id),
+            names=names,
+            price=price,
+            unit=str(edit.unit or line.get("unit") or "kg"),
+            category=str(edit.category or line.get("category") or "General"),
+        ))
+        results.append({"line": edit.line, "id": str(master_id)})
+
+    try:
+        outcome = upsert_items(session, user_id, rows)
+        batch.status = "committed"
+        batch.committed_at = datetime.utcnow()
+        session.add(batch)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Batch {batch_id} commit failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save inventory: {str(e)}")
+
+    if outcome:
+        bump_inventory_version(user_id)
+
+    for result in results:
+        if "id" in result:
+            result["status"] = outcome[result["id"]]
+    created = sum(1 for status in outcome.values() if status == "created")
+    print(f"✅ Batch {batch_id} committed: {created} created, {len(outcome) - created} updated")
+
+    return {
+        "success": True,
+        "batch_id": batch_id,
+        "created": created,
+        "updated": len(outcome) - created,
+        "skipped": sum(1 for result in results if result.get("status") in ("skipped", "unknown_line")),
+        "invalid": sum(1 for result in results if result.get("status") == "invalid"),
+        "items": results,
+    }
+
+
+def _stageable_lines(parsed_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Number every parsed item ("line") and return them flattened with their category"""
+    lines = []
+    for category in parsed_data.get("categories", []):
+        for item in category.get("items", []):
+            if not item.get("name") or item["name"].startswith("Parse Error"):
+                continue
+            item["line"] = len(lines)
+            lines.append(dict(item, category=category.get("name") or "General"))
+    return lines
+
+
+def _stage_batch(session: Session, owner_id: int, raw_text: str, lines: List[Dict[str, Any]]) -> InventoryImportBatch:
+    batch = InventoryImportBatch(
+        owner_id=owner_id,
+        raw_text=raw_text,
+        items_json=json.dumps(lines, ensure_ascii=False),
+        item_count=len(lines),
+    )
+    session.add(batch)
+    session.commit()
+    session.refresh(batch)
+    return batch
+
+
+def _custom_id(name: str, line: int) -> str:
+    """
+    Same id scheme the app uses for items that are not in the master list, plus the
+    staged line number: two lines with the same new name in one batch stay two items.
+    """
+    slug = re.sub(r"\s+", "_", name.strip().lower())
+    return f"custom_{int(time.time() * 1000)}_{line}_{slug}"
+
+
+def _line_price(value: Any) -> Optional[float]:
+    """Staged or edited price as a float (missing = 0), None if it is not a finite number"""
+    if value is None or value == "":
+        return 0.0
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) else None
@@ -0,0 +1,46 @@
+"""
+In-process metrics
+Counters and simple value summaries for this worker, exposed on /internal/metrics.
+"""
+import threading
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_summaries: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (count, sum, min, max, last)"""
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            _summaries[name] = {"count": 1, "sum": value, "min": value, "max": value, "last": value}
+            return
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["min"] = min(summary["min"], value)
+        summary["max"] = max(summary["max"], value)
+        summary["last"] = value
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "summaries": {
+                name: {**summary, "avg": round(summary["sum"] / summary["count"], 2)}
+                for name, summary in _summaries.items()
+            },
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
@@ -2,6 +2,7 @@ from sqlmodel import SQLModel, create_engine, Session
 from app.db.models import User, OTP, Item
 from dotenv import load_dotenv
 import os
+import json
 
 load_dotenv()
 
@@ -26,6 +27,8 @@ engine = create_engine(
     echo=os.getenv("DB_ECHO", "0").lower() in ("1", "true", "yes"),
     pool_pre_ping=True,  # Verify connections before use (handles Render DB timeouts)
     pool_recycle=300,    # Recycle connections every 5 min (Render free tier)
+    # JSON columns keep Hindi/regional names readable (and LIKE-searchable on SQLite)
+    json_serializer=lambda obj: json.dumps(obj, ensure_ascii=False),
 )
 
 # 4. Function to create tables (Run this when app starts)
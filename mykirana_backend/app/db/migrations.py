@@ -0,0 +1,233 @@
+"""
+Versioned schema migrations
+create_all() only creates missing tables; it never adds an index or changes a column of an
+existing one. Every such change is a numbered migration here, recorded in schema_migrations
+once applied. main.py checks for pending migrations at startup; `python migrate.py` runs them
+by hand. Migrations must be safe to re-run (IF NOT EXISTS) since a fresh database already
+gets the model's indexes from create_all().
+"""
+import json
+import os
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+# Postgres advisory lock key, so only one worker migrates at a time
+_LOCK_KEY = 72_010_001
+
+# Apply pending migrations at startup (MIGRATE_ON_STARTUP=0 makes startup fail instead)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+
+
+_DUPLICATE_ITEMS = "id NOT IN (SELECT MAX(id) FROM item GROUP BY owner_id, master_id)"
+
+
+def _item_unique_owner_master(conn: Connection) -> None:
+    """
+    One row per (owner_id, master_id): drop duplicates (keep newest), then the unique index.
+    Dropped rows are copied to item_duplicates_backup first, so an owner's lost edits can be restored.
+    """
+    counts = conn.execute(text(
+        f"SELECT owner_id, COUNT(*) FROM item WHERE {_DUPLICATE_ITEMS} GROUP BY owner_id ORDER BY owner_id"
+    )).fetchall()
+    if counts:
+        for owner_id, count in counts:
+            print(f"   - owner {owner_id}: {count} duplicate item row(s)")
+        conn.execute(text("CREATE TABLE IF NOT EXISTS item_duplicates_backup AS SELECT * FROM item WHERE 1 = 0"))
+        backed_up = conn.execute(text(
+            f"INSERT INTO item_duplicates_backup SELECT * FROM item WHERE {_DUPLICATE_ITEMS}"
+        )).rowcount
+        deleted = conn.execute(text(f"DELETE FROM item WHERE {_DUPLICATE_ITEMS}")).rowcount
+        print(f"   - {deleted} duplicate rows deleted, {backed_up} copied to item_duplicates_backup")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_item_owner_master ON item (owner_id, master_id)"))
+
+
+def _item_owner_updated(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_item_owner_updated ON item (owner_id, updated_at)"))
+
+
+def _clean_names(raw) -> List[str]:
+    """Stored names value -> list of names (old rows may hold bad JSON or a bare string)"""
+    try:
+        names = json.loads(raw) if isinstance(raw, str) else raw
+    except Exception:
+        names = [raw]
+    if isinstance(names, str):
+        names = [names]
+    return [str(n) for n in (names or []) if n is not None and str(n).strip()]
+
+
+def _item_names_json(conn: Connection) -> None:
+    """Item.names as a JSON array of readable names; JSONB on Postgres"""
+    is_postgres = conn.dialect.name == "postgresql"
+    if is_postgres:
+        column_type = conn.execute(text(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = 'item' AND column_name = 'names'"
+        )).scalar()
+        if column_type == "jsonb":
+            return
+
+    for item_id, raw in conn.execute(text("SELECT id, names FROM item")).fetchall():
+        cleaned = json.dumps(_clean_names(raw), ensure_ascii=False)
+        if cleaned != raw:
+            conn.execute(text("UPDATE item SET names = :names WHERE id = :id"), {"names": cleaned, "id": item_id})
+
+    if is_postgres:
+        conn.execute(text("ALTER TABLE item ALTER COLUMN names TYPE jsonb USING names::jsonb"))
+
+
+def _item_names_trigram(conn: Connection) -> None:
+    """Trigram index for alias search (Postgres only; needs the pg_trgm extension)"""
+    if conn.dialect.name != "postgresql":
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_item_names_trgm ON item USING gin ((names::text) gin_trgm_ops)"
+            ))
+    except Exception as e:
+        # Managed databases may not allow the extension; alias lookups then scan the owner's items
+        print(f"⚠️ Trigram index skipped: {str(e)[:100]}")
+
+
+def _analytics_composite_indexes(conn: Connection) -> None:
+    """Dashboard and bill history filter by owner first, then by date (and category)"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bill_owner_date ON bill (owner_id, bill_date DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_saleitem_owner_date ON saleitem (owner_id, sale_date)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_saleitem_owner_category_date ON saleitem (owner_id, item_category, sale_date)"
+    ))
+
+
+def _sales_rollups_backfill(conn: Connection) -> None:
+    """Fill daily_sales / hourly_item_sales from existing bills (create_bill maintains them afterwards)"""
+    from sqlmodel import Session
+    from app.services.sales_rollups import rebuild_rollups
+    session = Session(bind=conn)
+    daily, hourly = rebuild_rollups(session)
+    session.flush()
+    session.close()
+    print(f"   - {daily} daily and {hourly} hourly rollup rows")
+
+
+def _bill_history_keyset_index(conn: Connection) -> None:
+    """Bill history pages on (bill_date, id): the index needs id too, so ties need no sort"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_bill_owner_date_id ON bill (owner_id, bill_date DESC, id DESC)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_bill_owner_date"))
+
+
+def _bill_client_id(conn: Connection) -> None:
+    """Idempotency key for bill uploads, unique per owner (NULLs, i.e. older bills, never clash)"""
+    columns = {column["name"] for column in inspect(conn).get_columns("bill")}
+    if "client_id" not in columns:
+        conn.execute(text("ALTER TABLE bill ADD COLUMN client_id VARCHAR(64)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_bill_owner_client ON bill (owner_id, client_id)"))
+
+
+def _alias_lexicon_exact_keys(conn: Connection) -> None:
+    """Lexicon rows were keyed by the lossy phonetic key; drop them so startup rebuilds on exact keys"""
+    if not inspect(conn).has_table("alias_lexicon"):
+        return
+    deleted = conn.execute(text("DELETE FROM alias_lexicon")).rowcount
+    print(f"   - {deleted} phonetic-keyed lexicon rows dropped (rebuilt at startup)")
+
+
+def _pricechangeitem_item_cascade(conn: Connection) -> None:
+    """Deleting a repriced item must not fail on its PriceChangeItem rows: ON DELETE CASCADE"""
+    # SQLite cannot alter a constraint in place and does not enforce foreign keys here
+    if conn.dialect.name != "postgresql" or not inspect(conn).has_table("pricechangeitem"):
+        return
+    for fk in inspect(conn).get_foreign_keys("pricechangeitem"):
+        if fk["referred_table"] != "item" or fk["constrained_columns"] != ["item_id"]:
+            continue
+        if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+            return
+        conn.execute(text(f'ALTER TABLE pricechangeitem DROP CONSTRAINT "{fk["name"]}"'))
+    conn.execute(text(
+        "ALTER TABLE pricechangeitem ADD CONSTRAINT pricechangeitem_item_id_fkey "
+        "FOREIGN KEY (item_id) REFERENCES item (id) ON DELETE CASCADE"
+    ))
+
+
+# (version, name, migration) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "item_unique_owner_master", _item_unique_owner_master),
+    (2, "item_owner_updated_index", _item_owner_updated),
+    (3, "item_names_json", _item_names_json),
+    (4, "item_names_trigram_index", _item_names_trigram),
+    (5, "analytics_composite_indexes", _analytics_composite_indexes),
+    (6, "sales_rollups_backfill", _sales_rollups_backfill),
+    (7, "bill_history_keyset_index", _bill_history_keyset_index),
+    (8, "bill_client_id", _bill_client_id),
+    (9, "alias_lexicon_exact_keys", _alias_lexicon_exact_keys),
+    (10, "pricechangeitem_item_cascade", _pricechangeitem_item_cascade),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_table(conn: Connection) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """))
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def pending_migrations(engine: Engine) -> List[Tuple[int, str]]:
+    applied = set(applied_versions(engine))
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction. Returns the versions applied."""
+    applied_now: List[int] = []
+    with engine.connect() as lock_conn:
+        if engine.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _LOCK_KEY})
+        try:
+            done = set(applied_versions(engine))
+            for version, name, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                print(f"🔨 Applying migration {version}: {name}")
+                with engine.begin() as conn:
+                    migrate(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                        {"v": version, "n": name, "t": datetime.utcnow()},
+                    )
+                applied_now.append(version)
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+                lock_conn.commit()
+    return applied_now
+
+
+def check_migrations(engine: Engine) -> None:
+    """
+    Startup check: apply pending migrations (default), or refuse to start on an
+    out-of-date schema when MIGRATE_ON_STARTUP=0.
+    """
+    pending = pending_migrations(engine)
+    if not pending:
+        print(f"✅ Database schema is current (v{LATEST_VERSION})")
+        return
+    if not MIGRATE_ON_STARTUP:
+        names = ", ".join(f"{version}:{name}" for version, name in pending)
+        raise RuntimeError(f"Database schema is behind ({names}). Run `python migrate.py`.")
+    applied = run_migrations(engine)
+    print(f"✅ Applied {len(applied)} migration(s), schema is now v{LATEST_VERSION}")
@@ -1,11 +1,14 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
-from datetime import datetime
+from sqlalchemy import Index, Column, JSON, text
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Optional, List
+from datetime import datetime, date
 
 # 1. Base Model (Fields every table should have)
 class TimestampModel(SQLModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Refreshed on every ORM update (bulk SQL writes set it explicitly)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 # 2. User Model (The Shop Owner)
 class User(TimestampModel, table=True):
@@ -28,24 +31,50 @@ class OTP(SQLModel, table=True):
 
 # 4. Item Model (Your Inventory) - MODIFIED FOR MULTI-LANGUAGE SUPPORT
 class Item(TimestampModel, table=True):
+    # One row per (shop, master list item); bulk writes upsert against this.
+    # (owner_id, updated_at) serves /items/changes delta sync and the list ETag.
+    __table_args__ = (
+        Index("uq_item_owner_master", "owner_id", "master_id", unique=True),
+        Index("ix_item_owner_updated", "owner_id", "updated_at"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     
     # NEW: Store the master list ID from frontend (e.g., "101", "202", "FB1")
     # This allows us to match items between frontend and backend uniquely
     master_id: str = Field(index=True)
     
-    # NEW: Store all names as a JSON string array
-    # Example: '["Chawal", "Rice", "चावल", "तांदूळ"]'
-    # This replaces the old 'name' and 'hindi_name' fields
-    names: str  # JSON string containing array of names
+    # All names of the item, read and written as a Python list
+    # Example: ["Chawal", "Rice", "चावल", "तांदूळ"]
+    # JSONB on Postgres (GIN/trigram indexed for alias search), JSON text on SQLite
+    names: List[str] = Field(sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False))
     
     category: str = Field(index=True)     # e.g., "Anaaj", "Dal", "Masale"
     price: float                          # e.g., 0.0 (unset) or 45.0 (set by user)
     unit: str                             # e.g., "kg", "litre", "plate"
     owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
 
+# 4b. Item Tombstone (deleted items, so /items/changes can tell clients to drop them)
+class ItemTombstone(SQLModel, table=True):
+    __table_args__ = (
+        Index("uq_tombstone_owner_master", "owner_id", "master_id", unique=True),
+        Index("ix_tombstone_owner_deleted", "owner_id", "deleted_at"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id")
+    master_id: str
+    deleted_at: datetime = Field(default_factory=datetime.utcnow)
+
 # 5. Bill Model (Saved Bills)
 class Bill(TimestampModel, table=True):
+    __table_args__ = (
+        # Bill history: one owner's bills, newest first, keyset-paginated on (bill_date, id)
+        Index("ix_bill_owner_date_id", "owner_id", text("bill_date DESC"), text("id DESC")),
+        # A retried upload of the same bill is recognised by its client key
+        Index("uq_bill_owner_client", "owner_id", "client_id", unique=True),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id", index=True)
     
@@ -64,9 +93,18 @@ class Bill(TimestampModel, table=True):
     # Metadata
     bill_date: datetime = Field(default_factory=datetime.utcnow, index=True)
     payment_method: Optional[str] = "cash"  # cash, upi, card
+    
+    # Idempotency key generated by the app (None for bills saved before keys existed)
+    client_id: Optional[str] = Field(default=None, max_length=64)
 
 # 6. Sale Item Model (Individual items sold - for analytics)
 class SaleItem(TimestampModel, table=True):
+    # Dashboard breakdowns: one owner's sales in a date range, optionally per category
+    __table_args__ = (
+        Index("ix_saleitem_owner_date", "owner_id", "sale_date"),
+        Index("ix_saleitem_owner_category_date", "owner_id", "item_category", "sale_date"),
+    )
+    
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id", index=True)
     bill_id: int = Field(foreign_key="bill.id", index=True)
@@ -81,4 +119,78 @@ class SaleItem(TimestampModel, table=True):
     
     # Sale metadata
     sale_date: datetime = Field(default_factory=datetime.utcnow, index=True)
-    hour_of_day: int = Field(index=True)  # 0-23 for peak hour analysis
\ No newline at end of file
+    hour_of_day: int = Field(index=True)  # 0-23 for peak hour analysis
+
+# 7. Alias Lexicon (shared by all shops) - built from every shop's Item.names
+class AliasLexiconEntry(TimestampModel, table=True):
+    __tablename__ = "alias_lexicon"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    key: str = Field(index=True, unique=True)   # Exact (spelling) key of one name, e.g. "chaval"
+    names: str                                  # JSON array, most common first: '["Chawal", "Rice", "चावल"]'
+    shop_count: int                             # Shops whose inventory has this name
+    version: int = Field(index=True)            # Lexicon build that wrote this row
+
+# 8. Inventory Import Batch (voice-parse result staged until the owner confirms it)
+class InventoryImportBatch(TimestampModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id", index=True)
+    status: str = Field(default="staged")   # staged, committed
+    raw_text: str
+    
+    # Parsed items as a JSON array, one entry per "line" the client can accept/edit
+    # Example: '[{"line":0,"name":"Gehun","price":25,"unit":"kg","category":"Anaaj","aliases":["Wheat"]}]'
+    items_json: str
+    item_count: int = 0
+    committed_at: Optional[datetime] = None
+
+# 9. Price Change (one bulk repricing, kept so it can be rolled back)
+class PriceChange(TimestampModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id", index=True)
+    operation: str                      # percent, delta, set, round
+    value: float
+    filter_json: str                    # Filter as sent, e.g. '{"category": "Dal"}'
+    item_count: int = 0
+    rolled_back_at: Optional[datetime] = None
+
+# 10. Price Change Item (prior and new price of every item a repricing touched)
+class PriceChangeItem(SQLModel, table=True):
+    __table_args__ = (Index("ix_pricechangeitem_change_item", "price_change_id", "item_id"),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    price_change_id: int = Field(foreign_key="pricechange.id")
+    item_id: int = Field(foreign_key="item.id", ondelete="CASCADE")   # A deleted item leaves nothing to roll back
+    master_id: str
+    old_price: float
+    new_price: float
+
+# 11. Daily Sales (per-shop rollup of Bill, maintained by create_bill)
+class DailySales(SQLModel, table=True):
+    __tablename__ = "daily_sales"
+    __table_args__ = (Index("uq_daily_sales_owner_date", "owner_id", "sale_date", unique=True),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id")
+    sale_date: date                     # Shop-local date (SHOP_TIMEZONE)
+    bill_count: int = 0
+    revenue: float = 0.0
+
+# 12. Hourly Item Sales (per-shop rollup of SaleItem, maintained by create_bill)
+class HourlyItemSales(SQLModel, table=True):
+    __tablename__ = "hourly_item_sales"
+    __table_args__ = (
+        Index("uq_hourly_item_sales_key", "owner_id", "sale_date", "hour", "item_category", "item_name", "unit",
+              unique=True),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id")
+    sale_date: date                     # Shop-local date
+    hour: int                           # Shop-local hour, 0-23
+    item_category: str
+    item_name: str
+    unit: str
+    quantity: float = 0.0
+    sales: float = 0.0                  # Sum of SaleItem.total_price
+    line_count: int = 0                 # SaleItem rows (times sold)
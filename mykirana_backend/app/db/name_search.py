@@ -0,0 +1,25 @@
+"""
+SQL conditions over Item.names (any alias of an item).
+Both match the JSON text of the names array: on Postgres that is names::text of the JSONB
+column (migration 3, item_names_json, in app/db/migrations.py), which the ix_item_names_trgm
+trigram index covers (migration 4); on SQLite it is the stored JSON string.
+"""
+import json
+from sqlalchemy import cast, Text
+from app.db.models import Item
+
+
+def _escape_like(text: str) -> str:
+    # "!" rather than backslash: backslash escaping differs between Postgres settings
+    return text.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def names_contain(fragment: str):
+    """Some name of the item contains `fragment` (case-insensitive)"""
+    return cast(Item.names, Text).ilike(f"%{_escape_like(fragment)}%", escape="!")
+
+
+def has_name(name: str):
+    """One of the item's names is exactly `name` (case-insensitive)"""
+    quoted = json.dumps(name, ensure_ascii=False)
+    return cast(Item.names, Text).ilike(f"%{_escape_like(quoted)}%", escape="!")
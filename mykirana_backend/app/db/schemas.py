@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 # 1. Login/OTP Request
 class OTPRequest(BaseModel):
@@ -48,6 +48,26 @@ class ItemUpdate(ItemBase):
     """Schema for updating existing items"""
     pass
 
+class BulkItemsRequest(BaseModel):
+    """Items to create or update in one transaction (same fields as ItemCreate)"""
+    items: List[ItemCreate]
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]  # master_ids
+
+class RepriceFilter(BaseModel):
+    """Items to reprice; all given conditions must match"""
+    category: Optional[str] = None
+    name_contains: Optional[str] = None     # Matches any of the item's names, case-insensitive
+    ids: Optional[List[str]] = None         # master_ids
+
+class RepriceRequest(BaseModel):
+    filter: RepriceFilter
+    operation: Literal["percent", "delta", "set", "round"]
+    value: float                            # percent: +8 / -5, delta: +5 (₹), set: 120, round: step (5 -> nearest ₹5)
+    round_to: Optional[float] = None        # Optional rounding step applied after percent/delta
+    dry_run: bool = False                   # Preview the new prices without saving
+
 class ItemResponse(ItemBase):
     id: str  # master_id - frontend identifier (e.g. "101", "FB1")
     owner_id: int
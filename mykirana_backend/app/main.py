@@ -2,8 +2,12 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.db.database import create_db_and_tables
-from app.api import auth, items, voice, voice_inventory, sms_share, analytics
+from sqlmodel import Session
+from app.db.database import create_db_and_tables, engine
+from app.db.migrations import check_migrations
+from app.api import auth, items, voice, voice_inventory, sms_share, analytics, internal
+from app.services.gemini_client import gemini_client
+from app.services.alias_lexicon import alias_lexicon, rebuild_alias_lexicon
 
 # CORS - allow frontend to call API (set FRONTEND_URL in Render for production)
 ALLOWED_ORIGINS = os.getenv("FRONTEND_URL", "http://localhost:3000").split(",")
@@ -17,12 +21,22 @@ async def lifespan(app: FastAPI):
     try:
         create_db_and_tables()
         print("✅ Database connected successfully!")
+        check_migrations(engine)
+    except RuntimeError:
+        raise   # Schema is behind and MIGRATE_ON_STARTUP=0 - don't serve on it
     except Exception as e:
         print(f"⚠️ Database connection failed: {str(e)[:100]}")
         print("⚠️ Server will start but database operations will fail")
         print("💡 TIP: Check DATABASE_CONNECTION_FIX.md for solutions")
+    try:
+        with Session(engine) as session:
+            if alias_lexicon.load(session) == 0:
+                rebuild_alias_lexicon(session)
+    except Exception as e:
+        print(f"⚠️ Alias lexicon not loaded: {str(e)[:100]}")
     yield
     print("Shutdown: Closing connections...")
+    await gemini_client.aclose()
 
 app = FastAPI(lifespan=lifespan, title="SnapBill API", version="1.0.0")
 
@@ -41,6 +55,7 @@ app.include_router(voice.router, prefix="/voice", tags=["Voice AI"])
 app.include_router(voice_inventory.router, prefix="/inventory", tags=["Voice Inventory"])
 app.include_router(sms_share.router, prefix="/sms", tags=["SMS Sharing"])
 app.include_router(analytics.router, prefix="/analytics", tags=["Analytics & Dashboard"])
+app.include_router(internal.router, prefix="/internal", tags=["Internal"])
 
 @app.get("/")
 def health_check():
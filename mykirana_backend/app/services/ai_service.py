@@ -1,18 +1,90 @@
-import google.generativeai as genai
+import asyncio
 import os
 import json
+import time
 from app.db.models import Item
-from typing import List, Dict, Any, Optional
+from app.services.local_parser import parse_billing_command
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.intent_classifier import VoiceIntent
+from app.services.model_router import model_router, generate_json
+from app.services.gemini_client import gemini_client, GeminiError
+from app.services.stream_parser import BillStreamParser
+from app.core import metrics
+from typing import List, Dict, Any, Optional, Union, Callable, AsyncIterator, Tuple
 
-# 1. Configure Gemini
+# 1. Check Gemini configuration (calls go through the async REST client)
 api_key = os.getenv("GEMINI_API_KEY")
 if not api_key:
     print("\n❌ ERROR: GEMINI_API_KEY is missing!\n")
-else:
-    genai.configure(api_key=api_key, transport="rest")
+
+# 2. Latency controls for one voice request
+VOICE_LATENCY_BUDGET_SECONDS = float(os.getenv("VOICE_LATENCY_BUDGET_SECONDS", "12"))
+MODEL_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("MODEL_ATTEMPT_TIMEOUT_SECONDS", "6"))
+VOICE_HEDGING_ENABLED = os.getenv("VOICE_HEDGING", "1").lower() in ("1", "true", "yes")
+# Hedge delay used until a model has enough latency samples for a p90
+DEFAULT_HEDGE_DELAY_SECONDS = float(os.getenv("VOICE_HEDGE_DELAY_SECONDS", "2.5"))
+MAX_PARALLEL_ATTEMPTS = 2
+
+# 3. Prompt inventory pruning: small shops send everything, big shops only relevant items
+PROMPT_PRUNE_MIN_ITEMS = int(os.getenv("PROMPT_PRUNE_MIN_ITEMS", "40"))
+PROMPT_MAX_MATCHED_ITEMS = 30
+PROMPT_FREQUENT_ITEMS = 10
+
+SYSTEM_ERROR_RESPONSE = {
+    "type": "ERROR",
+    "items": [],
+    "msg": "सिस्टम त्रुटि: कृपया बाद में पुनः प्रयास करें।", 
+    "should_stop": False
+}
+
+# Only sent when the request carries business context (analytics / recent bills)
+QUERY_HANDLING_RULES = """QUERY HANDLING (Business Intelligence):
+1. If user asks about "recent bill" or "last bill" or "pichla bill":
+   - Check recent_bills data
+   - Tell them the last bill amount and items
+   - Example: "Aapka pichla bill tha ₹250 ka, jisme 2kg chawal aur 1 litre tel tha"
+
+2. If user asks about "top selling" or "sabse zyada bikne wala":
+   - Check top_selling_items from analytics
+   - Tell them the top 3 items
+   - Example: "Sabse zyada bikne wale items hain: Chawal (50kg), Atta (40kg), aur Dal (30kg)"
+
+3. If user asks about "total sales" or "kitna business" or "revenue":
+   - Check total_revenue from analytics
+   - Tell them the revenue
+   - Example: "Pichle 30 din mein aapka total business ₹45,000 ka raha hai"
+
+4. If user asks about "peak time" or "busy hours" or "sabse zyada sale kab":
+   - Check peak_hours from analytics
+   - Tell them the busiest hours
+   - Example: "Aapki dukaan sabse zyada busy rehti hai 5PM se 8PM ke beech"
+
+5. If user asks for "business tips" or "advice" or "suggestion":
+   - Analyze their data (revenue, top items, peak hours, categories)
+   - Give 2-3 specific actionable tips based on THEIR data
+   - Example: "Aapke data ke hisaab se: 1) Chawal sabse zyada bikta hai, iska stock hamesha rakhein. 2) Shaam 5-8 baje sabse zyada customer aate hain, us time extra staff rakhein. 3) Dal category mein sales kam hai, discount offer karke dekho"
+
+6. If user asks about "average bill" or "average sale":
+   - Check average_bill_value from analytics
+   - Example: "Har bill ka average ₹180 hai"
+
+7. If user asks about categories or "category wise sales":
+   - Check category_breakdown
+   - Tell them top categories
+   - Example: "Anaaj category mein sabse zyada sales hai (40%), phir Masale (25%)"
+
+"""
 
 class AIService:
-    def __init__(self):
+    def __init__(
+        self,
+        latency_budget: float = VOICE_LATENCY_BUDGET_SECONDS,
+        attempt_timeout: float = MODEL_ATTEMPT_TIMEOUT_SECONDS,
+        hedging: bool = VOICE_HEDGING_ENABLED
+    ):
+        self.latency_budget = latency_budget
+        self.attempt_timeout = attempt_timeout
+        self.hedging = hedging
         # EXACT MODELS FROM YOUR LIST (Prioritizing Lite for better quota)
         self.candidate_models = [
             "gemini-2.5-flash",          # Try this first (Latest & Fast)
@@ -21,33 +93,189 @@ class AIService:
             "gemini-2.0-flash-001"       # Alternative version
         ]
 
-    def process_voice_command(
+    async def process_voice_command(
         self, 
         user_text: str, 
-        inventory: List[Item],
+        inventory: Union[InventorySnapshot, List[Item]],
         dashboard_data: Optional[Dict[str, Any]] = None,
-        recent_bills: Optional[List[Dict[str, Any]]] = None
+        recent_bills: Optional[List[Dict[str, Any]]] = None,
+        frequent_items: Optional[List[str]] = None,
+        conversation: Optional[List[Tuple[str, str]]] = None,
+        intent: Optional[VoiceIntent] = None
     ):
+        """
+        `intent` is the classify_intent result when the caller already has one: its local
+        parse is reused instead of parsing the transcript again.
+        """
         print(f"\n🎤 Processing Voice: {user_text}")
         
-        # CRITICAL: Filter inventory to only include items with price > 0
-        filtered_inventory = [item for item in inventory if item.price > 0]
-        print(f"📦 Total Inventory Items: {len(inventory)}")
-        print(f"✅ Items with Price > 0: {len(filtered_inventory)}")
+        # Compiled inventory (price > 0 subset, decoded names, prompt JSON) - built once per version
+        snapshot = inventory if isinstance(inventory, InventorySnapshot) else InventorySnapshot.from_items(inventory)
+        print(f"📦 Total Inventory Items: {len(snapshot.records)}")
+        print(f"✅ Items with Price > 0: {len(snapshot.priced)}")
         
-        # Prepare Inventory with names array support
-        inventory_list = []
-        for item in filtered_inventory:
-            # Parse names from JSON string
-            names_array = json.loads(item.names) if isinstance(item.names, str) else item.names
-            inventory_list.append({
-                "names": names_array,
-                "price": item.price,
-                "unit": item.unit,
-                "category": item.category
-            })
+        # FAST PATH: Simple "qty unit item" lines are parsed locally, no network call
+        if intent is not None:
+            local_result = intent.local_result
+        else:
+            local_result = parse_billing_command(user_text, snapshot.billing_aliases, snapshot.billing_item)
+        if local_result is not None:
+            print(f"⚡ Local parser handled it: {len(local_result['items'])} items")
+            return local_result
         
-        inventory_json = json.dumps(inventory_list, ensure_ascii=False)
+        prompt = self.build_prompt(user_text, snapshot, dashboard_data, recent_bills, frequent_items, conversation)
+        
+        result = await self.generate(prompt, parse_model_json)
+        if result is not None:
+            return result
+        
+        return {**SYSTEM_ERROR_RESPONSE, "items": []}
+
+    async def generate(self, prompt: str, parse: Callable[[str], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        AUTO-DISCOVERY LOOP with deadlines and hedging.
+        Models are tried healthiest first, each attempt gets its own deadline, and the whole
+        request stays inside the latency budget. With hedging on, if the running model has not
+        answered by its observed p90, the next candidate is fired concurrently and the first
+        valid JSON wins (the loser is cancelled).
+        Returns None when every model failed or the budget ran out.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.latency_budget
+        candidates = model_router.order(self.candidate_models)
+        next_index = 0
+        pending: Dict[asyncio.Task, str] = {}
+        last_error = ""
+
+        def launch() -> str:
+            nonlocal next_index
+            model_name = candidates[next_index]
+            next_index += 1
+            timeout = max(0.1, min(self.attempt_timeout, deadline - loop.time()))
+            print(f"🔄 Trying model: {model_name} (deadline {timeout:.1f}s)...")
+            task = asyncio.create_task(generate_json(model_name, prompt, parse, timeout=timeout))
+            pending[task] = model_name
+            return model_name
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    last_error = f"Latency budget of {self.latency_budget:.1f}s exhausted"
+                    break
+                if not pending:
+                    if next_index >= len(candidates):
+                        break
+                    launch()
+                    continue
+
+                # Wait for an answer, or until it's time to hedge with the next model
+                wait_for = remaining
+                can_hedge = self.hedging and next_index < len(candidates) and len(pending) < MAX_PARALLEL_ATTEMPTS
+                if can_hedge:
+                    newest = list(pending.values())[-1]
+                    hedge_delay = model_router.latency_p90(newest) or DEFAULT_HEDGE_DELAY_SECONDS
+                    wait_for = min(wait_for, hedge_delay)
+
+                done, _ = await asyncio.wait(pending.keys(), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge:
+                        print("⏱️ No answer yet, hedging with next model")
+                        launch()
+                    continue
+
+                winner = None
+                for task in done:
+                    model_name = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if winner is None:
+                            print(f"✅ SUCCESS! Model '{model_name}' worked.")
+                            winner = task.result()
+                        continue
+                    print(f"⚠️ {model_name} Failed: {error!r}")
+                    last_error = str(error) or repr(error)
+                if winner is not None:
+                    return winner
+        finally:
+            # Cancel hedged losers / attempts still running when the budget ran out
+            for task in pending:
+                task.cancel()
+
+        print(f"\n❌ ALL MODELS FAILED. Last Error: {last_error}\n")
+        return None
+
+    async def stream_voice_command(
+        self,
+        user_text: str,
+        snapshot: InventorySnapshot,
+        dashboard_data: Optional[Dict[str, Any]] = None,
+        recent_bills: Optional[List[Dict[str, Any]]] = None,
+        frequent_items: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of process_voice_command.
+        Yields ("field", {...}) and ("item", {...}) events as soon as the model has produced
+        them, then ("done", full_response). A model that fails before producing any event is
+        skipped for the next candidate; a failure mid-stream ends with the system error.
+        """
+        prompt = self.build_prompt(user_text, snapshot, dashboard_data, recent_bills, frequent_items)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.latency_budget
+        last_error = ""
+
+        for model_name in model_router.order(self.candidate_models):
+            if loop.time() >= deadline:
+                last_error = f"Latency budget of {self.latency_budget:.1f}s exhausted"
+                break
+            print(f"🔄 Streaming from model: {model_name}...")
+            parser = BillStreamParser()
+            emitted = False
+            start = time.perf_counter()
+            stream = gemini_client.stream_content(model_name, prompt)
+            try:
+                while True:
+                    timeout = max(0.1, min(self.attempt_timeout, deadline - loop.time()))
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    for event in parser.feed(chunk):
+                        emitted = True
+                        yield event
+                result = parser.finish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status = e.status_code if isinstance(e, GeminiError) else (200 if isinstance(e, ValueError) else None)
+                model_router.record_failure(model_name, time.perf_counter() - start, status, str(e) or repr(e),
+                                            retryable=not isinstance(e, ValueError))
+                print(f"⚠️ {model_name} stream Failed: {e!r}")
+                last_error = str(e) or repr(e)
+                if emitted:
+                    break  # The client already has partial output; don't mix in another model's
+                continue
+            finally:
+                await stream.aclose()
+
+            model_router.record_success(model_name, time.perf_counter() - start)
+            print(f"✅ SUCCESS! Model '{model_name}' streamed.")
+            yield ("done", result)
+            return
+
+        print(f"\n❌ STREAMING FAILED. Last Error: {last_error}\n")
+        yield ("done", {**SYSTEM_ERROR_RESPONSE, "items": []})
+
+    def build_prompt(
+        self,
+        user_text: str,
+        snapshot: InventorySnapshot,
+        dashboard_data: Optional[Dict[str, Any]] = None,
+        recent_bills: Optional[List[Dict[str, Any]]] = None,
+        frequent_items: Optional[List[str]] = None,
+        conversation: Optional[List[Tuple[str, str]]] = None
+    ) -> str:
+        inventory_json, inventory_label = self._prompt_inventory(user_text, snapshot, frequent_items)
         
         # Prepare business analytics context
         analytics_context = ""
@@ -79,6 +307,18 @@ RECENT BILLS (Last 10):
 {json.dumps(recent_bills[:10], ensure_ascii=False, indent=2)}
 """
         
+        # Previous turns of a voice session (e.g. the user is answering "Aam ki keemat kya hai?")
+        conversation_context = ""
+        if conversation:
+            turns = "\n".join(f'- User: "{said}" -> You: "{reply}"' for said, reply in conversation)
+            conversation_context = f"""
+PREVIOUS TURNS (the user may be answering your last question - use it to complete the bill):
+{turns}
+"""
+        
+        # Billing-only requests skip the BI rules entirely (much smaller prompt)
+        query_rules = QUERY_HANDLING_RULES if (analytics_context or bills_context) else ""
+        
         prompt = f"""You are Vyamit AI, a female voice assistant for "Vyamit AI App". Detect the language user is speaking and Answer ONLY in that language but use Latin Script (Hinglish/Roman script) for giving the billing items to the app that are going to print. Use Devanagari script only for the response question or answer the query of user.
 
 PERSONALITY:
@@ -94,50 +334,15 @@ CUSTOMER NAME EXTRACTION:
 - If NO customer name mentioned, use "Walk-in" as default
 - Customer name should be in the "customer_name" field
 
-INVENTORY (Only items with configured prices): {inventory_json}
+INVENTORY ({inventory_label}): {inventory_json}
 
 {analytics_context}
 
 {bills_context}
-
+{conversation_context}
 USER SAID: "{user_text}"
 
-QUERY HANDLING (Business Intelligence):
-1. If user asks about "recent bill" or "last bill" or "pichla bill":
-   - Check recent_bills data
-   - Tell them the last bill amount and items
-   - Example: "Aapka pichla bill tha ₹250 ka, jisme 2kg chawal aur 1 litre tel tha"
-
-2. If user asks about "top selling" or "sabse zyada bikne wala":
-   - Check top_selling_items from analytics
-   - Tell them the top 3 items
-   - Example: "Sabse zyada bikne wale items hain: Chawal (50kg), Atta (40kg), aur Dal (30kg)"
-
-3. If user asks about "total sales" or "kitna business" or "revenue":
-   - Check total_revenue from analytics
-   - Tell them the revenue
-   - Example: "Pichle 30 din mein aapka total business ₹45,000 ka raha hai"
-
-4. If user asks about "peak time" or "busy hours" or "sabse zyada sale kab":
-   - Check peak_hours from analytics
-   - Tell them the busiest hours
-   - Example: "Aapki dukaan sabse zyada busy rehti hai 5PM se 8PM ke beech"
-
-5. If user asks for "business tips" or "advice" or "suggestion":
-   - Analyze their data (revenue, top items, peak hours, categories)
-   - Give 2-3 specific actionable tips based on THEIR data
-   - Example: "Aapke data ke hisaab se: 1) Chawal sabse zyada bikta hai, iska stock hamesha rakhein. 2) Shaam 5-8 baje sabse zyada customer aate hain, us time extra staff rakhein. 3) Dal category mein sales kam hai, discount offer karke dekho"
-
-6. If user asks about "average bill" or "average sale":
-   - Check average_bill_value from analytics
-   - Example: "Har bill ka average ₹180 hai"
-
-7. If user asks about categories or "category wise sales":
-   - Check category_breakdown
-   - Tell them top categories
-   - Example: "Anaaj category mein sabse zyada sales hai (40%), phir Masale (25%)"
-
-CRITICAL RULES FOR PRICE HANDLING:
+{query_rules}CRITICAL RULES FOR PRICE HANDLING:
 1. If user mentions price with item (e.g., "1kg chawal 120 rs kilo" or "5rs wali 6 maggie packet"):
    - EXTRACT the price from user's speech
    - CALCULATE total: quantity × price
@@ -174,10 +379,11 @@ OUTPUT JSON FORMAT:
 {{
   "type": "BILL" or "ERROR" or "GREETING" or "QUERY",
   "customer_name": "Customer Name or Walk-in",
-  "items": [ {{"name": "ItemName", "qty_display": "1kg", "rate": 50.0, "total": 50.0, "unit": "kg"}} ],
   "msg": "Response in Hinglish (Latin script only, NO Devanagari, answer in short)",
+  "items": [ {{"name": "ItemName", "qty_display": "1kg", "rate": 50.0, "total": 50.0, "unit": "kg"}} ],
   "should_stop": false
 }}
+Keep the keys in exactly this order ("msg" before "items").
 
 if everything is fine with quantity, price and item and you have no questions then give response msg as "Saaman Bill mein jod diya gaya hai" do not read the whole item list price and all
 
@@ -190,28 +396,51 @@ EXAMPLES:
 - User: "business tips do" → {{"type": "QUERY", "customer_name": "Walk-in", "items": [], "msg": "Aapke data ke hisaab se: Chawal sabse zyada bikta hai, stock maintain rakhein. Shaam 5-8 baje peak time hai, us waqt ready rahein."}}
 - User: "aam" (ONLY aam, not in inventory, no price) → {{"type": "ERROR", "customer_name": "Walk-in", "items": [], "msg": "Aam ki keemat kya hai?"}}"""
 
-        # AUTO-DISCOVERY LOOP
-        last_error = ""
-        for model_name in self.candidate_models:
-            try:
-                print(f"🔄 Trying model: {model_name}...")
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                
-                print(f"✅ SUCCESS! Model '{model_name}' worked.")
-                
-                clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                return json.loads(clean_text)
-                
-            except Exception as e:
-                print(f"⚠️ {model_name} Failed: {e}")
-                last_error = str(e)
-                continue  # Try the next model
-        
-        print(f"\n❌ ALL MODELS FAILED. Last Error: {last_error}\n")
-        return {
-            "type": "ERROR",
-            "items": [],
-            "msg": "सिस्टम त्रुटि: कृपया बाद में पुनः प्रयास करें।", 
-            "should_stop": False
-        }
\ No newline at end of file
+        metrics.observe("prompt_chars", len(prompt))
+        metrics.observe("prompt_tokens_estimate", len(prompt) // 4)
+        return prompt
+
+    def _prompt_inventory(
+        self,
+        user_text: str,
+        snapshot: InventorySnapshot,
+        frequent_items: Optional[List[str]] = None
+    ):
+        """
+        Inventory JSON for the prompt.
+        Large inventories are pruned to items whose names fuzzily match the utterance,
+        plus a few frequent sellers, instead of sending thousands of tokens every time.
+        """
+        if len(snapshot.priced) <= PROMPT_PRUNE_MIN_ITEMS:
+            metrics.increment("prompt_inventory_full")
+            metrics.observe("prompt_inventory_items", len(snapshot.priced))
+            return snapshot.prompt_json, "Only items with configured prices"
+
+        selected = snapshot.relevant_items(user_text, limit=PROMPT_MAX_MATCHED_ITEMS)
+        seen = {id(record) for record in selected}
+        for name in (frequent_items or [])[:PROMPT_FREQUENT_ITEMS]:
+            record = snapshot.find_by_name(name)
+            if record is not None and record.price > 0 and id(record) not in seen:
+                selected.append(record)
+                seen.add(id(record))
+
+        metrics.increment("prompt_inventory_pruned")
+        metrics.observe("prompt_inventory_items", len(selected))
+        inventory_json = json.dumps(
+            [{"names": list(r.names), "price": r.price, "unit": r.unit, "category": r.category} for r in selected],
+            ensure_ascii=False
+        )
+        label = (f"{len(selected)} of {len(snapshot.priced)} priced items - the ones matching what the user said "
+                 "and frequent sellers; treat anything not listed as not in inventory")
+        return inventory_json, label
+
+
+def is_system_error(response: Dict[str, Any]) -> bool:
+    """True for the fallback returned when no model answered (never cache it)"""
+    return response.get("type") == "ERROR" and response.get("msg") == SYSTEM_ERROR_RESPONSE["msg"]
+
+
+def parse_model_json(response_text: str) -> Dict[str, Any]:
+    """Strip markdown fences from a model reply and decode the JSON"""
+    clean_text = response_text.replace("```json", "").replace("```", "").strip()
+    return json.loads(clean_text)
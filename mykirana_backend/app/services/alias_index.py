@@ -0,0 +1,315 @@
+"""
+Alias Index
+Lookup of inventory items by any of their names, in Latin or Devanagari script.
+Names and spoken words are transliterated to Latin ("चावल" -> "chaaval") and indexed three ways:
+an exact spelling key hash and prefix trie (lossless folds only: "chaawal" = "chawal"), and
+character-trigram postings over a rough Hinglish phonetic key for fuzzy matches. The phonetic
+key is lossy ("dalia" ~ "dal", "chai" ~ "cha"), so it only ever proposes fuzzy candidates.
+"""
+import heapq
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Iterable, Tuple, Set, Optional
+
+# Rewrites that only merge ways of writing the same sound (safe for exact matches)
+_SPELLING_RULES = [
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"a{2,}"), "a"),        # daal -> dal, chaawal -> chawal
+    (re.compile(r"w"), "v"),
+]
+
+# First letter of a folded vowel pair -> what the pair folds to (ee -> i, oo -> u)
+_HALF_FOLDED = {"e": "i", "o": "u"}
+
+# Ordered rewrites that fold common Hinglish spelling variants together (lossy: fuzzy only)
+_PHONETIC_RULES = [
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"(.)\1+"), r"\1"),     # doubled letters: aa -> a, ll -> l
+    (re.compile(r"ai"), "e"),           # paise ~ pese
+    (re.compile(r"au"), "o"),           # pakauda ~ pakoda
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"q"), "k"),
+    (re.compile(r"ck"), "k"),
+    (re.compile(r"([bcdgjkpt])h"), r"\1"),  # aspirates: kh -> k, dh -> d
+    (re.compile(r"y$"), "i"),
+    (re.compile(r"(?<=.)[aeiou]+$"), ""),   # trailing vowel: aata -> aat, maggie -> mag
+]
+
+# Devanagari -> Latin, spelled the way shopkeepers type Hinglish (not strict ISO 15919)
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॅ": "e", "ॉ": "o",
+}
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s", "ह": "h", "ळ": "l",
+}
+# Consonant + nukta (़)
+_NUKTA_CONSONANTS = {"क": "q", "ख": "kh", "ग": "g", "ज": "z", "ड": "r", "ढ": "rh", "फ": "f"}
+_PRECOMPOSED_NUKTA = {"क़": "क", "ख़": "ख", "ग़": "ग", "ज़": "ज", "ड़": "ड", "ढ़": "ढ", "फ़": "फ"}
+_NASALS = {"ं": "n", "ँ": "n"}
+_NUKTA, _VIRAMA, _VISARGA = "़", "्", "ः"
+_DIGITS = {chr(0x0966 + d): str(d) for d in range(10)}
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+
+MIN_FUZZY_SCORE = 0.6
+# A single item is only resolved from fuzzy evidence this strong
+MIN_RESOLVE_SCORE = 0.75
+# Shorter exact keys are never matched ("ta", "te" say nothing about which item)
+MIN_EXACT_KEY_CHARS = 3
+
+
+def transliterate(text: str) -> str:
+    """
+    Devanagari -> Latin ("चावल" -> "chaaval", "सरसों" -> "sarson"). Latin text passes through.
+    Drops the inherent "a" at the end of a word and between syllables (VCaCV -> VCCV),
+    which is how Hindi is actually pronounced and typed.
+    """
+    if not _DEVANAGARI.search(text):
+        return text
+    for composed, base in _PRECOMPOSED_NUKTA.items():
+        text = text.replace(composed, base + _NUKTA)
+    return " ".join(_transliterate_word(word) for word in text.split())
+
+
+def _transliterate_word(word: str) -> str:
+    # Syllables as [consonant, vowel, inherent]; inherent=True means the vowel is the implicit "a"
+    syllables: List[list] = []
+    out: List[Any] = []
+    i = 0
+    while i < len(word):
+        ch = word[i]
+        nxt = word[i + 1] if i + 1 < len(word) else ""
+        if ch in _CONSONANTS:
+            consonant = _CONSONANTS[ch]
+            if nxt == _NUKTA:
+                consonant = _NUKTA_CONSONANTS.get(ch, consonant)
+                i += 1
+                nxt = word[i + 1] if i + 1 < len(word) else ""
+            syllable = [consonant, "a", True]
+            if nxt in _MATRAS:
+                syllable[1:] = [_MATRAS[nxt], False]
+                i += 1
+            elif nxt == _VIRAMA:
+                syllable[1:] = ["", False]
+                i += 1
+            syllables.append(syllable)
+            out.append(syllable)
+        elif ch in _VOWELS:
+            syllable = ["", _VOWELS[ch], False]
+            syllables.append(syllable)
+            out.append(syllable)
+        elif ch in _NASALS or ch == _VISARGA:
+            if syllables:
+                syllables[-1][1] += _NASALS.get(ch, "h")
+        elif ch in _DIGITS:
+            out.append(_DIGITS[ch])
+        elif ch != _NUKTA:
+            out.append(ch)
+        i += 1
+
+    # Schwa deletion: word-final, then medial between two voiced syllables
+    if syllables and syllables[-1][2] and len(syllables) > 1:
+        syllables[-1][1] = ""
+    for k in range(1, len(syllables) - 1):
+        prev, current, following = syllables[k - 1], syllables[k], syllables[k + 1]
+        if current[2] and current[1] == "a" and prev[1] and following[0] and following[1]:
+            current[1] = ""
+
+    return "".join(part if isinstance(part, str) else part[0] + part[1] for part in out)
+
+
+@lru_cache(maxsize=65536)
+def spelling_key(word: str) -> str:
+    """Lowercased Latin spelling of a word with only lossless folds ("चीनी" -> "chini" = "cheeni")"""
+    key = re.sub(r"[^a-z0-9]", "", transliterate(word.lower()))
+    for pattern, replacement in _SPELLING_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def _spelling(name: str) -> str:
+    return " ".join(key for key in (spelling_key(word) for word in name.split()) if key)
+
+
+def exact_key(name: str) -> str:
+    """Spelling key of a whole name ("Toor Daal" -> "tur dal"), "" if too short to trust"""
+    key = _spelling(name)
+    return key if len(key.replace(" ", "")) >= MIN_EXACT_KEY_CHARS else ""
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(word: str) -> str:
+    """Rough phonetic spelling of a word in either script (cached: shop vocabularies are small)"""
+    key = re.sub(r"[^a-z0-9]", "", transliterate(word.lower()))
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def name_key(name: str) -> str:
+    """Phonetic key of a whole name ("Toor Daal" -> "tur dal"); lossy, for fuzzy matching only"""
+    return " ".join(key for key in (phonetic_key(word) for word in name.split()) if key)
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "positions")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.positions: List[int] = []   # First MAX_COMPLETIONS items below this node
+
+
+# Completions kept per trie node, so a prefix lookup never walks the subtree
+MAX_COMPLETIONS = 10
+# A unique completion only counts as a match for a name at least this long ("dal" is not Dalda)
+MIN_RESOLVE_PREFIX_CHARS = 4
+
+
+class AliasIndex:
+    """
+    Read-only index over items exposing a `names` sequence.
+    Built once per inventory snapshot.
+    """
+
+    def __init__(self, items: Iterable[Any]):
+        self.items: List[Any] = list(items)
+        self._exact: Dict[str, List[int]] = defaultdict(list)        # whole-name exact key -> item positions
+        self._trie = _TrieNode()                                      # whole-name exact keys, for prefixes
+        self._word_keys: Dict[str, Set[int]] = defaultdict(set)      # phonetic word -> item positions
+        self._postings: Dict[str, Set[str]] = defaultdict(set)       # trigram -> phonetic words
+        self._word_grams: Dict[str, Set[str]] = {}
+
+        for position, item in enumerate(self.items):
+            for name in item.names:
+                key = exact_key(name)
+                if key and position not in self._exact[key]:
+                    self._exact[key].append(position)
+                    self._insert_prefix(key, position)
+
+                for word in name_key(name).split():
+                    if len(word) < 2:
+                        continue
+                    self._word_keys[word].add(position)
+                    if word not in self._word_grams:
+                        grams = trigrams(word)
+                        self._word_grams[word] = grams
+                        for gram in grams:
+                            self._postings[gram].add(word)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def lookup(self, name: str) -> List[Any]:
+        """Items with a name spelt like `name` (any script, lossless folds only), in inventory order"""
+        key = exact_key(name)
+        return [self.items[position] for position in self._exact.get(key, ())] if key else []
+
+    def complete(self, prefix: str, limit: int = MAX_COMPLETIONS) -> List[Any]:
+        """Items with a name starting with `prefix` ("toor" -> Toor Dal), in inventory order"""
+        key = _spelling(prefix)
+        node = self._walk(key)
+        if node is None and key[-1:] in _HALF_FOLDED:
+            # The prefix stops halfway through a folded vowel: "namke|en" is keyed "namki"
+            node = self._walk(key[:-1] + _HALF_FOLDED[key[-1]])
+        return [self.items[position] for position in node.positions[:limit]] if node is not None else []
+
+    def resolve(self, name: str) -> Optional[Any]:
+        """
+        The one item `name` most likely refers to, or None if it is unknown or ambiguous.
+        Tries the exact key, then a unique prefix completion (names of MIN_RESOLVE_PREFIX_CHARS
+        or more), then fuzzy phonetic word matching. For spoken queries only: it guesses.
+        """
+        exact = self.lookup(name)
+        if exact:
+            return exact[0]
+
+        if len("".join(name.split())) >= MIN_RESOLVE_PREFIX_CHARS:
+            completions = self.complete(name, limit=2)
+            if len(completions) == 1:
+                return completions[0]
+
+        ranked = self.search(name, limit=2)
+        if ranked and ranked[0][1] >= MIN_RESOLVE_SCORE and (len(ranked) == 1 or ranked[0][1] > ranked[1][1]):
+            return ranked[0][0]
+        return None
+
+    def search(
+        self, text: str, limit: int = 30, accept: Optional[Callable[[Any], bool]] = None
+    ) -> List[Tuple[Any, float]]:
+        """
+        Items whose name words fuzzily match words in `text`, best first, skipping items
+        `accept` rejects. Score is the sum, over spoken words, of the best Dice coefficient
+        with one of the item's name words - so "toor dal" ranks Toor Dal above Moong Dal.
+        Only the top `limit` are ranked (heap), not every match.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for word in text.split():
+            key = phonetic_key(word)
+            if len(key) < 2:
+                continue
+            best: Dict[int, float] = {}
+            for matched, score in self._match_word(key):
+                for position in self._word_keys[matched]:
+                    if score > best.get(position, 0.0):
+                        best[position] = score
+            for position, score in best.items():
+                scores[position] += score
+
+        candidates = scores.items()
+        if accept is not None:
+            candidates = [(position, score) for position, score in candidates if accept(self.items[position])]
+        ranked = heapq.nsmallest(limit, candidates, key=lambda kv: (-kv[1], kv[0]))
+        return [(self.items[position], score) for position, score in ranked]
+
+    def _insert_prefix(self, key: str, position: int) -> None:
+        node = self._trie
+        for ch in key:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+            if len(node.positions) < MAX_COMPLETIONS and position not in node.positions:
+                node.positions.append(position)
+
+    def _walk(self, key: str) -> Optional[_TrieNode]:
+        node = self._trie
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _match_word(self, key: str) -> List[Tuple[str, float]]:
+        if key in self._word_keys:
+            return [(key, 1.0)]
+        grams = trigrams(key)
+        overlap: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for word in self._postings.get(gram, ()):
+                overlap[word] += 1
+        matches = []
+        for word, shared in overlap.items():
+            score = 2 * shared / (len(grams) + len(self._word_grams[word]))
+            if score >= MIN_FUZZY_SCORE:
+                matches.append((word, score))
+        return matches
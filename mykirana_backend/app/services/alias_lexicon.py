@@ -0,0 +1,130 @@
+"""
+Global Alias Lexicon
+Hindi/English/regional names for common kirana items, learned from every shop's accepted
+Item.names. Kirana catalogs overlap heavily, so voice-inventory parsing fills aliases from
+here and only asks the model to invent them for items no shop has named yet.
+Rebuilt by build_alias_lexicon.py (or at startup when empty), held in memory per worker.
+"""
+import json
+import threading
+from collections import defaultdict, Counter
+from typing import List, Dict, Any, Optional
+from sqlmodel import Session, select, delete, func
+from app.db.models import Item, AliasLexiconEntry
+from app.services.alias_index import exact_key
+from app.core import metrics
+
+# A name becomes shared vocabulary once this many shops use it
+MIN_SHOPS = 2
+# Aliases kept per entry
+MAX_ALIASES = 8
+# Longest item name (in words) looked for in dictated text
+MAX_NAME_WORDS = 3
+
+
+class AliasLexicon:
+    def __init__(self):
+        self.version = 0
+        self._entries: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, session: Session) -> int:
+        """Replace the in-memory lexicon with the stored one. Returns the number of entries."""
+        rows = session.exec(select(AliasLexiconEntry)).all()
+        entries = {}
+        for row in rows:
+            try:
+                entries[row.key] = json.loads(row.names)
+            except Exception as e:
+                print(f"❌ Skipping lexicon entry {row.key}: {e}")
+        with self._lock:
+            self._entries = entries
+            self.version = max((row.version for row in rows), default=0)
+        print(f"📚 Alias lexicon v{self.version} loaded: {len(entries)} names")
+        return len(entries)
+
+    def lookup(self, name: str) -> Optional[List[str]]:
+        """All known names for the item called `name` (any script, same spelling), counted towards the hit rate"""
+        names = self._entries.get(exact_key(name or ""))
+        with self._lock:
+            if names is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.increment("alias_lexicon_hits" if names is not None else "alias_lexicon_misses")
+        return names
+
+    def known_names(self, text: str, limit: int = 100) -> List[str]:
+        """Item names from the lexicon that appear in dictated text (1-3 word phrases)"""
+        words = text.replace(",", " ").split()
+        found: List[str] = []
+        for size in range(MAX_NAME_WORDS, 0, -1):
+            for start in range(len(words) - size + 1):
+                names = self._entries.get(exact_key(" ".join(words[start:start + size])))
+                if names and names[0] not in found:
+                    found.append(names[0])
+                    if len(found) >= limit:
+                        return found
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+# Shared by every request in this worker
+alias_lexicon = AliasLexicon()
+
+
+def rebuild_alias_lexicon(session: Session, min_shops: int = MIN_SHOPS) -> int:
+    """
+    Rebuild the lexicon from all shops' items in one transaction and reload it.
+    Every name of an item is linked to the item's other names; a name is kept once
+    `min_shops` shops use it, with its aliases ranked by how many shops agree.
+    Returns the new lexicon version.
+    """
+    shops: Dict[str, set] = defaultdict(set)               # exact name key -> owners using it
+    aliases: Dict[str, Counter] = defaultdict(Counter)     # exact name key -> co-occurring names
+
+    for owner_id, raw_names in session.exec(select(Item.owner_id, Item.names)):
+        names = [n.strip() for n in raw_names or [] if isinstance(n, str) and n.strip()]
+        keys = {exact_key(n) for n in names} - {""}
+        for key in keys:
+            if owner_id not in shops[key]:
+                shops[key].add(owner_id)
+                for name in dict.fromkeys(names):   # Ties keep the shop's own name order
+                    aliases[key][name] += 1
+
+    current = session.exec(select(func.max(AliasLexiconEntry.version))).first() or 0
+    version = current + 1
+    rows = []
+    for key, owners in shops.items():
+        if len(owners) < min_shops:
+            continue
+        names = [name for name, _ in aliases[key].most_common(MAX_ALIASES)]
+        rows.append(AliasLexiconEntry(key=key, names=json.dumps(names, ensure_ascii=False),
+                                      shop_count=len(owners), version=version))
+
+    if not rows:
+        print(f"📚 Alias lexicon unchanged (v{current}): no name is shared by {min_shops}+ shops yet")
+        return current
+
+    session.exec(delete(AliasLexiconEntry))
+    session.add_all(rows)
+    session.commit()
+    print(f"📚 Alias lexicon v{version} built: {len(rows)} names from {len(shops)} candidates")
+
+    alias_lexicon.load(session)
+    return version
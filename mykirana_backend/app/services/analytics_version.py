@@ -0,0 +1,23 @@
+"""
+Analytics Version
+Per-owner version of the sales data, so anything derived from it (cached AI answers)
+can tell it is stale. Derived from the owner's bills in the database, so a bill saved
+through any worker moves it for every worker.
+"""
+import hashlib
+from sqlmodel import Session, select, func
+from app.db.models import Bill
+
+
+def get_analytics_version(session: Session, owner_id: int) -> int:
+    """
+    52-bit number derived from the owner's bill count and newest bill id, read from the
+    (owner_id, bill_date, id) index. Bills are only ever added, so every save moves it.
+    Only compared for equality.
+    """
+    count, last_id = session.exec(
+        select(func.count(Bill.id), func.max(Bill.id)).where(Bill.owner_id == owner_id)
+    ).one()
+    if not count:
+        return 0
+    return int(hashlib.sha1(f"{count}:{last_id}".encode("utf-8")).hexdigest()[:13], 16)
@@ -0,0 +1,105 @@
+"""
+Bill History
+Pages of one owner's bills, newest first, for GET /analytics/bills and /analytics/bills/{id}.
+Pages are keyset-paginated on (bill_date, id): the cursor is the last bill of the previous
+page, so every page is one index range read no matter how deep the user scrolls (OFFSET
+reads and throws away every skipped bill). `fields` picks the columns to load; list views
+leave out "items" so items_json is neither read nor decoded.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+from app.db.models import Bill
+
+# Response field -> column (every field of the full bill, in response order)
+BILL_COLUMNS = {
+    "id": Bill.id,
+    "total_amount": Bill.total_amount,
+    "total_items": Bill.total_items,
+    "items": Bill.items_json,
+    "customer_phone": Bill.customer_phone,
+    "customer_name": Bill.customer_name,
+    "payment_method": Bill.payment_method,
+    "bill_date": Bill.bill_date,
+    "created_at": Bill.created_at,
+}
+BILL_FIELDS = tuple(BILL_COLUMNS)
+
+MAX_PAGE_SIZE = 200
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """"id,total_amount" -> ("id", "total_amount"); all fields when empty. ValueError on unknown names."""
+    if not fields:
+        return BILL_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BILL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown field(s) {', '.join(unknown)}; allowed: {', '.join(BILL_FIELDS)}")
+    return tuple(name for name in BILL_FIELDS if name in names)
+
+
+def to_cursor(bill_date: datetime, bill_id: int) -> str:
+    """Cursor after a bill: microseconds since the epoch (exact) and the id as a tie-breaker"""
+    micros = (bill_date - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{bill_id}"
+
+
+def from_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    try:
+        micros, bill_id = cursor.split("_")
+        return _EPOCH + timedelta(microseconds=int(micros)), int(bill_id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def _bill_dict(row, fields: Sequence[str]) -> Dict[str, Any]:
+    bill = {}
+    for name in fields:
+        value = getattr(row, name if name != "items" else "items_json")
+        if name == "items":
+            value = json.loads(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        bill[name] = value
+    return bill
+
+
+def _select(fields: Sequence[str]):
+    # id and bill_date are always loaded: the next cursor is built from them
+    names = dict.fromkeys(("id", "bill_date", *fields))
+    return select(*(BILL_COLUMNS[name] for name in names))
+
+
+def bill_page(
+    session: Session,
+    owner_id: int,
+    limit: int = 50,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    fields: Sequence[str] = BILL_FIELDS,
+    offset: int = 0,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of bills, newest first, and the cursor for the next page (None on the last page).
+    `offset` is only for clients that predate cursors; it is ignored when a cursor is given.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    statement = _select(fields).where(Bill.owner_id == owner_id)
+    if cursor is not None:
+        statement = statement.where(tuple_(Bill.bill_date, Bill.id) < tuple_(*cursor))
+    elif offset > 0:
+        statement = statement.offset(offset)
+    # One extra row tells whether another page exists
+    rows = session.exec(statement.order_by(Bill.bill_date.desc(), Bill.id.desc()).limit(limit + 1)).all()
+
+    next_cursor = to_cursor(rows[limit - 1].bill_date, rows[limit - 1].id) if len(rows) > limit else None
+    return [_bill_dict(row, fields) for row in rows[:limit]], next_cursor
+
+
+def bill_detail(session: Session, owner_id: int, bill_id: int) -> Optional[Dict[str, Any]]:
+    row = session.exec(_select(BILL_FIELDS).where(Bill.id == bill_id, Bill.owner_id == owner_id)).first()
+    return _bill_dict(row, BILL_FIELDS) if row is not None else None
@@ -0,0 +1,164 @@
+"""
+Bill Writes
+Set-based bill inserts shared by POST /analytics/bills and /analytics/bills/batch.
+Every bill carries an idempotency key (client_id) generated by the app and (owner_id, client_id)
+is unique, so a retried upload gets back the ids saved the first time instead of duplicates.
+Bills go in with INSERT ... ON CONFLICT DO NOTHING RETURNING, their sale lines with a plain
+INSERT and the rollups with one upsert per table, each executed once for all rows (SQLAlchemy
+batches them into multi-row VALUES), all in the caller's transaction - the caller commits once.
+"""
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Tuple
+from sqlmodel import Session, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.db.models import Bill, SaleItem
+from app.services.sales_rollups import record_sales
+
+# client_ids per IN (...) lookup (keeps bound parameters under SQLite's limit)
+LOOKUP_CHUNK_ROWS = 500
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def bill_row(
+    total_amount: float,
+    items: List[Dict[str, Any]],
+    customer_phone: Optional[str] = None,
+    customer_name: Optional[str] = None,
+    payment_method: Optional[str] = "cash",
+    bill_date: Optional[datetime] = None,
+    client_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One bill to insert. bill_date is when the bill was made (bills queued offline are uploaded
+    later): aware times are converted to UTC, future times and None become now.
+    Bills without a client_id get a server-generated one (no retry protection).
+    """
+    now = datetime.utcnow()
+    if bill_date is not None and bill_date.tzinfo is not None:
+        bill_date = bill_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "client_id": client_id or f"srv-{uuid.uuid4().hex}",
+        "total_amount": total_amount,
+        "items": items,
+        "customer_phone": customer_phone,
+        "customer_name": customer_name,
+        "payment_method": payment_method,
+        "bill_date": min(bill_date, now) if bill_date is not None else now,
+    }
+
+
+def _text(value: Any, default: str) -> str:
+    return str(value) if value not in (None, "") else default
+
+
+def _sale_row(owner_id: int, bill_id: int, bill_date: datetime, item: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    return {
+        "owner_id": owner_id,
+        "bill_id": bill_id,
+        "item_name": _text(item.get("name"), ""),
+        "item_category": _text(item.get("category"), "Other"),
+        "quantity": _number(item.get("quantity")),
+        "unit": _text(item.get("unit"), ""),
+        "price_per_unit": _number(item.get("price")),
+        "total_price": _number(item.get("total")),
+        "sale_date": bill_date,
+        "hour_of_day": bill_date.hour,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def insert_bills(session: Session, owner_id: int, rows: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """
+    Insert bills (see bill_row) for one owner with their sale lines and rollups, without committing.
+    Returns (bill id, "created" / "duplicate") for each row, in order. A row is a duplicate when its
+    client_id was saved before, by a concurrent request, or earlier in `rows`.
+    """
+    if not rows:
+        return []
+    keys = list(dict.fromkeys(row["client_id"] for row in rows))
+    ids = _existing_bill_ids(session, owner_id, keys)
+
+    # First row per new key (a batch may repeat a bill the app queued twice)
+    pending: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if row["client_id"] not in ids:
+            pending.setdefault(row["client_id"], row)
+    new_rows = list(pending.values())
+
+    connection = session.connection()
+    now = datetime.utcnow()
+    created: Set[str] = set()
+    insert_bill = _dialect(session).insert(Bill).on_conflict_do_nothing(
+        index_elements=["owner_id", "client_id"]
+    ).returning(Bill.id, Bill.client_id)
+    if new_rows:
+        values = [
+            {
+                "owner_id": owner_id,
+                "client_id": row["client_id"],
+                "total_amount": row["total_amount"],
+                "total_items": len(row["items"]),
+                "items_json": json.dumps(row["items"]),
+                "customer_phone": row["customer_phone"],
+                "customer_name": row["customer_name"],
+                "payment_method": row["payment_method"],
+                "bill_date": row["bill_date"],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in new_rows
+        ]
+        for bill_id, client_id in connection.execute(insert_bill, values):
+            ids[client_id] = bill_id
+            created.add(client_id)
+
+    # Keys a concurrent upload inserted first
+    raced = [row["client_id"] for row in new_rows if row["client_id"] not in created]
+    if raced:
+        ids.update(_existing_bill_ids(session, owner_id, raced))
+
+    saved = [row for row in new_rows if row["client_id"] in created]
+    sale_rows = [
+        _sale_row(owner_id, ids[row["client_id"]], row["bill_date"], item, now)
+        for row in saved for item in row["items"]
+    ]
+    if sale_rows:
+        connection.execute(SaleItem.__table__.insert(), sale_rows)
+    record_sales(
+        session,
+        [(owner_id, row["bill_date"], row["total_amount"]) for row in saved],
+        [(owner_id, sale["sale_date"], sale["item_category"], sale["item_name"], sale["unit"],
+          sale["quantity"], sale["total_price"]) for sale in sale_rows],
+    )
+
+    results = []
+    for row in rows:
+        client_id = row["client_id"]
+        first = client_id in created and pending.get(client_id) is row
+        results.append((ids[client_id], "created" if first else "duplicate"))
+    return results
+
+
+def _existing_bill_ids(session: Session, owner_id: int, client_ids: List[str]) -> Dict[str, int]:
+    found: Dict[str, int] = {}
+    for start in range(0, len(client_ids), LOOKUP_CHUNK_ROWS):
+        chunk = client_ids[start:start + LOOKUP_CHUNK_ROWS]
+        found.update(
+            (client_id, bill_id) for bill_id, client_id in session.exec(
+                select(Bill.id, Bill.client_id).where(Bill.owner_id == owner_id, Bill.client_id.in_(chunk))
+            )
+        )
+    return found
+
+
+def _dialect(session: Session):
+    return postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
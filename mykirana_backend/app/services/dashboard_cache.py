@@ -0,0 +1,318 @@
+"""
+Dashboard Cache
+Per-owner cache of dashboard payloads keyed by (owner, days, shop-local date), shared by
+GET /analytics/dashboard and the AI's business context. Nothing on the dashboard changes
+between bills, so create_bill (and any inventory change, for the item count) drops the
+owner's entries; entries also expire after DASHBOARD_CACHE_TTL_SECONDS.
+
+Backends (DASHBOARD_CACHE_URL):
+  unset                      in-process LRU bounded by DASHBOARD_CACHE_MAX_BYTES (one worker)
+  redis://[:pass@]host:port/db   any Redis-protocol server, shared by all workers. One hash per
+                             owner, so invalidation is a single DEL; memory is bounded by the
+                             server (set maxmemory with an allkeys-lru policy) and the TTL.
+The Redis client is a minimal RESP implementation (no extra dependency); if the server is
+unreachable the dashboard is computed as if the cache were empty.
+"""
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlparse, unquote
+from sqlmodel import Session
+from app.core import metrics
+from app.services.dashboard_queries import dashboard_data
+from app.services.sales_rollups import local_today
+
+DASHBOARD_CACHE_URL = os.getenv("DASHBOARD_CACHE_URL", "")
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+DASHBOARD_CACHE_MAX_BYTES = int(os.getenv("DASHBOARD_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Redis calls must not hold a request up for long: on timeout the dashboard is computed
+REDIS_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_CACHE_TIMEOUT_SECONDS", "0.25"))
+# After a failed connection, don't try again (and wait for the timeout) for this long
+REDIS_RETRY_SECONDS = 5.0
+
+
+class InProcessBackend:
+    """LRU of serialized payloads, bounded by their total size in bytes"""
+    name = "memory"
+
+    def __init__(self, max_bytes: int = DASHBOARD_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, bytes]]" = OrderedDict()
+        self._fields: Dict[int, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, owner_id: int, field: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((owner_id, field))
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._remove((owner_id, field))
+                return None
+            self._entries.move_to_end((owner_id, field))
+            return entry[1]
+
+    def set(self, owner_id: int, field: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            if (owner_id, field) in self._entries:
+                self._remove((owner_id, field))
+            self._entries[(owner_id, field)] = (time.monotonic() + ttl_seconds, value)
+            self._fields.setdefault(owner_id, set()).add(field)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, owner_id: int) -> None:
+        with self._lock:
+            for field in list(self._fields.get(owner_id, ())):
+                self._remove((owner_id, field))
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+        fields = self._fields.get(key[0])
+        if fields is not None:
+            fields.discard(key[1])
+            if not fields:
+                del self._fields[key[0]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._fields.clear()
+            self._bytes = 0
+
+
+class RespError(Exception):
+    """Error reply from the server (the connection is still usable)"""
+
+
+class CacheUnavailable(ConnectionError):
+    """Not trying the server until REDIS_RETRY_SECONDS after the last failure"""
+
+
+class RespClient:
+    """Just enough of the Redis protocol (RESP2) for the cache: one connection, pipelined commands"""
+
+    def __init__(self, url: str, timeout: float = REDIS_TIMEOUT_SECONDS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.tls = parsed.scheme == "rediss"
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def execute(self, *commands: List[Any]) -> List[Any]:
+        """Send the commands in one write and return their replies, in order"""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    if time.monotonic() < self._down_until:
+                        raise CacheUnavailable("server unreachable, retrying later")
+                    self._connect()
+                return self._round_trip(commands)
+            except CacheUnavailable:
+                raise
+            except (OSError, EOFError):
+                self._close()
+                self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+                raise
+
+    def _connect(self) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        if self.tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self._sock, self._reader = sock, sock.makefile("rb")
+        setup = []
+        if self.password:
+            setup.append(["AUTH", self.username, self.password] if self.username else ["AUTH", self.password])
+        if self.db:
+            setup.append(["SELECT", self.db])
+        if setup:
+            try:
+                self._round_trip(setup)
+            except RespError:
+                self._close()
+                raise
+
+    def _round_trip(self, commands) -> List[Any]:
+        self._sock.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    @staticmethod
+    def _encode(command: List[Any]) -> bytes:
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise EOFError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise EOFError(f"unexpected reply {line[:20]!r}")
+
+    def _close(self) -> None:
+        try:
+            if self._sock is not None:
+                self._sock.close()
+        except OSError:
+            pass
+        self._sock, self._reader = None, None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+class RedisBackend:
+    """One hash per owner (field = days:date), expiring as a whole"""
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "dashboard"):
+        self.client = RespClient(url)
+        self.prefix = prefix
+
+    def _key(self, owner_id: int) -> str:
+        return f"{self.prefix}:{owner_id}"
+
+    def get(self, owner_id: int, field: str) -> Optional[bytes]:
+        return self.client.execute(["HGET", self._key(owner_id), field])[0]
+
+    def set(self, owner_id: int, field: str, value: bytes, ttl_seconds: float) -> None:
+        key = self._key(owner_id)
+        self.client.execute(["HSET", key, field, value], ["PEXPIRE", key, int(ttl_seconds * 1000)])
+
+    def invalidate(self, owner_id: int) -> None:
+        self.client.execute(["DEL", self._key(owner_id)])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"server": f"{self.client.host}:{self.client.port}/{self.client.db}"}
+
+    def clear(self) -> None:
+        pass
+
+
+class DashboardCache:
+    def __init__(self, backend, ttl_seconds: float = DASHBOARD_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        # Bumped on invalidate: a payload computed across an invalidation is not stored
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.saved_ms = 0.0
+
+    def get_dashboard(self, session: Session, owner_id: int, days: int = 30) -> Dict[str, Any]:
+        """The owner's dashboard payload, from the cache or computed (and cached)"""
+        field = f"{days}:{local_today().isoformat()}"
+        generation = self._generations.get(owner_id, 0)
+
+        cached = self._call(self.backend.get, owner_id, field)
+        if cached is not None:
+            entry = json.loads(cached)
+            with self._lock:
+                self.hits += 1
+                self.saved_ms += entry["ms"]
+            metrics.increment("dashboard_cache_hits")
+            metrics.increment("dashboard_cache_saved_ms", entry["ms"])
+            return entry["data"]
+
+        start = time.perf_counter()
+        payload = dashboard_data(session, owner_id, days)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            self.misses += 1
+        metrics.increment("dashboard_cache_misses")
+        metrics.observe("dashboard_query_ms", elapsed_ms)
+
+        if self._generations.get(owner_id, 0) == generation:
+            value = json.dumps({"ms": elapsed_ms, "data": payload}, ensure_ascii=False).encode()
+            self._call(self.backend.set, owner_id, field, value, self.ttl_seconds)
+        return payload
+
+    def invalidate(self, owner_id: int) -> None:
+        """Call after committing a change to the owner's bills or inventory"""
+        with self._lock:
+            self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+        self._call(self.backend.invalidate, owner_id)
+
+    def _call(self, method, *args):
+        try:
+            return method(*args)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            metrics.increment("dashboard_cache_errors")
+            if not isinstance(e, CacheUnavailable):
+                print(f"⚠️ Dashboard cache ({self.backend.name}) error: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                **self.backend.stats(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "saved_query_ms": round(self.saved_ms, 1),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.errors = 0
+            self.saved_ms = 0.0
+
+
+def make_backend(url: str = DASHBOARD_CACHE_URL):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    return InProcessBackend()
+
+
+# Shared by the dashboard endpoint and the voice assistant in this worker
+dashboard_cache = DashboardCache(make_backend())
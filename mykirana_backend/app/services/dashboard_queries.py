@@ -0,0 +1,126 @@
+"""
+Dashboard Queries
+The figures behind GET /analytics/dashboard and the AI's business context, shared by both,
+in two statements against the sales rollups (see sales_rollups.py):
+  1. inventory count LEFT JOIN the window's daily_sales rows -> totals and peak day of week
+  2. the window's hourly_item_sales rows grouped three ways at once -> top items,
+     category breakdown, peak hours (GROUPING SETS on Postgres, UNION ALL on SQLite)
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Dict, Any
+from sqlalchemy import literal, null, tuple_, union_all
+from sqlmodel import Session, select, func, and_
+from app.db.models import Item, DailySales, HourlyItemSales
+from app.services.sales_rollups import local_today
+
+TOP_ITEMS = 5
+
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+# Which grouping a breakdown row belongs to (Postgres GROUPING(item_category, hour) bitmask)
+_BY_ITEM, _BY_CATEGORY, _BY_HOUR = 3, 1, 2
+
+
+def _daily_rows(session: Session, owner_id: int, since) -> List[tuple]:
+    """(inventory count, sale_date, bill_count, revenue) - one row with NULL dates if nothing was sold"""
+    inventory = (
+        select(func.count(Item.id).label("item_count"))
+        .where(Item.owner_id == owner_id)
+        .subquery()
+    )
+    statement = select(
+        inventory.c.item_count, DailySales.sale_date, DailySales.bill_count, DailySales.revenue
+    ).select_from(inventory).outerjoin(
+        DailySales, and_(DailySales.owner_id == owner_id, DailySales.sale_date >= since)
+    )
+    return session.exec(statement).all()
+
+
+def _breakdown_rows(session: Session, owner_id: int, since) -> List[tuple]:
+    """(kind, item_name, unit, item_category, hour, quantity, sales, line_count) per group"""
+    window = (
+        select(HourlyItemSales.item_name, HourlyItemSales.unit, HourlyItemSales.item_category,
+               HourlyItemSales.hour, HourlyItemSales.quantity, HourlyItemSales.sales,
+               HourlyItemSales.line_count)
+        .where(HourlyItemSales.owner_id == owner_id, HourlyItemSales.sale_date >= since)
+        .cte("sales_window")
+    )
+    totals = (func.sum(window.c.quantity), func.sum(window.c.sales), func.sum(window.c.line_count))
+
+    if session.get_bind().dialect.name == "postgresql":
+        statement = select(
+            func.grouping(window.c.item_category, window.c.hour),
+            window.c.item_name, window.c.unit, window.c.item_category, window.c.hour, *totals,
+        ).group_by(func.grouping_sets(
+            tuple_(window.c.item_name, window.c.unit),
+            tuple_(window.c.item_category),
+            tuple_(window.c.hour),
+        ))
+    else:
+        # SQLite has no GROUPING SETS: same three groupings over the one CTE
+        statement = union_all(
+            select(literal(_BY_ITEM), window.c.item_name, window.c.unit, null(), null(), *totals)
+            .group_by(window.c.item_name, window.c.unit),
+            select(literal(_BY_CATEGORY), null(), null(), window.c.item_category, null(), *totals)
+            .group_by(window.c.item_category),
+            select(literal(_BY_HOUR), null(), null(), null(), window.c.hour, *totals)
+            .group_by(window.c.hour),
+        )
+    return session.exec(statement).all()
+
+
+def dashboard_data(session: Session, owner_id: int, days: int = 30) -> Dict[str, Any]:
+    """
+    Dashboard figures for the last `days` shop-local days (today included).
+    Same shape as GET /analytics/dashboard (without "success").
+    """
+    since = local_today() - timedelta(days=days - 1)
+
+    daily = _daily_rows(session, owner_id, since)
+    total_inventory = daily[0][0] if daily else 0
+    day_rows = [(sale_date, count, revenue) for _, sale_date, count, revenue in daily if sale_date is not None]
+    total_revenue = sum(revenue for _, _, revenue in day_rows)
+    total_bills = sum(count for _, count, _ in day_rows)
+    avg_bill_value = total_revenue / total_bills if total_bills > 0 else 0.0
+
+    # Day of week from at most `days` daily rows (Sunday = 0)
+    weekdays: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    for sale_date, count, revenue in day_rows:
+        totals = weekdays[sale_date.isoweekday() % 7]
+        totals[0] += count
+        totals[1] += revenue
+    peak_day = max(weekdays.items(), key=lambda kv: kv[1][1]) if weekdays else None
+
+    items, categories, hours = [], [], []
+    for kind, name, unit, category, hour, quantity, sales, count in _breakdown_rows(session, owner_id, since):
+        if kind == _BY_ITEM:
+            items.append({"name": name, "unit": unit, "quantity": float(quantity), "times_sold": int(count)})
+        elif kind == _BY_CATEGORY:
+            categories.append({
+                "category": category,
+                "total_sales": float(sales),
+                "quantity": float(quantity),
+                "percentage": round((float(sales) / total_revenue * 100) if total_revenue > 0 else 0, 1)
+            })
+        elif kind == _BY_HOUR:
+            hours.append({"hour": int(hour), "sales_count": int(count), "total_sales": float(sales)})
+    items.sort(key=lambda item: item["quantity"], reverse=True)
+    hours.sort(key=lambda hour: hour["hour"])
+
+    return {
+        "summary": {
+            "total_revenue": round(total_revenue, 2),
+            "total_bills": total_bills,
+            "average_bill_value": round(avg_bill_value, 2),
+            "total_inventory_items": total_inventory
+        },
+        "top_selling_items": items[:TOP_ITEMS],
+        "category_breakdown": categories,
+        "peak_hours": hours,
+        "peak_day": {
+            "day": DAY_NAMES[peak_day[0]],
+            "bill_count": int(peak_day[1][0]),
+            "total_sales": float(peak_day[1][1])
+        } if peak_day else None
+    }
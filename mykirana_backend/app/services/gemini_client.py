@@ -0,0 +1,107 @@
+"""
+Gemini REST Client
+Async client for the Gemini generateContent API over a pooled httpx connection,
+so model calls never block the event loop.
+"""
+import asyncio
+import json
+import os
+import httpx
+from typing import Optional, AsyncIterator
+
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+
+
+class GeminiError(Exception):
+    """Non-2xx response or unusable body from the Gemini API"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GeminiClient:
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop (scripts may run several loops)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=GEMINI_API_BASE,
+                timeout=httpx.Timeout(GEMINI_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def generate_content(self, model_name: str, prompt: str) -> str:
+        """Send one prompt to a model and return the response text"""
+        if not self.api_key:
+            raise GeminiError("GEMINI_API_KEY is missing")
+
+        response = await self._get_client().post(
+            f"/models/{model_name}:generateContent",
+            headers={"x-goog-api-key": self.api_key},
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+        )
+        if response.status_code != 200:
+            raise GeminiError(
+                f"{response.status_code} from {model_name}: {response.text[:200]}",
+                status_code=response.status_code,
+            )
+
+        return _extract_text(response.json())
+
+    async def stream_content(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        """Stream a response as text chunks (server-sent events from streamGenerateContent)"""
+        if not self.api_key:
+            raise GeminiError("GEMINI_API_KEY is missing")
+
+        async with self._get_client().stream(
+            "POST",
+            f"/models/{model_name}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": self.api_key},
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "replace")
+                raise GeminiError(f"{response.status_code} from {model_name}: {body[:200]}", status_code=response.status_code)
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if not payload:
+                    continue
+                try:
+                    text = _extract_text(json.loads(payload))
+                except GeminiError:
+                    continue  # Trailing chunks may carry only finishReason / usage metadata
+                if text:
+                    yield text
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+def _extract_text(body: dict) -> str:
+    """Join the text parts of the first candidate"""
+    try:
+        parts = body["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
+    except (KeyError, IndexError, TypeError):
+        reason = (body.get("promptFeedback") or {}).get("blockReason") if isinstance(body, dict) else None
+        raise GeminiError(f"No text in Gemini response (blockReason={reason})")
+
+
+# Shared client - one connection pool per worker
+gemini_client = GeminiClient()
@@ -0,0 +1,79 @@
+"""
+Voice Intent Classifier
+Cheap keyword/regex pre-classification of an utterance so /voice/process only
+loads the business context (dashboard analytics, recent bills) the AI actually needs.
+"""
+import re
+from typing import Dict, Any, Optional
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.local_parser import parse_billing_command, tokenize
+
+# "pichla bill", "last bill", "aakhri bill kitne ka tha"
+RECENT_BILLS_PATTERN = re.compile(
+    r"\b(pichla|pichle|pichli|last|recent|aakhri|akhri|previous)\s+(bill|bills|sale|customer)\b"
+    r"|\b(bills|bill history)\b"
+)
+
+# Business-intelligence questions answered from the dashboard numbers
+DASHBOARD_PATTERN = re.compile(
+    r"\b(top\s+selling|sabse\s+(zyada|jyada|kam)|revenue|total\s+sales?|business|dhandha|kamai|munafa|"
+    r"profit|peak|busy|bheed|tips?|advice|salah|suggestion|sujhav|average|ausat|category|categories|"
+    r"analytics|report|hisaab|hisab|aaj\s+(ki|ka|ke)\s+(sale|bikri|kamai))\b"
+)
+
+GREETING_WORDS = {"hi", "hello", "hey", "namaste", "namaskar", "pranam", "ram", "salaam", "kaise", "ho", "ji"}
+QUESTION_WORDS = {"kya", "kitna", "kitne", "kitni", "kaun", "kaunsa", "kab", "kaise", "kyun", "batao", "bata", "?"}
+
+
+class VoiceIntent:
+    """Result of pre-classification: what kind of utterance and which context slices it needs"""
+    __slots__ = ("kind", "needs_dashboard", "needs_recent_bills", "local_result")
+
+    def __init__(
+        self,
+        kind: str,
+        needs_dashboard: bool = False,
+        needs_recent_bills: bool = False,
+        local_result: Optional[Dict[str, Any]] = None
+    ):
+        self.kind = kind
+        self.needs_dashboard = needs_dashboard
+        self.needs_recent_bills = needs_recent_bills
+        self.local_result = local_result
+
+    def __repr__(self) -> str:
+        return (f"VoiceIntent({self.kind}, dashboard={self.needs_dashboard}, "
+                f"recent_bills={self.needs_recent_bills}, local={self.local_result is not None})")
+
+
+def classify_intent(user_text: str, snapshot: InventorySnapshot) -> VoiceIntent:
+    """
+    Decide what context an utterance needs before anything is loaded from the database.
+
+    Order matters: a locally parsed bill needs nothing, explicit BI keywords load only
+    their slice, and an unrecognised question falls back to loading everything.
+    """
+    local_result = parse_billing_command(user_text, snapshot.billing_aliases, snapshot.billing_item)
+    if local_result is not None:
+        return VoiceIntent("BILL", local_result=local_result)
+
+    text = " ".join(tokenize(user_text))
+    tokens = set(text.split())
+
+    needs_recent_bills = bool(RECENT_BILLS_PATTERN.search(text))
+    needs_dashboard = bool(DASHBOARD_PATTERN.search(text))
+    if needs_recent_bills or needs_dashboard:
+        return VoiceIntent("QUERY", needs_dashboard=needs_dashboard, needs_recent_bills=needs_recent_bills)
+
+    if tokens and tokens <= GREETING_WORDS:
+        return VoiceIntent("GREETING")
+
+    if tokens & QUESTION_WORDS:
+        # "chawal ki keemat kya hai" is about an item, not the business
+        if any(snapshot.find_by_name(token) is not None for token in tokens):
+            return VoiceIntent("QUERY")
+        # Unknown question: give the AI the full picture
+        return VoiceIntent("QUERY", needs_dashboard=True, needs_recent_bills=True)
+
+    # Anything else is billing the local parser could not resolve (unknown item, customer name...)
+    return VoiceIntent("BILL")
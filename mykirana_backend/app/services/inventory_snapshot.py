@@ -0,0 +1,259 @@
+"""
+Inventory Snapshot Cache
+Compiled, read-only view of one owner's inventory shared by all AI paths.
+Snapshots are cached per owner (LRU) and rebuilt when the owner's inventory version changes.
+The version is derived from the database, so an edit served by any worker is seen by all.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from sqlmodel import Session, select, func
+from app.db.models import Item, SaleItem
+from app.services.local_parser import build_alias_map, display_name, content_words
+from app.services.alias_index import AliasIndex
+from app.services.dashboard_cache import dashboard_cache
+from app.services.inventory_sync import inventory_stamp
+
+# Max number of owners kept in memory
+SNAPSHOT_CACHE_SIZE = int(os.getenv("INVENTORY_SNAPSHOT_CACHE_SIZE", "512"))
+# Frequent sellers are re-read from SaleItem at most this often per owner
+FREQUENT_ITEMS_TTL_SECONDS = 600
+
+
+class InventoryRecord:
+    """One inventory item with names already decoded and lowercased"""
+    __slots__ = ("master_id", "names", "names_lower", "display_name", "price", "unit", "category")
+
+    def __init__(self, master_id: str, names: Iterable[str], price: float, unit: str, category: str):
+        self.master_id = master_id
+        self.names: Tuple[str, ...] = tuple(n for n in names if n)
+        self.names_lower: Tuple[str, ...] = tuple(n.lower().strip() for n in self.names)
+        self.display_name = display_name(self.names)
+        self.price = float(price or 0)
+        self.unit = unit or ""
+        self.category = category or "Other"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.master_id,
+            "names": list(self.names),
+            "price": self.price,
+            "unit": self.unit,
+            "category": self.category,
+        }
+
+
+class InventorySnapshot:
+    """
+    Immutable per-owner inventory view.
+    Everything the AI paths need is computed once here instead of on every utterance.
+    """
+    __slots__ = ("owner_id", "version", "records", "priced", "categories",
+                 "names_index", "billing_aliases", "prompt_json", "_alias_index", "_content_hash")
+
+    def __init__(self, owner_id: Optional[int], version: int, records: Iterable[InventoryRecord]):
+        self.owner_id = owner_id
+        self.version = version
+        self.records: Tuple[InventoryRecord, ...] = tuple(records)
+        self.priced: Tuple[InventoryRecord, ...] = tuple(r for r in self.records if r.price > 0)
+        self.categories: Tuple[str, ...] = tuple(sorted({r.category for r in self.records}))
+
+        # Lowercased name -> record (first owner of the name wins)
+        names_index: Dict[str, InventoryRecord] = {}
+        for record in self.records:
+            for name in record.names_lower:
+                names_index.setdefault(name, record)
+        self.names_index = names_index
+
+        # Tokenized alias -> priced record, used by the local billing parser
+        self.billing_aliases = build_alias_map(self.priced)
+
+        # Pre-rendered inventory fragment for the billing prompt
+        self.prompt_json = json.dumps(
+            [
+                {"names": list(r.names), "price": r.price, "unit": r.unit, "category": r.category}
+                for r in self.priced
+            ],
+            ensure_ascii=False,
+        )
+        self._alias_index: Optional[AliasIndex] = None
+        self._content_hash: Optional[str] = None
+
+    @property
+    def alias_index(self) -> AliasIndex:
+        """Script/spelling-insensitive index over every item name, built on first use"""
+        if self._alias_index is None:
+            self._alias_index = AliasIndex(self.records)
+        return self._alias_index
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Order-independent hash of the inventory contents. Unlike `version` it survives
+        restarts and is the same on every worker, so clients can use it as a reference
+        instead of uploading the whole list.
+        """
+        if self._content_hash is None:
+            rows = sorted(json.dumps(r.to_dict(), ensure_ascii=False, sort_keys=True) for r in self.records)
+            self._content_hash = hashlib.sha1("\n".join(rows).encode("utf-8")).hexdigest()[:16]
+        return self._content_hash
+
+    @classmethod
+    def from_items(cls, items: Iterable[Any], owner_id: Optional[int] = None, version: int = 0) -> "InventorySnapshot":
+        """Build from Item rows or Item-like objects (names as a list, or a legacy JSON string)"""
+        records = []
+        for item in items:
+            try:
+                names = json.loads(item.names) if isinstance(item.names, str) else (item.names or [])
+                records.append(InventoryRecord(
+                    master_id=getattr(item, "master_id", None) or str(getattr(item, "id", "") or ""),
+                    names=names,
+                    price=item.price,
+                    unit=item.unit,
+                    category=getattr(item, "category", None),
+                ))
+            except Exception as e:
+                print(f"❌ Skipping item {getattr(item, 'id', '?')} in snapshot: {e}")
+        return cls(owner_id, version, records)
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Dict[str, Any]], owner_id: Optional[int] = None, version: int = 0) -> "InventorySnapshot":
+        """Build from client-supplied inventory dicts ({"id", "names", "price", "unit", "category"})"""
+        records = [
+            InventoryRecord(
+                master_id=str(item.get("id", "") or ""),
+                names=item.get("names", []) or [],
+                price=item.get("price") or 0,
+                unit=item.get("unit", ""),
+                category=item.get("category", ""),
+            )
+            for item in items
+        ]
+        return cls(owner_id, version, records)
+
+    def find_by_name(self, name: str) -> Optional[InventoryRecord]:
+        """Exact name lookup, ignoring case, script and spelling variants ("चावल" = "chaawal" = "Chawal")"""
+        name = (name or "").lower().strip()
+        record = self.names_index.get(name)
+        if record is None and name:
+            matches = self.alias_index.lookup(name)
+            record = matches[0] if matches else None
+        return record
+
+    def resolve(self, name: str) -> Optional[InventoryRecord]:
+        """Best single item for a spoken/typed name (exact, then unique prefix, then fuzzy), None if unsure"""
+        return self.find_by_name(name) or self.alias_index.resolve((name or "").lower())
+
+    def billing_item(self, alias: str) -> Optional[InventoryRecord]:
+        """Priced item whose name is a spelling/script variant of `alias` (local parser fallback)"""
+        for record in self.alias_index.lookup(alias):
+            if record.price > 0:
+                return record
+        return None
+
+    def relevant_items(self, user_text: str, limit: int = 30) -> List[InventoryRecord]:
+        """Priced items whose names fuzzily match words the user actually said"""
+        words = content_words(user_text)
+        if not words:
+            return []
+        ranked = self.alias_index.search(" ".join(words), limit=limit, accept=lambda record: record.price > 0)
+        return [record for record, _ in ranked]
+
+
+# Owner -> last snapshot built by this worker. Validated against the database version on
+# every read, so an edit committed by another worker is picked up on the next request.
+_cache: "OrderedDict[int, InventorySnapshot]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_inventory_version(session: Session, owner_id: int) -> int:
+    """
+    Version of the owner's inventory: a 52-bit number (safe as a JSON number in every client)
+    derived from the item count and max(updated_at), so all workers agree on it.
+    Only compared for equality.
+    """
+    count, last_update = inventory_stamp(session, owner_id)
+    if not count:
+        return 0
+    stamp = f"{count}:{last_update.isoformat() if last_update else ''}"
+    return int(hashlib.sha1(stamp.encode("utf-8")).hexdigest()[:13], 16)
+
+
+def bump_inventory_version(owner_id: int) -> None:
+    """
+    Drop this worker's snapshot after committing an inventory change (other workers notice the
+    new database version on their next read).
+    """
+    with _lock:
+        _cache.pop(owner_id, None)
+    # The cached dashboard shows the item count
+    dashboard_cache.invalidate(owner_id)
+
+
+def get_inventory_snapshot(session: Session, owner_id: int) -> InventorySnapshot:
+    """Return the owner's snapshot, rebuilding it from the database only if the version moved"""
+    version = get_inventory_version(session, owner_id)
+
+    with _lock:
+        snapshot = _cache.get(owner_id)
+        if snapshot is not None and snapshot.version == version:
+            _cache.move_to_end(owner_id)
+            return snapshot
+
+    items = session.exec(select(Item).where(Item.owner_id == owner_id)).all()
+    # A write landing between the two reads leaves a snapshot newer than its version label:
+    # the next read sees a different version and rebuilds, so it is never served stale
+    snapshot = InventorySnapshot.from_items(items, owner_id=owner_id, version=version)
+
+    with _lock:
+        _cache[owner_id] = snapshot
+        _cache.move_to_end(owner_id)
+        while len(_cache) > SNAPSHOT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    print(f"📦 Built inventory snapshot for user {owner_id}: {len(snapshot.records)} items (v{version})")
+    return snapshot
+
+
+def clear_inventory_snapshots() -> None:
+    with _lock:
+        _cache.clear()
+        _frequent_cache.clear()
+
+
+# Owner -> (loaded_at, [item names]) for the top sellers of the last 30 days
+# Owner -> (fetched at, names), LRU-bounded like _cache and guarded by the same _lock
+_frequent_cache: "OrderedDict[int, Tuple[float, List[str]]]" = OrderedDict()
+
+
+def get_frequent_item_names(session: Session, owner_id: int, limit: int = 10) -> List[str]:
+    """Names of the owner's most frequently sold items (cached for a few minutes)"""
+    now = time.monotonic()
+    with _lock:
+        cached = _frequent_cache.get(owner_id)
+        if cached is not None and now - cached[0] < FREQUENT_ITEMS_TTL_SECONDS:
+            _frequent_cache.move_to_end(owner_id)
+            return cached[1][:limit]
+
+    try:
+        since = datetime.utcnow() - timedelta(days=30)
+        statement = select(SaleItem.item_name).where(
+            SaleItem.owner_id == owner_id,
+            SaleItem.sale_date >= since
+        ).group_by(SaleItem.item_name).order_by(func.count(SaleItem.id).desc()).limit(limit)
+        names = [name for name in session.exec(statement).all() if name]
+    except Exception as e:
+        print(f"Error getting frequent items: {e}")
+        names = []
+
+    with _lock:
+        _frequent_cache[owner_id] = (now, names)
+        _frequent_cache.move_to_end(owner_id)
+        while len(_frequent_cache) > SNAPSHOT_CACHE_SIZE:
+            _frequent_cache.popitem(last=False)
+    return names
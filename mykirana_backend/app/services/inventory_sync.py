@@ -0,0 +1,91 @@
+"""
+Inventory Sync
+Cheap "has anything changed?" checks for app start and refresh:
+an ETag for GET /items/ and a timestamp cursor for /items/changes deltas
+(changed items plus tombstones of deleted ones).
+"""
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from sqlmodel import Session, select, func
+from app.db.models import Item, ItemTombstone
+
+# Cursors are moved back this far, so a write that committed late with a slightly
+# older updated_at is sent again next time instead of being missed
+CHANGES_OVERLAP_SECONDS = 5
+# Tombstones older than this are pruned; clients further behind must reload the full list
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+def item_to_dict(item: Item) -> Dict[str, Any]:
+    """Item in the shape every /items endpoint returns"""
+    return {
+        "id": item.master_id,  # CRITICAL: Return master_id as id
+        "names": item.names or [],
+        "price": item.price,
+        "unit": item.unit,
+        "category": item.category,
+        "owner_id": item.owner_id,
+        "master_id": item.master_id,
+    }
+
+
+def inventory_stamp(session: Session, owner_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    (item count, max(updated_at)) of the owner's inventory, read from the (owner_id, updated_at)
+    index. Any create or update moves max(updated_at); any delete changes the count. Read from
+    the database, so every worker sees the same stamp.
+    """
+    count, last_update = session.exec(
+        select(func.count(Item.id), func.max(Item.updated_at)).where(Item.owner_id == owner_id)
+    ).one()
+    return count, last_update
+
+
+def inventory_etag(session: Session, owner_id: int) -> str:
+    """Version tag of the owner's whole inventory (see inventory_stamp)"""
+    count, last_update = inventory_stamp(session, owner_id)
+    return f'W/"inv-{count}-{to_cursor(last_update) if last_update else 0}"'
+
+
+def to_cursor(moment: datetime) -> str:
+    """Cursor string for a moment (milliseconds since the epoch, UTC)"""
+    return str(int((moment - datetime(1970, 1, 1)).total_seconds() * 1000))
+
+
+def from_cursor(cursor: str) -> Optional[datetime]:
+    try:
+        return datetime(1970, 1, 1) + timedelta(milliseconds=int(cursor))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def next_cursor(since: Optional[datetime] = None) -> str:
+    """Cursor to hand out now: slightly in the past, never before `since`"""
+    moment = datetime.utcnow() - timedelta(seconds=CHANGES_OVERLAP_SECONDS)
+    if since is not None and since > moment:
+        moment = since
+    return to_cursor(moment)
+
+
+def inventory_changes(session: Session, owner_id: int, since: datetime) -> Dict[str, Any]:
+    """Items changed and master_ids deleted after `since`, with the cursor for the next call"""
+    cursor = next_cursor(since)
+
+    if since < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return {"reset": True, "items": [], "deleted": [], "cursor": cursor}
+
+    changed = session.exec(
+        select(Item).where(Item.owner_id == owner_id, Item.updated_at > since)
+    ).all()
+    deleted: List[str] = list(session.exec(
+        select(ItemTombstone.master_id).where(ItemTombstone.owner_id == owner_id, ItemTombstone.deleted_at > since)
+    ).all())
+
+    items = []
+    for item in changed:
+        try:
+            items.append(item_to_dict(item))
+        except Exception as e:
+            print(f"❌ Error processing item {item.id}: {e}")
+
+    return {"reset": False, "items": items, "deleted": deleted, "cursor": cursor}
@@ -0,0 +1,120 @@
+"""
+Inventory Writes
+Set-based item upserts and deletes shared by the bulk inventory endpoints.
+Rows are written with INSERT ... ON CONFLICT (owner_id, master_id) DO UPDATE in chunks,
+inside the caller's transaction - the caller commits once and bumps the inventory version once.
+Deletes leave an ItemTombstone behind for /items/changes; re-creating an item clears it.
+"""
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Set
+from sqlmodel import Session, select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from app.db.models import Item, ItemTombstone
+from app.services.inventory_sync import TOMBSTONE_RETENTION_DAYS
+
+# Rows per INSERT statement (keeps bound parameters under SQLite's limit)
+UPSERT_CHUNK_ROWS = 500
+
+
+def item_row(owner_id: int, master_id: str, names: List[str], price: float, unit: str, category: str) -> Dict[str, Any]:
+    """Column values of one Item row"""
+    return {
+        "owner_id": owner_id,
+        "master_id": master_id,
+        "names": names,
+        "price": price,
+        "unit": unit,
+        "category": category,
+    }
+
+
+def upsert_items(session: Session, owner_id: int, rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Insert or update `rows` (see item_row) for one owner without committing.
+    Later rows with the same master_id win. Returns master_id -> "created" / "updated".
+    """
+    by_master: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        by_master[row["master_id"]] = dict(row, owner_id=owner_id)
+    if not by_master:
+        return {}
+
+    existing = _existing_master_ids(session, owner_id, list(by_master))
+
+    dialect = _dialect(session)
+    now = datetime.utcnow()
+    values = [dict(row, created_at=now, updated_at=now) for row in by_master.values()]
+    for start in range(0, len(values), UPSERT_CHUNK_ROWS):
+        statement = dialect.insert(Item).values(values[start:start + UPSERT_CHUNK_ROWS])
+        statement = statement.on_conflict_do_update(
+            index_elements=["owner_id", "master_id"],
+            set_={
+                "names": statement.excluded.names,
+                "price": statement.excluded.price,
+                "unit": statement.excluded.unit,
+                "category": statement.excluded.category,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+        session.exec(statement)
+    clear_tombstones(session, owner_id, list(by_master))
+
+    return {master_id: "updated" if master_id in existing else "created" for master_id in by_master}
+
+
+def delete_items(session: Session, owner_id: int, master_ids: List[str]) -> Dict[str, str]:
+    """
+    Delete the owner's items with these master_ids without committing.
+    Returns master_id -> "deleted" / "not_found".
+    """
+    wanted = list(dict.fromkeys(master_ids))
+    existing = _existing_master_ids(session, owner_id, wanted)
+    found = [master_id for master_id in wanted if master_id in existing]
+    for start in range(0, len(found), UPSERT_CHUNK_ROWS):
+        chunk = found[start:start + UPSERT_CHUNK_ROWS]
+        session.exec(delete(Item).where(Item.owner_id == owner_id, Item.master_id.in_(chunk)))
+    record_tombstones(session, owner_id, found)
+    return {master_id: "deleted" if master_id in existing else "not_found" for master_id in wanted}
+
+
+def _existing_master_ids(session: Session, owner_id: int, master_ids: List[str]) -> Set[str]:
+    existing: Set[str] = set()
+    for start in range(0, len(master_ids), UPSERT_CHUNK_ROWS):
+        chunk = master_ids[start:start + UPSERT_CHUNK_ROWS]
+        existing.update(session.exec(
+            select(Item.master_id).where(Item.owner_id == owner_id, Item.master_id.in_(chunk))
+        ).all())
+    return existing
+
+
+def record_tombstones(session: Session, owner_id: int, master_ids: List[str]) -> None:
+    """Remember deleted items for delta sync, and prune the owner's expired tombstones"""
+    now = datetime.utcnow()
+    session.exec(delete(ItemTombstone).where(
+        ItemTombstone.owner_id == owner_id,
+        ItemTombstone.deleted_at < now - timedelta(days=TOMBSTONE_RETENTION_DAYS),
+    ))
+    if not master_ids:
+        return
+    dialect = _dialect(session)
+    values = [{"owner_id": owner_id, "master_id": master_id, "deleted_at": now} for master_id in master_ids]
+    for start in range(0, len(values), UPSERT_CHUNK_ROWS):
+        statement = dialect.insert(ItemTombstone).values(values[start:start + UPSERT_CHUNK_ROWS])
+        statement = statement.on_conflict_do_update(
+            index_elements=["owner_id", "master_id"],
+            set_={"deleted_at": statement.excluded.deleted_at},
+        )
+        session.exec(statement)
+
+
+def clear_tombstones(session: Session, owner_id: int, master_ids: List[str]) -> None:
+    """Items that exist again are no longer deleted"""
+    for start in range(0, len(master_ids), UPSERT_CHUNK_ROWS):
+        chunk = master_ids[start:start + UPSERT_CHUNK_ROWS]
+        session.exec(delete(ItemTombstone).where(
+            ItemTombstone.owner_id == owner_id, ItemTombstone.master_id.in_(chunk)
+        ))
+
+
+def _dialect(session: Session):
+    return postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
@@ -0,0 +1,346 @@
+"""
+Local Billing Parser
+Deterministic fast path for simple billing utterances ("do kilo chawal aur ek litre tel").
+Returns the same BILL shape as the AI service, or None when it is not confident.
+"""
+import re
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+# Hindi / Hinglish / English number words -> value
+NUMBER_WORDS: Dict[str, float] = {
+    "ek": 1, "one": 1, "एक": 1,
+    "do": 2, "two": 2, "दो": 2,
+    "teen": 3, "tin": 3, "three": 3, "तीन": 3,
+    "char": 4, "chaar": 4, "four": 4, "चार": 4,
+    "paanch": 5, "panch": 5, "five": 5, "पांच": 5, "पाँच": 5,
+    "chhe": 6, "che": 6, "chah": 6, "six": 6, "छह": 6, "छः": 6,
+    "saat": 7, "sat": 7, "seven": 7, "सात": 7,
+    "aath": 8, "ath": 8, "eight": 8, "आठ": 8,
+    "nau": 9, "nine": 9, "नौ": 9,
+    "das": 10, "dus": 10, "ten": 10, "दस": 10,
+    "gyarah": 11, "eleven": 11,
+    "barah": 12, "baarah": 12, "twelve": 12,
+    "pandrah": 15, "fifteen": 15,
+    "bees": 20, "twenty": 20, "बीस": 20,
+    "pachees": 25, "pachchis": 25,
+    "tees": 30, "thirty": 30,
+    "pachas": 50, "pachaas": 50, "fifty": 50, "पचास": 50,
+    "sau": 100, "hundred": 100, "सौ": 100,
+    # Fractions used at the counter
+    "aadha": 0.5, "adha": 0.5, "aadhi": 0.5, "half": 0.5, "आधा": 0.5,
+    "paav": 0.25, "pav": 0.25, "pao": 0.25, "quarter": 0.25, "पाव": 0.25,
+    "pauna": 0.75, "पौना": 0.75,
+    "sava": 1.25, "sawa": 1.25, "सवा": 1.25,
+    "dedh": 1.5, "derh": 1.5, "डेढ़": 1.5,
+    "dhai": 2.5, "adhai": 2.5, "ढाई": 2.5,
+}
+
+# Spoken unit -> (canonical unit, dimension, multiplier to the dimension's base unit)
+UNIT_WORDS: Dict[str, Tuple[str, str, float]] = {
+    "kg": ("kg", "mass", 1.0), "kgs": ("kg", "mass", 1.0), "kilo": ("kg", "mass", 1.0),
+    "kilos": ("kg", "mass", 1.0), "kilogram": ("kg", "mass", 1.0), "किलो": ("kg", "mass", 1.0),
+    "g": ("g", "mass", 0.001), "gm": ("g", "mass", 0.001), "gms": ("g", "mass", 0.001),
+    "gram": ("g", "mass", 0.001), "grams": ("g", "mass", 0.001), "ग्राम": ("g", "mass", 0.001),
+    "litre": ("litre", "volume", 1.0), "liter": ("litre", "volume", 1.0), "ltr": ("litre", "volume", 1.0),
+    "l": ("litre", "volume", 1.0), "lita": ("litre", "volume", 1.0), "लीटर": ("litre", "volume", 1.0),
+    "ml": ("ml", "volume", 0.001),
+    "packet": ("packet", "count", 1.0), "packets": ("packet", "count", 1.0), "pkt": ("packet", "count", 1.0),
+    "pack": ("packet", "count", 1.0), "paket": ("packet", "count", 1.0), "पैकेट": ("packet", "count", 1.0),
+    "pic": ("pic", "count", 1.0), "pics": ("pic", "count", 1.0), "pc": ("pic", "count", 1.0),
+    "pcs": ("pic", "count", 1.0), "piece": ("pic", "count", 1.0), "pieces": ("pic", "count", 1.0),
+    "nag": ("pic", "count", 1.0), "dozen": ("pic", "count", 12.0), "darjan": ("pic", "count", 12.0),
+}
+
+# Inventory unit -> dimension (used to convert spoken units into the item's unit)
+ITEM_UNIT_DIMENSIONS: Dict[str, Tuple[str, float]] = {
+    "kg": ("mass", 1.0), "g": ("mass", 0.001), "gram": ("mass", 0.001),
+    "litre": ("volume", 1.0), "liter": ("volume", 1.0), "ml": ("volume", 0.001),
+}
+
+PRICE_WORDS = {"rs", "rupay", "rupaye", "rupee", "rupees", "rupiya", "rupaiye", "rupya", "₹", "रुपये", "रुपए"}
+RATE_MARKERS = {"wali", "wala", "wale", "vali", "vala", "per", "kilo", "kg", "litre", "liter"}
+CONJUNCTIONS = {"aur", "and", "or", "phir", "also", "और", ","}
+FILLER_WORDS = {
+    "de", "dedo", "dijiye", "dena", "chahiye", "bhai", "bhaiya", "please", "plz", "ji",
+    "add", "karo", "kar", "jodo", "bhi", "mujhe", "hume", "ka", "ki", "ke", "wala", "wali", "wale",
+}
+
+# Utterances containing these go to the AI (queries, greetings, customer names, edits)
+AI_ONLY_WORDS = {
+    "customer", "naam", "name", "liye", "kitna", "kitne", "kya", "kaisa", "kab", "kaun", "kyun",
+    "price", "rate", "keemat", "kimat", "bill", "total", "hello", "hi", "namaste", "namaskar",
+    "hata", "hatao", "remove", "cancel", "delete", "nikalo", "badlo", "change", "sales", "business",
+    "tips", "?",
+}
+
+DEFAULT_MSG = "Saaman Bill mein jod diya gaya hai"
+
+
+def parse_billing_command(
+    user_text: str,
+    alias_map: Dict[str, Any],
+    resolve: Optional[Callable[[str], Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Try to turn a simple billing utterance into a BILL response without calling the AI.
+
+    Args:
+        user_text: Raw voice transcription
+        alias_map: Tokenized alias -> priced item (see build_alias_map)
+        resolve: Optional fallback for names not in alias_map (e.g. spelling/script variants)
+
+    Returns:
+        {"type": "BILL", "items": [...]} dict, or None if any part is ambiguous
+    """
+    tokens = tokenize(user_text)
+    if not tokens or any(token in AI_ONLY_WORDS for token in tokens):
+        return None
+
+    if not alias_map:
+        return None
+
+    segments = _split_segments(tokens)
+    if segments is None or not segments:
+        return None
+
+    bill_items = []
+    for segment in segments:
+        bill_item = _resolve_segment(segment, alias_map, resolve)
+        if bill_item is None:
+            return None
+        bill_items.append(bill_item)
+
+    return {
+        "type": "BILL",
+        "customer_name": "Walk-in",
+        "items": bill_items,
+        "msg": DEFAULT_MSG,
+        "should_stop": False,
+    }
+
+
+def parse_followup(user_text: str, item: Any) -> Optional[Dict[str, Any]]:
+    """
+    Bill line for an utterance that names no item ("aur ek packet", "do kilo aur"),
+    applied to `item` - the item the conversation is about. None if the utterance
+    names something or carries no quantity/price.
+    """
+    tokens = tokenize(user_text)
+    if not tokens or item is None or any(token in AI_ONLY_WORDS for token in tokens):
+        return None
+
+    segments = _split_segments(tokens)
+    if not segments or len(segments) != 1:
+        return None
+    segment = segments[0]
+    if segment["name"] or (segment["qty"] is None and segment["price"] is None):
+        return None
+    return _bill_line(item, segment)
+
+
+def content_words(text: str) -> List[str]:
+    """Tokens that could be part of an item name (numbers, units, prices and fillers removed)"""
+    return [
+        token for token in tokenize(text)
+        if _to_number(token) is None
+        and token not in UNIT_WORDS and token not in PRICE_WORDS and token not in RATE_MARKERS
+        and token not in CONJUNCTIONS and token not in FILLER_WORDS and token not in AI_ONLY_WORDS
+    ]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split, separating glued numbers and units ("2kg" -> "2 kg", "₹5" -> "₹ 5")"""
+    text = text.lower().strip()
+    text = text.replace("₹", " ₹ ").replace("?", " ? ").replace(",", " , ")
+    text = re.sub(r"(\d)([^\d\s.])", r"\1 \2", text)
+    text = re.sub(r"([^\d\s.])(\d)", r"\1 \2", text)
+    text = re.sub(r"[.!|।]+(\s|$)", " ", text)
+    return text.split()
+
+
+def _to_number(token: str) -> Optional[float]:
+    if token in NUMBER_WORDS:
+        return float(NUMBER_WORDS[token])
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _split_segments(tokens: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Walk tokens and group them into item segments.
+    A segment is {"qty", "unit", "price", "name"}; a new one starts on a conjunction,
+    or when a quantity/name arrives and the current segment is already complete.
+    """
+    segments: List[Dict[str, Any]] = []
+    current = _new_segment()
+    i = 0
+
+    def flush():
+        nonlocal current
+        if current["name"] or current["qty"] is not None or current["price"] is not None:
+            segments.append(current)
+        current = _new_segment()
+
+    while i < len(tokens):
+        token = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+
+        if token in CONJUNCTIONS:
+            flush()
+            i += 1
+            continue
+
+        # "de do" / trailing "do" are requests, not quantities
+        if token == "do" and (nxt is None or nxt in CONJUNCTIONS) and current["name"]:
+            i += 1
+            continue
+        if token == "de" and nxt == "do":
+            i += 2
+            continue
+
+        # Price: "5 rs wali", "120 rs kilo", "₹ 40"
+        if token == "₹" and nxt is not None and _to_number(nxt) is not None:
+            tokens[i], tokens[i + 1] = nxt, "rs"
+            continue
+        number = _to_number(token)
+        if number is not None and nxt in PRICE_WORDS:
+            if current["price"] is not None:
+                flush()
+            current["price"] = number
+            i += 2
+            # "N rs ka" means "worth N rupees", which needs the AI
+            if i < len(tokens) and tokens[i] in {"ka", "ki", "ke"}:
+                return None
+            while i < len(tokens) and tokens[i] in RATE_MARKERS:
+                current["rate_marked"] = True
+                i += 1
+            continue
+
+        # Quantity (optionally followed by a unit)
+        if number is not None:
+            if current["qty"] is not None:
+                flush()
+            current["qty"] = number
+            current["qty_is_word"] = token in NUMBER_WORDS
+            if nxt in UNIT_WORDS:
+                current["unit"] = UNIT_WORDS[nxt]
+                i += 1
+            i += 1
+            continue
+
+        # Bare unit after a name ("maggie packet", "chawal kilo")
+        if token in UNIT_WORDS:
+            if current["unit"] is None:
+                current["unit"] = UNIT_WORDS[token]
+            i += 1
+            continue
+
+        if token in FILLER_WORDS:
+            if current["name"]:
+                current["name_closed"] = True
+            i += 1
+            continue
+
+        # Name token
+        if current["name"] and current["name_closed"]:
+            flush()
+        current["name"].append(token)
+        i += 1
+        # A quantity or price after the name closes it
+        if nxt is not None and (_to_number(nxt) is not None or nxt in UNIT_WORDS or nxt == "₹"):
+            current["name_closed"] = True
+
+    flush()
+    return segments
+
+
+def _new_segment() -> Dict[str, Any]:
+    return {"qty": None, "qty_is_word": False, "unit": None, "price": None, "rate_marked": False,
+            "name": [], "name_closed": False}
+
+
+def build_alias_map(items: Iterable[Any]) -> Dict[str, Any]:
+    """Tokenized, lowercased alias -> item (items expose a decoded `names` sequence)"""
+    alias_map: Dict[str, Any] = {}
+    for item in items:
+        for name in item.names or []:
+            key = " ".join(tokenize(str(name)))
+            if key and key not in alias_map:
+                alias_map[key] = item
+    return alias_map
+
+
+def display_name(names: Sequence[str]) -> str:
+    """First Latin-script name (the bill is printed in Latin script)"""
+    for name in names:
+        if name and all(ord(ch) < 128 for ch in name):
+            return name
+    return names[0] if names else "Item"
+
+
+def _format_qty(qty: float) -> str:
+    return f"{round(qty, 3):g}"
+
+
+def _resolve_segment(
+    segment: Dict[str, Any],
+    alias_map: Dict[str, Any],
+    resolve: Optional[Callable[[str], Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Match a segment to an inventory item and compute the bill line, or None if unsure"""
+    if not segment["name"]:
+        return None
+
+    alias = " ".join(segment["name"])
+    item = alias_map.get(alias)
+    if item is None and resolve is not None:
+        item = resolve(alias)
+    if item is None:
+        return None
+    return _bill_line(item, segment)
+
+
+def _bill_line(item: Any, segment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Bill line for a resolved item from the segment's quantity, unit and spoken price"""
+    # "chawal 50": 50 kg, 50 rupees' worth or a ₹50 rate - the AI decides
+    if segment["qty"] is not None and segment["unit"] is None and not segment["qty_is_word"]:
+        return None
+    # "chini 20 rupaye" is most likely 20 rupees' worth, not 1 kg at ₹20 ("20 rs wali" is a rate)
+    if segment["price"] is not None and segment["qty"] is None and not segment["rate_marked"]:
+        return None
+
+    item_unit = (item.unit or "").lower().strip()
+    qty = segment["qty"] if segment["qty"] is not None else 1.0
+    if qty <= 0:
+        return None
+
+    spoken = segment["unit"]
+    if spoken is not None:
+        _, spoken_dimension, spoken_factor = spoken
+        item_dimension = ITEM_UNIT_DIMENSIONS.get(item_unit)
+        if item_dimension is not None:
+            # Convert e.g. 500 gram -> 0.5 kg
+            if item_dimension[0] != spoken_dimension:
+                return None
+            qty = qty * spoken_factor / item_dimension[1]
+        elif spoken_dimension != "count":
+            # Weight/volume spoken for a per-piece item is ambiguous
+            return None
+        else:
+            qty = qty * spoken_factor
+
+    rate = segment["price"] if segment["price"] is not None else float(item.price or 0)
+    if rate <= 0:
+        return None
+
+    total = round(qty * rate, 2)
+    return {
+        "name": item.display_name,
+        "qty": round(qty, 3),
+        "qty_display": f"{_format_qty(qty)}{item_unit}",
+        "rate": float(rate),
+        "total": total,
+        "unit": item_unit,
+    }
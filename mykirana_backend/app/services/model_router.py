@@ -0,0 +1,211 @@
+"""
+Model Router
+Tracks per-model health (success rate, latency EWMA, 429/5xx streaks) for the Gemini
+fallback loops, opens a circuit on failing models for a cool-down window, and orders
+candidate models by observed health.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, TypeVar
+from app.services.gemini_client import gemini_client, GeminiError
+
+T = TypeVar("T")
+
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("MODEL_CIRCUIT_COOLDOWN_SECONDS", "60"))
+CIRCUIT_MAX_COOLDOWN_SECONDS = float(os.getenv("MODEL_CIRCUIT_MAX_COOLDOWN_SECONDS", "900"))
+FAILURE_THRESHOLD = int(os.getenv("MODEL_FAILURE_THRESHOLD", "3"))
+EWMA_ALPHA = 0.3
+# Assumed latency for a model we have not heard from yet (keeps configured order until data arrives)
+DEFAULT_LATENCY_SECONDS = 3.0
+# Successful latencies kept per model for percentile estimates
+LATENCY_WINDOW = 50
+MIN_SAMPLES_FOR_PERCENTILE = 5
+
+
+class ModelStats:
+    __slots__ = ("name", "successes", "failures", "latency_ewma", "recent_latencies", "failure_streak",
+                 "open_until", "trips", "last_status", "last_error", "last_used")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.successes = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.recent_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failure_streak = 0        # Consecutive 429/5xx/transport failures
+        self.open_until = 0.0          # Circuit open until this monotonic time
+        self.trips = 0                 # Times the circuit opened without a success in between
+        self.last_status: Optional[int] = None
+        self.last_error = ""
+        self.last_used = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing so one early failure doesn't sink a model forever
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.recent_latencies) < MIN_SAMPLES_FOR_PERCENTILE:
+            return None
+        ordered = sorted(self.recent_latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def expected_cost(self) -> float:
+        """Latency we expect to pay per useful answer (slow or flaky models cost more)"""
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_LATENCY_SECONDS
+        return latency / self.success_rate
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        p90 = self.percentile(0.9)
+        return {
+            "model": self.name,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate, 3),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_p90_ms": round(p90 * 1000, 1) if p90 is not None else None,
+            "failure_streak": self.failure_streak,
+            "circuit": "open" if self.is_open(now) else ("half-open" if self.trips else "closed"),
+            "open_for_seconds": round(max(0.0, self.open_until - now), 1),
+            "last_status": self.last_status,
+            "last_error": self.last_error[:200],
+        }
+
+
+class ModelRouter:
+    def __init__(self):
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model_name: str) -> ModelStats:
+        stats = self._stats.get(model_name)
+        if stats is None:
+            stats = self._stats[model_name] = ModelStats(model_name)
+        return stats
+
+    def order(self, candidates: List[str]) -> List[str]:
+        """
+        Healthy models first, cheapest expected cost first (configured order breaks ties).
+        Models with an open circuit are skipped, unless every candidate is open -
+        then the one that re-opens soonest is tried so requests still have a chance.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = [self._get(name) for name in candidates]
+            closed = [s for s in stats if not s.is_open(now)]
+            if not closed:
+                soonest = min(stats, key=lambda s: s.open_until)
+                return [soonest.name]
+            ranked = sorted(closed, key=lambda s: (s.expected_cost(), candidates.index(s.name)))
+            return [s.name for s in ranked]
+
+    def record_success(self, model_name: str, latency: float) -> None:
+        with self._lock:
+            stats = self._get(model_name)
+            stats.successes += 1
+            stats.failure_streak = 0
+            stats.trips = 0
+            stats.open_until = 0.0
+            stats.last_status = 200
+            stats.last_used = time.time()
+            stats.recent_latencies.append(latency)
+            if stats.latency_ewma is None:
+                stats.latency_ewma = latency
+            else:
+                stats.latency_ewma = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stats.latency_ewma
+
+    def record_failure(
+        self,
+        model_name: str,
+        latency: float,
+        status_code: Optional[int] = None,
+        error: str = "",
+        retryable: bool = True
+    ) -> None:
+        """
+        Args:
+            status_code: HTTP status from the API, None for timeouts/connection errors
+            retryable: False for failures that say nothing about model health (e.g. bad JSON)
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = self._get(model_name)
+            stats.failures += 1
+            stats.last_status = status_code
+            stats.last_error = error
+            stats.last_used = time.time()
+
+            if not retryable:
+                return
+
+            # 429 (quota) and 404 (model gone) won't fix themselves on the next request
+            if status_code in (404, 429) or status_code is None or status_code >= 500:
+                stats.failure_streak += 1
+            else:
+                return
+
+            if status_code in (404, 429) or stats.failure_streak >= FAILURE_THRESHOLD:
+                stats.trips += 1
+                cooldown = min(CIRCUIT_COOLDOWN_SECONDS * (2 ** (stats.trips - 1)), CIRCUIT_MAX_COOLDOWN_SECONDS)
+                stats.open_until = now + cooldown
+                print(f"🔌 Circuit OPEN for {model_name} ({cooldown:.0f}s) after status {status_code}")
+
+    def latency_p90(self, model_name: str) -> Optional[float]:
+        """Observed p90 latency of successful calls, None until enough samples"""
+        with self._lock:
+            return self._get(model_name).percentile(0.9)
+
+    def state(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [s.to_dict(now) for s in self._stats.values()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Shared by every Gemini fallback loop in this worker
+model_router = ModelRouter()
+
+
+async def generate_json(
+    model_name: str,
+    prompt: str,
+    parse: Callable[[str], T],
+    timeout: Optional[float] = None
+) -> T:
+    """
+    Call a model through the shared client, parse its reply, and record the outcome.
+    Transport/HTTP errors and timeouts count against the model's circuit; an
+    unparseable reply only lowers its success rate. Cancellation (a hedged call
+    that lost the race) is not recorded at all.
+    """
+    start = time.perf_counter()
+    try:
+        response_text = await asyncio.wait_for(gemini_client.generate_content(model_name, prompt), timeout)
+    except asyncio.TimeoutError:
+        model_router.record_failure(model_name, time.perf_counter() - start, None, f"Timed out after {timeout:.1f}s")
+        raise
+    except GeminiError as e:
+        model_router.record_failure(model_name, time.perf_counter() - start, e.status_code, str(e))
+        raise
+    except Exception as e:
+        model_router.record_failure(model_name, time.perf_counter() - start, None, str(e))
+        raise
+
+    latency = time.perf_counter() - start
+    try:
+        result = parse(response_text)
+    except Exception as e:
+        model_router.record_failure(model_name, latency, 200, f"Unparseable reply: {e}", retryable=False)
+        raise
+
+    model_router.record_success(model_name, latency)
+    return result
@@ -0,0 +1,147 @@
+"""
+Bulk Repricing
+Set-based price changes ("all dal +8%", "all oil +₹5") for one owner's items.
+A repricing records every item's prior price in PriceChangeItem (INSERT ... SELECT),
+applies the new prices with one UPDATE, and can be undone with one UPDATE.
+"""
+import json
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from sqlmodel import Session, select, update, and_
+from sqlalchemy import case, func, literal
+from app.db.models import Item, PriceChange, PriceChangeItem
+from app.db.schemas import RepriceRequest
+from app.db.name_search import names_contain
+
+# Largest preview returned by a dry run
+MAX_PREVIEW_ROWS = 500
+
+
+def item_conditions(owner_id: int, request: RepriceRequest) -> List[Any]:
+    """WHERE conditions for the request's filter (raises ValueError if the filter is empty)"""
+    conditions = [Item.owner_id == owner_id]
+    filters = request.filter
+    if filters.category:
+        conditions.append(func.lower(Item.category) == filters.category.strip().lower())
+    if filters.name_contains:
+        conditions.append(names_contain(filters.name_contains.strip()))
+    if filters.ids:
+        conditions.append(Item.master_id.in_(filters.ids))
+    if len(conditions) == 1:
+        raise ValueError("Give at least one of category, name_contains or ids")
+
+    # Unset prices (0) stay unset unless the price is being set explicitly
+    if request.operation != "set":
+        conditions.append(Item.price > 0)
+    return conditions
+
+
+def new_price_expression(request: RepriceRequest):
+    """SQL expression for the new price of Item (rounded to paise, never negative)"""
+    price = Item.price
+    if request.operation == "percent":
+        expression = price * (1 + request.value / 100.0)
+    elif request.operation == "delta":
+        expression = price + request.value
+    elif request.operation == "set":
+        expression = literal(float(request.value))
+    else:
+        expression = price
+
+    step = request.value if request.operation == "round" else request.round_to
+    if step:
+        # Single-argument ROUND works on SQLite and on Postgres double precision
+        expression = func.round(expression / step) * step
+    else:
+        expression = func.round(expression * 100) / 100.0
+
+    return case((expression < 0, 0.0), else_=expression)
+
+
+def preview_reprice(session: Session, owner_id: int, request: RepriceRequest) -> List[Dict[str, Any]]:
+    """Rows a repricing would change, with old and new price (nothing is written)"""
+    rows = session.exec(
+        select(Item.master_id, Item.names, Item.price, new_price_expression(request))
+        .where(and_(*item_conditions(owner_id, request)))
+        .order_by(Item.category, Item.id)
+        .limit(MAX_PREVIEW_ROWS)
+    ).all()
+    return [_row(master_id, names, old_price, new_price) for master_id, names, old_price, new_price in rows]
+
+
+def apply_reprice(session: Session, owner_id: int, request: RepriceRequest) -> PriceChange:
+    """
+    Record prior prices and apply the new ones, without committing.
+    Two statements whatever the number of items: INSERT ... SELECT into PriceChangeItem,
+    then one UPDATE of item from those rows.
+    """
+    conditions = item_conditions(owner_id, request)
+    change = PriceChange(
+        owner_id=owner_id,
+        operation=request.operation,
+        value=request.value,
+        filter_json=json.dumps(request.filter.model_dump(exclude_none=True), ensure_ascii=False),
+    )
+    session.add(change)
+    session.flush()
+
+    snapshot = (
+        select(literal(change.id), Item.id, Item.master_id, Item.price, new_price_expression(request))
+        .where(and_(*conditions))
+    )
+    session.exec(PriceChangeItem.__table__.insert().from_select(
+        ["price_change_id", "item_id", "master_id", "old_price", "new_price"], snapshot
+    ))
+
+    change.item_count = _set_prices(session, change.id, PriceChangeItem.new_price)
+    session.add(change)
+    return change
+
+
+def rollback_reprice(session: Session, change: PriceChange) -> int:
+    """
+    Restore the prices recorded by a repricing with one UPDATE, without committing.
+    Items whose price was edited again afterwards are left alone. Returns the rows restored.
+    """
+    restored = _set_prices(session, change.id, PriceChangeItem.old_price, only_if_unchanged=True)
+    change.rolled_back_at = datetime.utcnow()
+    session.add(change)
+    return restored
+
+
+def changed_rows(session: Session, change_id: int) -> List[Dict[str, Any]]:
+    rows = session.exec(
+        select(PriceChangeItem.master_id, Item.names, PriceChangeItem.old_price, PriceChangeItem.new_price)
+        .join(Item, Item.id == PriceChangeItem.item_id)
+        .where(PriceChangeItem.price_change_id == change_id)
+        .order_by(PriceChangeItem.id)
+    ).all()
+    return [_row(master_id, names, old_price, new_price) for master_id, names, old_price, new_price in rows]
+
+
+def _set_prices(session: Session, change_id: int, price_column, only_if_unchanged: bool = False) -> int:
+    """UPDATE item SET price = <column of its PriceChangeItem row> for every item in the change"""
+    recorded = (
+        select(price_column)
+        .where(PriceChangeItem.price_change_id == change_id, PriceChangeItem.item_id == Item.id)
+        .scalar_subquery()
+    )
+    conditions = [Item.id.in_(select(PriceChangeItem.item_id).where(PriceChangeItem.price_change_id == change_id))]
+    if only_if_unchanged:
+        conditions.append(Item.price == (
+            select(PriceChangeItem.new_price)
+            .where(PriceChangeItem.price_change_id == change_id, PriceChangeItem.item_id == Item.id)
+            .scalar_subquery()
+        ))
+    result = session.exec(
+        update(Item)
+        .where(and_(*conditions))
+        .values(price=recorded, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _row(master_id: str, names: Optional[List[str]], old_price: float, new_price: float) -> Dict[str, Any]:
+    name = names[0] if names else master_id
+    return {"id": master_id, "name": name, "old_price": old_price, "new_price": round(float(new_price), 2)}
@@ -0,0 +1,84 @@
+"""
+Voice Response Cache
+Per-owner cache of AI answers keyed on a normalized transcript, so repeated counter
+phrases ("ek maggie", "aadha kilo cheeni") skip the model round trip.
+Keys include the inventory snapshot version, and the analytics version for answers
+built from sales data, so a cached answer is never served after the data changed.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from app.core import metrics
+from app.services.local_parser import tokenize, NUMBER_WORDS
+
+VOICE_CACHE_TTL_SECONDS = float(os.getenv("VOICE_CACHE_TTL_SECONDS", "900"))
+VOICE_CACHE_MAX_ENTRIES = int(os.getenv("VOICE_CACHE_MAX_ENTRIES", "5000"))
+
+CacheKey = Tuple[int, str, int, Optional[int]]
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, split glued numbers/units, turn number words into digits, collapse whitespace"""
+    words = []
+    for token in tokenize(text):
+        if token in NUMBER_WORDS:
+            token = f"{NUMBER_WORDS[token]:g}"
+        words.append(token)
+    return " ".join(words)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = VOICE_CACHE_MAX_ENTRIES, ttl_seconds: float = VOICE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, owner_id: int, text: str, inventory_version: int, analytics_version: Optional[int]) -> CacheKey:
+        """analytics_version: get_analytics_version for answers built from sales data, else None"""
+        return (owner_id, normalize_transcript(text), inventory_version, analytics_version)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment("voice_cache_hits")
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            metrics.increment("voice_cache_misses")
+            return None
+
+    def put(self, key: CacheKey, response: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by /voice/process in this worker
+response_cache = ResponseCache()
@@ -0,0 +1,136 @@
+"""
+Sales Rollups
+Per-shop aggregates of Bill and SaleItem so the dashboard and the AI's business context
+(dashboard_queries.py) read a few hundred rows instead of the whole sales history:
+  daily_sales        (owner, local date)                                  -> bills, revenue
+  hourly_item_sales  (owner, local date, hour, category, item, unit)      -> quantity, sales, times sold
+Saving bills adds to them in the same transaction (record_sales: INSERT ... ON CONFLICT DO UPDATE
+SET x = x + excluded.x); rebuild_rollups() recomputes them from the raw rows.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, delete
+from app.db.models import Bill, SaleItem, DailySales, HourlyItemSales
+
+try:
+    from zoneinfo import ZoneInfo
+    SHOP_TIMEZONE = ZoneInfo(os.getenv("SHOP_TIMEZONE", "Asia/Kolkata"))
+except Exception:
+    # No tz database (e.g. Windows without tzdata): India Standard Time has no DST
+    SHOP_TIMEZONE = timezone(timedelta(hours=5, minutes=30))
+
+# Rows per INSERT when rebuilding or recording a batch of bills
+ROLLUP_CHUNK_ROWS = 1000
+
+
+def local_time(moment: datetime) -> datetime:
+    """Naive UTC timestamp (how Bill.bill_date is stored) -> shop-local time"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(SHOP_TIMEZONE)
+
+
+def local_today() -> date:
+    return local_time(datetime.utcnow()).date()
+
+
+def _dialect(session: Session):
+    return postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+
+
+def _hourly_key(owner_id: int, moment: datetime, category: str, name: str, unit: str) -> Tuple:
+    local = local_time(moment)
+    return (owner_id, local.date(), local.hour, category or "Other", name or "", unit or "")
+
+
+def _aggregate(bills: Iterable[Tuple], sales: Iterable[Tuple]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    bills (owner_id, bill_date, total_amount) and sales (owner_id, sale_date, category, name, unit,
+    quantity, total_price) -> daily and hourly rollup rows, one per key
+    """
+    daily: Dict[Tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+    for owner, bill_date, total in bills:
+        totals = daily[(owner, local_time(bill_date).date())]
+        totals[0] += 1
+        totals[1] += float(total or 0)
+
+    hourly: Dict[Tuple, List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+    for owner, sale_date, category, name, unit, quantity, total in sales:
+        totals = hourly[_hourly_key(owner, sale_date, category, name, unit)]
+        totals[0] += float(quantity or 0)
+        totals[1] += float(total or 0)
+        totals[2] += 1
+
+    daily_rows = [{"owner_id": owner, "sale_date": day, "bill_count": int(t[0]), "revenue": t[1]}
+                  for (owner, day), t in daily.items()]
+    return daily_rows, [_hourly_row(key, totals) for key, totals in hourly.items()]
+
+
+def record_sales(session: Session, bills: Iterable[Tuple], sales: Iterable[Tuple]) -> None:
+    """
+    Add new bills and their sale lines (tuples as for _aggregate) to the rollups, in the caller's
+    transaction: INSERT ... ON CONFLICT DO UPDATE increments, one statement per table executed
+    for all rows.
+    """
+    dialect = _dialect(session)
+    connection = session.connection()
+    # Aggregated first: a statement may not update the same row twice
+    daily_rows, hourly_rows = _aggregate(bills, sales)
+
+    if daily_rows:
+        daily = dialect.insert(DailySales)
+        connection.execute(daily.on_conflict_do_update(
+            index_elements=["owner_id", "sale_date"],
+            set_={
+                "bill_count": DailySales.bill_count + daily.excluded.bill_count,
+                "revenue": DailySales.revenue + daily.excluded.revenue,
+            },
+        ), daily_rows)
+
+    if hourly_rows:
+        hourly = dialect.insert(HourlyItemSales)
+        connection.execute(hourly.on_conflict_do_update(
+            index_elements=["owner_id", "sale_date", "hour", "item_category", "item_name", "unit"],
+            set_={
+                "quantity": HourlyItemSales.quantity + hourly.excluded.quantity,
+                "sales": HourlyItemSales.sales + hourly.excluded.sales,
+                "line_count": HourlyItemSales.line_count + hourly.excluded.line_count,
+            },
+        ), hourly_rows)
+
+
+def _hourly_row(key: Tuple, totals: List[float]) -> Dict[str, Any]:
+    owner_id, sale_date, hour, category, name, unit = key
+    return {
+        "owner_id": owner_id, "sale_date": sale_date, "hour": hour, "item_category": category,
+        "item_name": name, "unit": unit, "quantity": totals[0], "sales": totals[1], "line_count": int(totals[2]),
+    }
+
+
+def rebuild_rollups(session: Session, owner_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Recompute the rollups of one owner (or every owner) from Bill and SaleItem, without committing.
+    Returns (daily rows, hourly rows) written.
+    """
+    bills = select(Bill.owner_id, Bill.bill_date, Bill.total_amount)
+    sales = select(SaleItem.owner_id, SaleItem.sale_date, SaleItem.item_category, SaleItem.item_name,
+                   SaleItem.unit, SaleItem.quantity, SaleItem.total_price)
+    clear_daily, clear_hourly = delete(DailySales), delete(HourlyItemSales)
+    if owner_id is not None:
+        bills = bills.where(Bill.owner_id == owner_id)
+        sales = sales.where(SaleItem.owner_id == owner_id)
+        clear_daily = clear_daily.where(DailySales.owner_id == owner_id)
+        clear_hourly = clear_hourly.where(HourlyItemSales.owner_id == owner_id)
+
+    daily_rows, hourly_rows = _aggregate(
+        session.exec(bills.execution_options(yield_per=ROLLUP_CHUNK_ROWS)),
+        session.exec(sales.execution_options(yield_per=ROLLUP_CHUNK_ROWS)),
+    )
+    session.exec(clear_daily)
+    session.exec(clear_hourly)
+    for model, rows in ((DailySales, daily_rows), (HourlyItemSales, hourly_rows)):
+        for start in range(0, len(rows), ROLLUP_CHUNK_ROWS):
+            session.exec(model.__table__.insert(), params=rows[start:start + ROLLUP_CHUNK_ROWS])
+    return len(daily_rows), len(hourly_rows)
+
@@ -0,0 +1,108 @@
+"""
+Streaming JSON Parser
+Incrementally scans a model reply shaped like the billing JSON
+({"type", "customer_name", "items": [...], "msg", ...}) and reports each
+top-level field and each bill item the moment its JSON is complete.
+"""
+import json
+from typing import List, Dict, Any, Tuple, Optional
+
+# Top-level string fields worth reporting before the reply is finished
+EARLY_FIELDS = ("type", "customer_name", "msg")
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "key", "expect_key", "parent_key")
+
+    def __init__(self, kind: str, start: int, parent_key: Optional[str]):
+        self.kind = kind              # "obj" or "arr"
+        self.start = start            # Index of the opening bracket in the buffer
+        self.key: Optional[str] = None
+        self.expect_key = kind == "obj"
+        self.parent_key = parent_key  # Key this container is the value of
+
+
+class BillStreamParser:
+    """
+    Feed text chunks with feed(); each call returns newly completed events:
+      ("field", {"name": ..., "value": ...}) for type / customer_name / msg
+      ("item", {...}) for every complete object in the top-level "items" array
+    finish() returns the whole decoded reply.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._started = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self.buffer += chunk
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        buffer = self.buffer
+
+        while self._pos < len(buffer):
+            i = self._pos
+            ch = buffer[i]
+            self._pos += 1
+
+            if not self._started:
+                # Skip ```json fences or chatter before the opening brace
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(_Frame("obj", i, None))
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string(buffer[self._string_start:i + 1], events)
+                continue
+
+            if not self._stack:
+                continue  # Past the end of the top-level object
+
+            frame = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{" or ch == "[":
+                parent_key = frame.key if frame.kind == "obj" else frame.parent_key
+                self._stack.append(_Frame("obj" if ch == "{" else "arr", i, parent_key))
+            elif ch == "}" or ch == "]":
+                closed = self._stack.pop()
+                self._on_close(closed, buffer[closed.start:i + 1], events)
+            elif ch == ":" and frame.kind == "obj":
+                frame.expect_key = False
+            elif ch == "," and frame.kind == "obj":
+                frame.expect_key = True
+
+        return events
+
+    def _on_string(self, literal: str, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        frame = self._stack[-1]
+        if frame.kind != "obj":
+            return
+        if frame.expect_key:
+            frame.key = json.loads(literal)
+            return
+        if len(self._stack) == 1 and frame.key in EARLY_FIELDS:
+            events.append(("field", {"name": frame.key, "value": json.loads(literal)}))
+
+    def _on_close(self, closed: _Frame, literal: str, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        # An object directly inside the top-level "items" array is one bill line
+        if (closed.kind == "obj" and len(self._stack) == 2
+                and self._stack[-1].kind == "arr" and self._stack[-1].parent_key == "items"):
+            events.append(("item", json.loads(literal)))
+
+    def finish(self) -> Dict[str, Any]:
+        """Decode the complete reply (raises ValueError if it never became valid JSON)"""
+        clean_text = self.buffer.replace("```json", "").replace("```", "").strip()
+        return json.loads(clean_text)
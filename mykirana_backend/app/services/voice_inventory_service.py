@@ -2,15 +2,42 @@
 Voice Inventory Service
 Handles AI-powered voice-to-inventory parsing
 """
-import google.generativeai as genai
-import os
+import asyncio
 import json
-from typing import List, Dict, Any
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.model_router import model_router, generate_json
+from app.services.alias_lexicon import alias_lexicon
+
+# Try multiple Gemini models
+CANDIDATE_MODELS = [
+    "gemini-2.0-flash-lite",
+    "gemini-flash-latest",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-001"
+]
 
-# Configure Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key, transport="rest")
+# Items per model call; small chunks come back fast and rarely break the JSON
+CHUNK_ITEMS = int(os.getenv("VOICE_INVENTORY_CHUNK_ITEMS", "12"))
+# Chunks parsed at the same time per request
+CHUNK_CONCURRENCY = int(os.getenv("VOICE_INVENTORY_CONCURRENCY", "8"))
+# Extra rounds for chunks that failed on every model
+CHUNK_RETRIES = 1
+CHUNK_TIMEOUT_SECONDS = float(os.getenv("VOICE_INVENTORY_CHUNK_TIMEOUT_SECONDS", "20"))
+
+# "category anaaj ..." starts a new section
+CATEGORY_BOUNDARY = re.compile(r"(?i)(?=\bcategory\b)")
+CATEGORY_HEADER = re.compile(r"(?i)category\s+[^\s,]+")
+# Explicit separators between items
+ITEM_SEPARATOR = re.compile(r"(?i)\s*(?:,|;|\||।|\n|\baur\b|\band\b)\s*")
+# A spoken price ends an item: "25 rs kilo", "30 rupees per kg", "₹40 litre"
+ITEM_PRICE = re.compile(
+    r"(?i)(?:₹\s*\d+(?:\.\d+)?|\d+(?:\.\d+)?\s*(?:rs\.?|rupees?|rupaye|rupay|rupya|rupiya|/-))"
+    r"(?:\s*(?:(?:per|prati|ek|a)\b|/))?"
+    r"(?:\s*(?:kilo|kg|kgs|litre|liter|ltr|plate|piece|pieces|pc|pcs|packet|pkt|dozen|gram|grams|gm|g)\b)?"
+)
 
 
 def normalize_category_name(category_name: str, existing_categories: List[str]) -> str:
@@ -36,28 +63,155 @@ def normalize_category_name(category_name: str, existing_categories: List[str])
     return normalized.capitalize()
 
 
-def parse_voice_inventory(
+async def parse_voice_inventory(
     raw_text: str,
-    existing_items: List[Dict[str, Any]],
-    existing_categories: List[str]
+    snapshot: InventorySnapshot
 ) -> Dict[str, Any]:
     """
     Parse voice input into structured inventory items
+    Long dictation is split on category/item boundaries and the chunks are parsed
+    concurrently; chunks that fail are retried on their own instead of re-parsing everything.
     
     Args:
         raw_text: Raw voice transcription
-        existing_items: List of existing inventory items
-        existing_categories: List of existing categories
+        snapshot: The owner's compiled inventory (existing items and categories)
     
     Returns:
         Structured inventory data with categories and items
     """
+    existing_categories = list(snapshot.categories)
+    chunks = split_dictation(raw_text)
+    print(f"✂️ Voice inventory split into {len(chunks)} chunk(s)")
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+    errors: List[str] = [""] * len(chunks)
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    
+    async def parse(index: int):
+        async with semaphore:
+            results[index], errors[index] = await _parse_chunk(chunks[index], existing_categories)
+    
+    # First round for every chunk, then only the failed ones
+    pending = list(range(len(chunks)))
+    for attempt in range(1 + CHUNK_RETRIES):
+        if attempt:
+            print(f"🔁 Retrying {len(pending)} failed chunk(s)")
+        await asyncio.gather(*(parse(index) for index in pending))
+        pending = [index for index in pending if results[index] is None]
+        if not pending:
+            break
+    
+    if len(pending) == len(chunks):
+        # All models failed for everything - return fallback
+        last_error = next((e for e in reversed(errors) if e), "")
+        print(f"❌ All models failed. Last error: {last_error}")
+        print(f"   Raw text was: {raw_text}")
+        return {
+            "categories": [{
+                "name": "Other",
+                "items": [{
+                    "name": "Parse Error - Check Logs",
+                    "price": 0,
+                    "unit": "kg",
+                    "is_existing": False,
+                    "aliases": [f"Error: {last_error[:100]}"]
+                }]
+            }],
+            "raw_text": raw_text,
+            "error": last_error
+        }
+    
+    # Merge chunks (in dictation order), then normalize categories and check existing items
+    merged: Dict[str, Dict[str, Any]] = {}
+    for parsed_data in results:
+        for category in (parsed_data or {}).get('categories', []):
+            name = normalize_category_name(category.get('name') or 'Other', existing_categories)
+            target = merged.setdefault(name.lower(), {"name": name, "items": []})
+            target['items'].extend(category.get('items') or [])
+    
+    for category in merged.values():
+        # Check each item against existing inventory, aliases from the shared lexicon
+        for item in category['items']:
+            _mark_existing_item(item, snapshot)
+            _fill_aliases(item)
+    
+    parsed_data = {"categories": list(merged.values()), "raw_text": raw_text}
+    if pending:
+        parsed_data["unparsed_segments"] = [chunks[index] for index in pending]
+        print(f"⚠️ {len(pending)} chunk(s) could not be parsed")
+    
+    print(f"✅ Parsed voice inventory: {len(parsed_data['categories'])} categories")
+    
+    # Debug: Print parsed items
+    for cat in parsed_data['categories']:
+        print(f"   Category: {cat.get('name')}")
+        for item in cat.get('items', []):
+            existing_marker = " (EXISTING)" if item.get('is_existing') else " (NEW)"
+            print(f"      - {item.get('name')}: ₹{item.get('price')}/{item.get('unit')}{existing_marker}")
+    
+    return parsed_data
+
+
+def split_dictation(raw_text: str, max_items: int = CHUNK_ITEMS) -> List[str]:
+    """
+    Split dictation into chunks of at most `max_items` items without cutting an item
+    in half. Chunks never span two categories; a category that is split repeats its
+    "category <name>" header on every chunk so the model keeps the grouping.
+    """
+    chunks: List[str] = []
+    for section in CATEGORY_BOUNDARY.split(raw_text):
+        section = section.strip(" ,.")
+        if not section:
+            continue
+        items = _split_items(section)
+        header = ""
+        match = CATEGORY_HEADER.match(section)
+        if match:
+            header = match.group(0).strip()
+        # Even chunk sizes (25 items -> 13 + 12, not 12 + 12 + 1)
+        count = -(-len(items) // max_items)
+        size = -(-len(items) // count) if count else max_items
+        for start in range(0, len(items), size):
+            chunk = ", ".join(items[start:start + size])
+            if start and header:
+                chunk = f"{header} {chunk}"
+            chunks.append(chunk)
+    return chunks or [raw_text]
+
+
+def _split_items(section: str) -> List[str]:
+    """Item phrases of one category section: split on commas/"aur", or after each spoken price"""
+    pieces = [p.strip() for p in ITEM_SEPARATOR.split(section) if p and p.strip()]
+    items: List[str] = []
+    for piece in pieces:
+        cut = 0
+        for match in ITEM_PRICE.finditer(piece):
+            items.append(piece[cut:match.end()].strip())
+            cut = match.end()
+        tail = piece[cut:].strip()
+        if tail:
+            items.append(tail)
     
-    # Build context about existing inventory
-    inventory_context = _build_inventory_context(existing_items, existing_categories)
+    # A fragment without letters (a stray number/unit) belongs to the previous item
+    merged: List[str] = []
+    for item in items:
+        if merged and not re.search(r"[^\W\d_]", item):
+            merged[-1] = f"{merged[-1]} {item}"
+        else:
+            merged.append(item)
+    return merged
+
+
+def _build_prompt(raw_text: str, existing_categories: List[str]) -> str:
+    # Items other shops have already named don't need model-invented aliases
+    known_items = alias_lexicon.known_names(raw_text)
+    known_rule = ""
+    if known_items:
+        known_rule = f"""5. These items already have aliases, give them "aliases": [] - {', '.join(known_items)}
+"""
     
     # Create AI prompt (simplified for better reliability)
-    prompt = f"""You are an inventory parser for a Kirana store in India.
+    return f"""You are an inventory parser for a Kirana store in India.
 
 Parse this voice input into structured inventory items:
 "{raw_text}"
@@ -69,7 +223,7 @@ RULES:
 2. Extract item name, price (with rs/rupees), and unit (kg/litre/plate/etc)
 3. If no category mentioned, use "Other"
 4. Normalize units: kilo→kg, litre→litre, plate→plate
-
+{known_rule}
 EXAMPLE INPUT: "category anaaj gehun 25 rs kilo, bajra 30 rupees kg"
 EXAMPLE OUTPUT:
 {{
@@ -81,148 +235,93 @@ EXAMPLE OUTPUT:
         {{"name": "Bajra", "price": 30, "unit": "kg", "is_existing": false, "aliases": ["बाजरा", "Pearl Millet"]}}
       ]
     }}
-  ],
-  "raw_text": "{raw_text}"
+  ]
 }}
 
 Return ONLY valid JSON. No explanation."""
 
-    # Try multiple Gemini models
-    candidate_models = [
-        "gemini-2.0-flash-lite",
-        "gemini-flash-latest",
-        "gemini-2.0-flash",
-        "gemini-2.0-flash-001"
-    ]
 
+async def _parse_chunk(chunk: str, existing_categories: List[str]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """One chunk through the model fallback loop -> (parsed JSON or None, last error)"""
+    prompt = _build_prompt(chunk, existing_categories)
     last_error = ""
-    for model_name in candidate_models:
+    for model_name in model_router.order(CANDIDATE_MODELS):
         try:
             print(f"🔄 Trying model: {model_name}...")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            
-            result_text = response.text.strip()
-            print(f"📝 Raw AI response: {result_text[:200]}...")  # Debug: show first 200 chars
-            
-            # Extract JSON from response
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            # Try to parse JSON
-            try:
-                parsed_data = json.loads(result_text)
-            except json.JSONDecodeError as je:
-                print(f"❌ JSON parse error: {je}")
-                print(f"   Attempted to parse: {result_text[:500]}")
-                raise
-            
-            # Post-process: Normalize category names and check for existing items
-            if 'categories' in parsed_data:
-                for category in parsed_data['categories']:
-                    if 'name' in category:
-                        category['name'] = normalize_category_name(
-                            category['name'],
-                            existing_categories
-                        )
-                    
-                    # Check each item against existing inventory
-                    if 'items' in category:
-                        for item in category['items']:
-                            _mark_existing_item(item, existing_items)
-            
-            print(f"✅ Parsed voice inventory: {len(parsed_data.get('categories', []))} categories")
-            
-            # Debug: Print parsed items
-            for cat in parsed_data.get('categories', []):
-                print(f"   Category: {cat.get('name')}")
-                for item in cat.get('items', []):
-                    existing_marker = " (EXISTING)" if item.get('is_existing') else " (NEW)"
-                    print(f"      - {item.get('name')}: ₹{item.get('price')}/{item.get('unit')}{existing_marker}")
-            
-            return parsed_data
-            
+            parsed_data = await generate_json(model_name, prompt, _extract_json, timeout=CHUNK_TIMEOUT_SECONDS)
+            if not isinstance(parsed_data.get('categories'), list):
+                raise ValueError("Reply has no categories list")
+            return parsed_data, ""
         except Exception as e:
-            print(f"⚠️ {model_name} Failed: {e}")
-            import traceback
-            traceback.print_exc()
-            last_error = str(e)
+            print(f"⚠️ {model_name} Failed: {e!r}")
+            last_error = str(e) or repr(e)
             continue
+    return None, last_error
+
+
+def _extract_json(response_text: str) -> Dict[str, Any]:
+    """Pull the JSON object out of a model reply (with or without markdown fences)"""
+    result_text = response_text.strip()
+    print(f"📝 Raw AI response: {result_text[:200]}...")  # Debug: show first 200 chars
     
-    # All models failed - return fallback
-    print(f"❌ All models failed. Last error: {last_error}")
-    print(f"   Raw text was: {raw_text}")
-    return {
-        "categories": [{
-            "name": "Other",
-            "items": [{
-                "name": "Parse Error - Check Logs",
-                "price": 0,
-                "unit": "kg",
-                "is_existing": False,
-                "aliases": [f"Error: {last_error[:100]}"]
-            }]
-        }],
-        "raw_text": raw_text,
-        "error": last_error
-    }
-
-
-def _mark_existing_item(item: Dict[str, Any], existing_items: List[Dict[str, Any]]) -> None:
+    # Extract JSON from response
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+    
+    # Try to parse JSON
+    try:
+        return json.loads(result_text)
+    except json.JSONDecodeError as je:
+        print(f"❌ JSON parse error: {je}")
+        print(f"   Attempted to parse: {result_text[:500]}")
+        raise
+
+
+def _fill_aliases(item: Dict[str, Any]) -> None:
+    """
+    Aliases for a parsed item: the lexicon's names first (what other shops call it),
+    then any the model added. Modifies item dict in-place.
+    """
+    name = (item.get('name') or '').strip()
+    known = alias_lexicon.lookup(name)
+    if not known:
+        return
+    
+    aliases = []
+    seen = {name.lower()}
+    for alias in known + list(item.get('aliases') or []):
+        if alias and alias.lower() not in seen:
+            seen.add(alias.lower())
+            aliases.append(alias)
+    item['aliases'] = aliases
+
+
+def _mark_existing_item(item: Dict[str, Any], snapshot: InventorySnapshot) -> None:
     """
     Check if item exists in inventory and mark it with old price
     Modifies item dict in-place
     
     Args:
         item: Parsed item dict from AI
-        existing_items: List of existing inventory items
+        snapshot: The owner's compiled inventory
     """
     item_name = item.get('name', '').lower().strip()
     
-    # Search for matching item (case-insensitive name match)
-    for existing in existing_items:
-        existing_names = existing.get('names', [])
+    # Exact name match, ignoring case, script and spelling variants ("चावल" / "chaawal").
+    # No prefix or fuzzy guesses: saving the review screen overwrites the matched item.
+    existing = snapshot.find_by_name(item_name)
+    if existing is not None:
+        # Found match - mark as existing and store old price
+        item['is_existing'] = True
+        item['old_price'] = existing.price
+        item['old_unit'] = existing.unit or 'kg'
+        item['existing_id'] = existing.master_id
         
-        # Check if any name matches
-        for existing_name in existing_names:
-            if existing_name.lower().strip() == item_name:
-                # Found match - mark as existing and store old price
-                item['is_existing'] = True
-                item['old_price'] = existing.get('price', 0)
-                item['old_unit'] = existing.get('unit', 'kg')
-                item['existing_id'] = existing.get('id', '')
-                
-                print(f"   🔍 Found existing item: {item_name} (₹{item['old_price']}/{item['old_unit']} → ₹{item.get('price')}/{item.get('unit')})")
-                return
+        print(f"   🔍 Found existing item: {item_name} (₹{item['old_price']}/{item['old_unit']} → ₹{item.get('price')}/{item.get('unit')})")
+        return
     
     # Not found - mark as new
     item['is_existing'] = False
     item['old_price'] = None
-
-
-def _build_inventory_context(items: List[Dict[str, Any]], categories: List[str]) -> str:
-    """Build context string about existing inventory"""
-    
-    context_parts = []
-    
-    # Add categories
-    if categories:
-        context_parts.append(f"Existing Categories: {', '.join(categories)}")
-    
-    # Add sample items (limit to 20 for context size)
-    if items:
-        sample_items = items[:20]
-        items_str = []
-        for item in sample_items:
-            names = item.get('names', [])
-            name = names[0] if names else 'Unknown'
-            price = item.get('price', 0)
-            unit = item.get('unit', 'kg')
-            category = item.get('category', 'Other')
-            items_str.append(f"{name} (₹{price}/{unit}) in {category}")
-        
-        context_parts.append(f"Sample Existing Items:\n" + "\n".join(items_str))
-    
-    return "\n\n".join(context_parts) if context_parts else "No existing inventory"
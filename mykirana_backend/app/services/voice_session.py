@@ -0,0 +1,147 @@
+"""
+Voice Session State
+In-memory state of one continuous-listening session (/voice/session WebSocket):
+the pinned inventory snapshot, the bill being built, the customer name and the
+question the assistant is waiting on. Lets follow-ups like "aur ek packet" or
+"saath rupaye kilo" resolve without the client resending history.
+"""
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from app.services.inventory_snapshot import InventorySnapshot, InventoryRecord
+from app.services.local_parser import parse_followup, DEFAULT_MSG
+
+# "Aam ki keemat kya hai?" / "Chawal ka rate kya hai?" - the assistant is waiting for a price
+PRICE_QUESTION_PATTERN = re.compile(
+    r"([^.!?।]+?)\s+(?:ki|ka|ke)\s+(?:keemat|kimat|price|rate|daam)\s+(?:kya|kitna|kitni)",
+    re.IGNORECASE,
+)
+# Turns of history sent to the model while a question is pending
+MAX_CONVERSATION_TURNS = 2
+
+
+class VoiceSession:
+    """Conversation state for one owner's WebSocket session"""
+
+    def __init__(self, owner_id: int, snapshot: InventorySnapshot):
+        self.owner_id = owner_id
+        self.snapshot = snapshot
+        self.customer_name = "Walk-in"
+        self.lines: List[Dict[str, Any]] = []
+        self.last_item: Optional[InventoryRecord] = None    # Target of "aur ek packet"
+        self.pending_item: Optional[str] = None             # Item we asked the price of
+        self.turns: List[Tuple[str, str]] = []              # (user said, assistant replied)
+
+    def refresh(self, snapshot: InventorySnapshot) -> None:
+        """Swap in a newer inventory snapshot (after an inventory edit mid-session)"""
+        self.snapshot = snapshot
+        if self.last_item is not None:
+            self.last_item = snapshot.find_by_name(self.last_item.names[0]) if self.last_item.names else None
+
+    def reset(self) -> None:
+        """Start a new bill, keeping the inventory"""
+        self.customer_name = "Walk-in"
+        self.lines = []
+        self.last_item = None
+        self.pending_item = None
+        self.turns = []
+
+    def resolve_locally(self, user_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Follow-ups that only make sense with session state:
+        a price for the item we asked about, or more of the last billed item.
+        """
+        if self.pending_item is not None:
+            record = self._find_record(self.pending_item)
+            line = parse_followup(user_text, record) if record is not None else None
+            if line is not None:
+                return self._bill_response([line])
+            return None
+
+        line = parse_followup(user_text, self.last_item)
+        if line is not None:
+            return self._bill_response([line])
+        return None
+
+    def conversation(self) -> Optional[List[Tuple[str, str]]]:
+        """Recent turns for the prompt, only while the assistant is waiting on an answer"""
+        if self.pending_item is None or not self.turns:
+            return None
+        return self.turns[-MAX_CONVERSATION_TURNS:]
+
+    def apply(self, user_text: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fold a /voice/process-shaped response into the session bill.
+        Returns the delta the client applies: new lines, lines whose quantity grew,
+        and the customer name if it changed.
+        """
+        msg = response.get("msg", "") or ""
+        self.turns.append((user_text, msg))
+        del self.turns[:-MAX_CONVERSATION_TURNS]
+
+        delta: Dict[str, Any] = {"added": [], "updated": []}
+        customer_name = response.get("customer_name")
+        if customer_name and customer_name != "Walk-in" and customer_name != self.customer_name:
+            self.customer_name = customer_name
+            delta["customer_name"] = customer_name
+
+        if response.get("type") == "BILL":
+            for item in response.get("items") or []:
+                line, is_new = self._merge(item)
+                delta["added" if is_new else "updated"].append(line)
+                record = self._find_record(line["name"])
+                if record is not None:
+                    self.last_item = record
+
+        question = PRICE_QUESTION_PATTERN.search(msg)
+        self.pending_item = question.group(1).strip() if question else None
+
+        delta["total"] = self.total()
+        return delta
+
+    def bill(self) -> Dict[str, Any]:
+        return {"customer_name": self.customer_name, "items": list(self.lines), "total": self.total()}
+
+    def total(self) -> float:
+        return round(sum((float(line.get("total", 0) or 0) for line in self.lines), 0.0), 2)
+
+    def _merge(self, item: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Same item at the same rate adds to the existing line; anything else is a new line"""
+        name = (item.get("name") or "").strip()
+        rate = float(item.get("rate", 0) or 0)
+        for line in self.lines:
+            if line["name"].lower() == name.lower() and float(line.get("rate", 0) or 0) == rate:
+                qty = _line_qty(line) + _line_qty(item)
+                line["qty"] = round(qty, 3)
+                line["qty_display"] = f"{round(qty, 3):g}{line.get('unit', '')}"
+                line["total"] = round(float(line.get("total", 0) or 0) + float(item.get("total", 0) or 0), 2)
+                return line, False
+
+        line = dict(item, name=name, qty=round(_line_qty(item), 3))
+        self.lines.append(line)
+        return line, True
+
+    def _find_record(self, phrase: str) -> Optional[InventoryRecord]:
+        """Item named at the end of a phrase ("Raju ke liye toor dal" -> Toor Dal)"""
+        words = phrase.split()
+        for start in range(len(words)):
+            record = self.snapshot.find_by_name(" ".join(words[start:]))
+            if record is not None:
+                return record
+        return None
+
+    def _bill_response(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "type": "BILL",
+            "customer_name": self.customer_name,
+            "items": items,
+            "msg": DEFAULT_MSG,
+            "should_stop": False,
+        }
+
+
+def _line_qty(item: Dict[str, Any]) -> float:
+    """Numeric quantity of a bill line (model replies only carry qty_display, e.g. "1.5kg")"""
+    if item.get("qty") is not None:
+        return float(item["qty"])
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", str(item.get("qty_display", "")))
+    return float(match.group(1)) if match else 1.0
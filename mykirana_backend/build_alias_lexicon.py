@@ -0,0 +1,26 @@
+# build_alias_lexicon.py
+from sqlmodel import Session
+from app.db.database import engine
+from app.db.models import AliasLexiconEntry
+from app.services.alias_lexicon import rebuild_alias_lexicon, alias_lexicon, MIN_SHOPS
+
+def build_alias_lexicon():
+    """
+    Rebuild the shared alias lexicon from every shop's items.
+    Safe to run on production: the table is replaced in one transaction.
+    Running servers pick up the new version on their next restart.
+    """
+    print("🔨 Building alias lexicon...")
+    
+    try:
+        AliasLexiconEntry.metadata.create_all(engine)
+        with Session(engine) as session:
+            version = rebuild_alias_lexicon(session, min_shops=MIN_SHOPS)
+        
+        print(f"✅ Alias lexicon v{version} ready: {len(alias_lexicon)} names")
+        
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+
+if __name__ == "__main__":
+    build_alias_lexicon()
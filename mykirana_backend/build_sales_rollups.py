@@ -0,0 +1,31 @@
+# build_sales_rollups.py
+import sys
+from sqlmodel import Session
+from app.db.database import engine, create_db_and_tables
+from app.services.sales_rollups import rebuild_rollups
+
+def build_sales_rollups(owner_id=None):
+    """
+    Rebuild the dashboard rollups (daily_sales, hourly_item_sales) from Bill and SaleItem.
+    Use after importing bills directly into the database or changing SHOP_TIMEZONE.
+    Safe to run on production: rollups are replaced in one transaction. Bills saved
+    while it runs may be missed on Postgres, so run it when shops are closed (or run it twice).
+
+    Usage: python build_sales_rollups.py [owner_id]
+    """
+    target = f"user {owner_id}" if owner_id is not None else "all users"
+    print(f"🔨 Rebuilding sales rollups for {target}...")
+    
+    try:
+        create_db_and_tables()
+        with Session(engine) as session:
+            daily, hourly = rebuild_rollups(session, owner_id)
+            session.commit()
+        
+        print(f"✅ Rollups rebuilt: {daily} daily rows, {hourly} hourly item rows")
+        
+    except Exception as e:
+        print(f"❌ Rebuild failed: {e}")
+
+if __name__ == "__main__":
+    build_sales_rollups(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,33 @@
+# migrate.py
+import sys
+from app.db.database import create_db_and_tables, engine
+from app.db.migrations import MIGRATIONS, applied_versions, run_migrations
+
+def migrate(status_only: bool = False):
+    """
+    Bring the database schema up to date: create missing tables, then apply
+    pending versioned migrations (app/db/migrations.py).
+    Safe to run on production database. The server also does this at startup.
+
+    Usage: python migrate.py           apply pending migrations
+           python migrate.py --status  list migrations without applying
+    """
+    try:
+        create_db_and_tables()
+        applied = set(applied_versions(engine))
+
+        print("📋 Migrations:")
+        for version, name, _ in MIGRATIONS:
+            print(f"   {'✅' if version in applied else '⏳'} {version:>3}  {name}")
+        if status_only:
+            return
+
+        done = run_migrations(engine)
+        print(f"✅ Applied {len(done)} migration(s)" if done else "✅ Nothing to apply, schema is current")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    migrate(status_only="--status" in sys.argv)
@@ -2,6 +2,7 @@
 Quick test script to verify AI response speed
 Run this to check if optimizations are working
 """
+import asyncio
 import time
 import os
 from dotenv import load_dotenv
@@ -72,7 +73,7 @@ def test_ai_speed():
         
         start = time.time()
         try:
-            result = ai_service.process_voice_command(query, inventory)
+            result = asyncio.run(ai_service.process_voice_command(query, inventory))
             elapsed = time.time() - start
             total_time += elapsed
             
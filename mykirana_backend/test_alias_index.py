@@ -0,0 +1,159 @@
+"""
+Microbenchmark: alias index vs linear name scans
+Builds a synthetic inventory with 10,000 aliases (Latin, Devanagari and misspelt variants)
+and compares the old linear `lower()` / substring scans with AliasIndex exact, prefix
+and fuzzy lookups. Also checks that every script/spelling variant resolves to the same item,
+and that different words sharing a phonetic key ("dalia" ~ "dal") are never exact matches,
+in the index or in the shared alias lexicon.
+
+Usage: python test_alias_index.py [aliases]
+"""
+import random
+import sys
+import time
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.db.models import Item
+from app.services.alias_index import AliasIndex
+from app.services.alias_lexicon import alias_lexicon, rebuild_alias_lexicon
+from app.services.inventory_snapshot import InventorySnapshot
+
+ALIASES = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+LOOKUPS = 2_000
+
+# (Latin names, Devanagari name, spoken variants that must resolve to the same item)
+BASE_ITEMS = [
+    (["Chawal", "Rice"], "चावल", ["chaawal", "chawal", "CHAWAL"]),
+    (["Cheeni", "Sugar"], "चीनी", ["chini", "cheeni"]),
+    (["Toor Dal", "Arhar Dal"], "तूर दाल", ["toor daal", "tur dal"]),
+    (["Sarson Tel", "Mustard Oil"], "सरसों तेल", ["sarson tel", "sarsoon tel"]),
+    (["Doodh", "Milk"], "दूध", ["dudh", "doodh"]),
+    (["Namkeen"], "नमकीन", ["namkin", "namkeen"]),
+    (["Haldi", "Turmeric"], "हल्दी", ["haldee", "haldi"]),
+    (["Besan", "Gram Flour"], "बेसन", ["beshan", "besan"]),
+    (["Sabun", "Soap"], "साबुन", ["saabun", "sabun"]),
+    (["Adrak", "Ginger"], "अदरक", ["adrakh", "adrak"]),
+    (["Dal"], "दाल", ["daal", "dal"]),
+    (["Chai", "Tea"], "चाय", ["chai", "tea"]),
+]
+# Different words (or too short to name anything): lookup must not return these items
+NOT_EXACT = [("dalia", "Dal"), ("cha", "Chai"), ("ta", "Chai"), ("te", "Chai")]
+BRANDS = ["Tata", "Fortune", "Aashirvaad", "Patanjali", "Amul", "Dabur", "Saffola", "Everest", "MDH", "Haldiram"]
+PRODUCTS = ["Masala", "Ghee", "Pickle", "Papad", "Sauce", "Jam", "Shampoo", "Detergent", "Agarbatti",
+            "Chips", "Juice", "Coffee", "Rava", "Maida", "Sooji", "Vermicelli", "Ketchup", "Honey"]
+
+
+def make_inventory(aliases: int):
+    random.seed(aliases)
+    items = [{"id": f"base-{i}", "names": latin + [hindi], "price": 50, "unit": "kg", "category": "Kirana"}
+             for i, (latin, hindi, _) in enumerate(BASE_ITEMS)]
+    count = sum(len(item["names"]) for item in items)
+    while count < aliases:
+        brand, product = random.choice(BRANDS), random.choice(PRODUCTS)
+        grams = random.choice([50, 100, 200, 250, 500, 1000])
+        names = [f"{brand} {product} {grams}g", f"{product} {brand} {len(items)}", f"{brand} {len(items)}"]
+        items.append({"id": str(len(items)), "names": names, "price": random.randint(10, 500),
+                      "unit": "packet", "category": product})
+        count += len(names)
+    return InventorySnapshot.from_dicts(items)
+
+
+def linear_exact(records, name):
+    name = name.lower().strip()
+    for record in records:
+        if name in record.names_lower:
+            return record
+    return None
+
+
+def linear_prefix(records, prefix, limit=10):
+    found = [record for record in records if any(n.startswith(prefix) for n in record.names_lower)]
+    return found[:limit] or None
+
+
+def timed(label, fn, queries, baseline=None):
+    start = time.perf_counter()
+    hits = sum(1 for q in queries if fn(q) is not None)
+    per_op = (time.perf_counter() - start) / len(queries) * 1e6
+    speedup = f"{baseline / per_op:>9.0f}x" if baseline else f"{'':>10}"
+    print(f"{label:<34}{per_op:>12.2f}{hits / len(queries):>9.0%}{speedup}")
+    return per_op
+
+
+def main():
+    snapshot = make_inventory(ALIASES)
+    records = snapshot.records
+    aliases = sum(len(r.names) for r in records)
+
+    start = time.perf_counter()
+    index = AliasIndex(records)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    random.seed(7)
+    exact_queries = [random.choice(random.choice(records).names) for _ in range(LOOKUPS)]
+    prefix_queries = [q.split()[0][:5] for q in exact_queries]
+    variant_queries = [random.choice(variants) for _ in range(LOOKUPS) for _, _, variants in [random.choice(BASE_ITEMS)]]
+
+    print("\n" + "=" * 70)
+    print(f"🔎 ALIAS INDEX BENCHMARK - {len(records)} items, {aliases} aliases (build {build_ms:.0f} ms)")
+    print("=" * 70)
+    print(f"{'lookup':<34}{'µs/op':>12}{'hits':>9}{'speedup':>10}")
+    base = timed("linear exact (lower())", lambda q: linear_exact(records, q), exact_queries)
+    timed("index exact (lookup)", lambda q: index.lookup(q) or None, exact_queries, base)
+    base = timed("linear startswith (prefix)", lambda q: linear_prefix(records, q.lower()), prefix_queries)
+    timed("index prefix (trie)", lambda q: index.complete(q, limit=10) or None, prefix_queries, base)
+    base = timed("linear exact (spelling variants)", lambda q: linear_exact(records, q), variant_queries)
+    timed("index resolve (variants)", index.resolve, variant_queries, base)
+    print("-" * 70)
+
+    # Every script/spelling variant must land on the same master_id
+    failures = 0
+    for latin, hindi, variants in BASE_ITEMS:
+        expected = snapshot.find_by_name(latin[0]).master_id
+        for query in [hindi] + variants:
+            found = index.resolve(query)
+            if found is None or found.master_id != expected:
+                failures += 1
+                print(f"❌ {query!r} -> {found.master_id if found else None} (expected {expected})")
+    print("✅ All variants resolved to the same item" if not failures else f"❌ {failures} variants failed")
+
+    wrong = 0
+    for query, name in NOT_EXACT:
+        found = [record.display_name for record in index.lookup(query)]
+        record = snapshot.find_by_name(query)
+        if name in found or (record is not None and record.display_name == name):
+            wrong += 1
+            print(f"❌ {query!r} matched {name} exactly")
+    print("✅ No phonetic-only exact matches" if not wrong else f"❌ {wrong} phonetic-only exact matches")
+    failures += wrong
+    failures += check_lexicon()
+    print("=" * 70 + "\n")
+    sys.exit(1 if failures else 0)
+
+
+def check_lexicon() -> int:
+    """Two shops stock Dal, two stock Dalia: each must keep its own aliases"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for owner_id in (1, 2):
+            session.add(Item(owner_id=owner_id, master_id="1", names=["Dal", "Daal", "दाल"], price=120, unit="kg", category="Anaaj"))
+            session.add(Item(owner_id=owner_id, master_id="2", names=["Dalia", "Daliya"], price=60, unit="kg", category="Anaaj"))
+        session.commit()
+        rebuild_alias_lexicon(session)
+
+    failures = 0
+    for query, expected in [("dal", "Dal"), ("DAAL", "Dal"), ("दाल", "Dal"), ("dalia", "Dalia"), ("da", None)]:
+        names = alias_lexicon.lookup(query)
+        got = names[0] if names else None
+        if got != expected:
+            failures += 1
+            print(f"❌ lexicon {query!r} -> {got} (expected {expected})")
+    print("✅ Lexicon keeps Dal and Dalia apart" if not failures else f"❌ {failures} lexicon lookups failed")
+    return failures
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: bill history pages by OFFSET (all fields) vs by cursor with a list projection
+Seeds a busy shop with a year of bills (100 a day, 8 items each) in an isolated database,
+then scrolls the whole history through GET /analytics/bills:
+  offset  ?limit=50&offset=N                     (reads and skips N bills, decodes every items_json)
+  offset  the same with the list projection      (the cost of skipping alone)
+  cursor  ?limit=50&cursor=...&fields=<no items> (one index range per page, no items_json)
+Reports the time per page at several depths; the cursor column should stay flat.
+
+Usage: python test_bill_pagination.py [bills_per_day]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bill_pages.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+from app.main import app
+from app.db.database import engine
+from app.db.models import Bill
+from app.core.security import create_access_token
+
+BILLS_PER_DAY = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 100
+PAGE = 50
+LIST_FIELDS = "id,total_amount,total_items,customer_name,payment_method,bill_date"
+DEPTHS = [1, 10, 100, 300, 700, 1500, 2900]
+
+
+def seed():
+    random.seed(3)
+    now = datetime.utcnow()
+    items = json.dumps([{"name": f"Item {i}", "category": "Anaaj", "quantity": 2, "unit": "kg",
+                         "price": 45.5, "total": 91.0} for i in range(8)])
+    rows = [{"owner_id": owner, "total_amount": 728.0, "total_items": 8, "items_json": items,
+             "payment_method": "cash", "bill_date": when, "created_at": when, "updated_at": when}
+            for owner in (1, 2)
+            for when in (now - timedelta(seconds=random.randint(0, 365 * 86400)) for _ in range(365 * BILLS_PER_DAY))]
+    with Session(engine) as session:
+        session.exec(Bill.__table__.insert(), params=rows)
+        session.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return len(rows) // 2
+
+
+def timed_get(client, headers, params):
+    start = time.perf_counter()
+    response = client.get("/analytics/bills", params=params, headers=headers)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.text
+    return elapsed, response.json()
+
+
+def main():
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+    with TestClient(app) as client:
+        total = seed()
+        pages = (total + PAGE - 1) // PAGE
+
+        # Scroll the whole year by cursor, timing every page
+        cursor_ms, seen, cursor = [], 0, None
+        while True:
+            params = {"limit": PAGE, "fields": LIST_FIELDS, **({"cursor": cursor} if cursor else {})}
+            elapsed, body = timed_get(client, headers, params)
+            cursor_ms.append(elapsed)
+            seen += len(body["bills"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        assert seen == total, f"cursor scroll returned {seen} of {total} bills"
+
+        print("\n" + "=" * 82)
+        print(f"📜 BILL HISTORY PAGINATION - {total:,} bills in a year, {PAGE} per page, {pages} pages")
+        print("=" * 82)
+        print(f"{'page':>6}{'offset + items ms':>20}{'offset + fields ms':>20}{'cursor + fields ms':>22}{'speedup':>12}")
+        for depth in [d for d in DEPTHS if d <= pages]:
+            offset = {"limit": PAGE, "offset": (depth - 1) * PAGE}
+            offset_ms = min(timed_get(client, headers, offset)[0] for _ in range(3))
+            projected_ms = min(timed_get(client, headers, {**offset, "fields": LIST_FIELDS})[0] for _ in range(3))
+            page_ms = cursor_ms[depth - 1]
+            print(f"{depth:>6}{offset_ms:>20.1f}{projected_ms:>20.1f}{page_ms:>22.1f}{offset_ms / page_ms:>11.1f}x")
+        print("-" * 82)
+        print(f"✅ Scrolled all {seen:,} bills by cursor: {sum(cursor_ms) / 1000:.2f}s total, "
+              f"page min {min(cursor_ms):.1f} / avg {sum(cursor_ms) / len(cursor_ms):.1f} / max {max(cursor_ms):.1f} ms")
+        print("=" * 82 + "\n")
+
+
+if __name__ == "__main__":
+    main()
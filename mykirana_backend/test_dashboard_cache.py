@@ -0,0 +1,206 @@
+"""
+Dashboard cache check: hits, invalidation on bills and inventory changes, TTL, size bound,
+Redis-protocol backend shared by two workers, and behaviour with the server down.
+Finishes with a home-screen polling simulation that reports hit ratio and saved query time.
+
+The Redis backend runs against a small in-process stand-in server (the handful of commands the
+cache uses). Set DASHBOARD_CACHE_TEST_URL=redis://localhost:6379/15 to also run it against a
+real server (keys are prefixed and removed afterwards).
+
+Usage: python test_dashboard_cache.py
+"""
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'dashboard_cache.db')}"
+os.environ["INTERNAL_TOKEN"] = "dashboard-cache-test"
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.security import create_access_token
+from app.services.dashboard_cache import (
+    dashboard_cache, DashboardCache, InProcessBackend, RedisBackend
+)
+
+POLLS = 500
+BILL_EVERY = 25
+
+
+class StandInRedis(socketserver.ThreadingTCPServer):
+    """RESP server with the commands the cache uses: PING AUTH SELECT HGET HSET PEXPIRE DEL"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.execute(args))
+
+    def execute(self, args):
+        server, command = self.server, args[0].decode().upper()
+        with server.lock:
+            server.commands += 1
+            now = time.monotonic()
+            for key in [k for k, (_, expires) in server.data.items() if expires and expires <= now]:
+                del server.data[key]
+            if command in ("PING", "AUTH", "SELECT"):
+                return b"+OK\r\n"
+            if command == "HGET":
+                value = server.data.get(args[1], ({}, None))[0].get(args[2])
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if command == "HSET":
+                fields, expires = server.data.setdefault(args[1], ({}, None))
+                new = args[2] not in fields
+                fields[args[2]] = args[3]
+                return b":%d\r\n" % new
+            if command == "PEXPIRE":
+                if args[1] not in server.data:
+                    return b":0\r\n"
+                server.data[args[1]] = (server.data[args[1]][0], now + int(args[2]) / 1000)
+                return b":1\r\n"
+            if command == "DEL":
+                return b":%d\r\n" % sum(server.data.pop(key, None) is not None for key in args[1:])
+            return b"-ERR unknown command\r\n"
+
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        sys.exit(1)
+
+
+def bill(client, headers, amount):
+    response = client.post("/analytics/bills", headers=headers, json={
+        "total_amount": amount,
+        "items": [{"name": "Chawal", "category": "Anaaj", "quantity": 1, "unit": "kg", "price": amount, "total": amount}],
+    })
+    assert response.status_code == 200, response.text
+
+
+def dashboard(client, headers):
+    response = client.get("/analytics/dashboard?days=30", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def exercise(client, headers, label):
+    """Hit, invalidate on a bill, invalidate on an inventory change"""
+    dashboard_cache.reset_stats()
+    first = dashboard(client, headers)
+    second = dashboard(client, headers)
+    check(f"{label}: second read is a hit with the same payload",
+          dashboard_cache.hits == 1 and dashboard_cache.misses == 1 and first == second)
+
+    revenue = first["summary"]["total_revenue"]
+    bill(client, headers, 40)
+    after_bill = dashboard(client, headers)
+    check(f"{label}: new bill invalidates ({revenue} -> {after_bill['summary']['total_revenue']})",
+          dashboard_cache.misses == 2 and after_bill["summary"]["total_revenue"] == revenue + 40)
+
+    items = after_bill["summary"]["total_inventory_items"]
+    client.post("/items/", headers=headers, json={"id": f"cache-{label}", "names": [f"Item {label}"],
+                                                  "price": 10, "unit": "pc"})
+    after_item = dashboard(client, headers)
+    check(f"{label}: inventory change invalidates ({items} -> {after_item['summary']['total_inventory_items']} items)",
+          after_item["summary"]["total_inventory_items"] == items + 1)
+
+
+def main():
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+    server = StandInRedis()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backends = [("memory", InProcessBackend()), ("stand-in redis", RedisBackend(server.url))]
+    if os.getenv("DASHBOARD_CACHE_TEST_URL"):
+        backends.append(("redis", RedisBackend(os.getenv("DASHBOARD_CACHE_TEST_URL"), prefix="dashboard-test")))
+
+    print("\n" + "=" * 70)
+    print("🗄️  DASHBOARD CACHE CHECK" + ("" if len(backends) > 2 else "  (no DASHBOARD_CACHE_TEST_URL - real Redis skipped)"))
+    print("=" * 70)
+    with TestClient(app) as client:
+        bill(client, headers, 100)
+
+        for label, backend in backends:
+            dashboard_cache.backend = backend
+            exercise(client, headers, label)
+
+        # Two workers sharing one Redis: a bill saved through worker B drops worker A's entry
+        from sqlmodel import Session
+        from app.db.database import engine
+        worker_a, worker_b = DashboardCache(RedisBackend(server.url)), DashboardCache(RedisBackend(server.url))
+        worker_a.invalidate(1)
+        with Session(engine) as session:
+            worker_a.get_dashboard(session, 1)
+            worker_b.get_dashboard(session, 1)
+            worker_b.invalidate(1)
+            worker_a.get_dashboard(session, 1)
+        check("shared backend: worker A misses after worker B invalidates",
+              worker_a.misses == 2 and worker_b.hits == 1)
+
+        # TTL and the in-process size bound
+        short = DashboardCache(InProcessBackend(), ttl_seconds=0.05)
+        with Session(engine) as session:
+            short.get_dashboard(session, 1)
+            time.sleep(0.1)
+            short.get_dashboard(session, 1)
+        check("expired entries are recomputed", short.misses == 2)
+        small = InProcessBackend(max_bytes=10_000)
+        for owner in range(100):
+            small.set(owner, "30:today", b"x" * 1_000, 60)
+        check(f"in-process size bound keeps {small.stats()['entries']} entries, {small.stats()['bytes']} bytes",
+              small.stats()["bytes"] <= 10_000 and small.get(99, "30:today") and not small.get(0, "30:today"))
+
+        # Server down: dashboard still served, and only the first call waits for the connect
+        down = DashboardCache(RedisBackend("redis://127.0.0.1:1/0"))
+        with Session(engine) as session:
+            payload = down.get_dashboard(session, 1)
+            start = time.perf_counter()
+            for _ in range(10):
+                down.get_dashboard(session, 1)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        check(f"unreachable server: payload served, errors counted, 10 more calls in {elapsed_ms:.0f} ms",
+              payload["summary"]["total_bills"] > 0 and down.errors >= 2 and elapsed_ms < 1000)
+
+        # Home screen polling with a bill now and then
+        for label, backend in backends[:2]:
+            dashboard_cache.backend = backend
+            dashboard_cache.reset_stats()
+            for poll in range(POLLS):
+                if poll and poll % BILL_EVERY == 0:
+                    bill(client, headers, 25)
+                dashboard(client, headers)
+            stats = dashboard_cache.stats()
+            print(f"📈 {label:<15} {POLLS} polls, bill every {BILL_EVERY}: hit ratio {stats['hit_ratio']:.1%}, "
+                  f"saved {stats['saved_query_ms']:.0f} ms of dashboard queries")
+        metrics = client.get("/internal/metrics", headers={"X-Internal-Token": "dashboard-cache-test"}).json()
+        check("/internal/metrics reports the cache", metrics["dashboard_cache"]["hits"] > 0)
+
+    for label, backend in backends:
+        backend.invalidate(1)
+    server.shutdown()
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Tail-latency benchmark for AIService hedging
+Stubs the Gemini call with a slow-tailed primary model and a steady fallback,
+then compares p50/p95/p99 with hedging off and on. No network or API key needed.
+
+Usage: python test_hedging_speed.py [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app.services import gemini_client as gemini_module
+from app.services.ai_service import AIService
+from app.services.model_router import model_router
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+FAKE_RESPONSE = '{"type": "QUERY", "customer_name": "Walk-in", "items": [], "msg": "ok", "should_stop": false}'
+
+# (fast latency, slow latency, chance of slow) per model
+PROFILES = {
+    "gemini-2.5-flash": (0.30, 6.0, 0.10),     # Usually fast, 10% of calls hang
+    "gemini-flash-latest": (0.45, 0.60, 0.02),
+    "gemini-2.0-flash": (0.50, 0.70, 0.02),
+    "gemini-2.0-flash-001": (0.50, 0.70, 0.02),
+}
+
+
+async def fake_generate(model_name: str, prompt: str) -> str:
+    fast, slow, slow_chance = PROFILES[model_name]
+    await asyncio.sleep(slow if random.random() < slow_chance else fast * random.uniform(0.8, 1.2))
+    return FAKE_RESPONSE
+
+
+async def run(service: AIService, label: str):
+    model_router.reset()
+    random.seed(42)
+    prompt = "benchmark prompt"
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        result = await service.generate(prompt, lambda text: {"ok": True})
+        latencies.append((time.perf_counter() - start, result is not None))
+
+    # Warm up so the router has p90 estimates, then measure in concurrent batches
+    for _ in range(10):
+        await one()
+    latencies.clear()
+    for _ in range(REQUESTS // 20):
+        await asyncio.gather(*[one() for _ in range(20)])
+
+    times = sorted(t for t, _ in latencies)
+    ok = sum(1 for _, success in latencies if success)
+
+    def pct(fraction):
+        return times[min(len(times) - 1, int(len(times) * fraction))]
+
+    print(f"{label:<28}{ok:>5}/{len(times):<5}{pct(0.5):>9.2f}{pct(0.95):>9.2f}{pct(0.99):>9.2f}{times[-1]:>9.2f}")
+
+
+async def main():
+    gemini_module.gemini_client.generate_content = fake_generate
+
+    print("\n" + "=" * 70)
+    print(f"⏱️  HEDGING BENCHMARK - {REQUESTS} requests, primary hangs 10% of the time")
+    print("=" * 70)
+    print(f"{'configuration':<28}{'ok':>11}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'max (s)':>9}")
+
+    await run(AIService(latency_budget=60, attempt_timeout=60, hedging=False), "no deadline, no hedge")
+    await run(AIService(latency_budget=8, attempt_timeout=2, hedging=False), "2s attempt deadline")
+    await run(AIService(latency_budget=8, attempt_timeout=6, hedging=True), "hedge at observed p90")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Local billing parser check: a table of counter utterances and what the fast path must return.
+A line is (utterance, expected) where expected is a list of (name, qty, rate) bill lines, or
+None when the parser must hand the utterance to the AI (anything it cannot bill for certain).
+Also checks follow-ups ("aur ek packet") against the item the conversation is about.
+
+Usage: python test_local_parser.py
+"""
+import sys
+
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.local_parser import parse_billing_command, parse_followup
+
+INVENTORY = [
+    {"id": "1", "names": ["Chawal", "Rice", "चावल"], "price": 60, "unit": "kg", "category": "Anaaj"},
+    {"id": "2", "names": ["Chini", "Sugar", "चीनी"], "price": 45, "unit": "kg", "category": "Anaaj"},
+    {"id": "3", "names": ["Sarson Tel", "Mustard Oil"], "price": 180, "unit": "litre", "category": "Tel"},
+    {"id": "4", "names": ["Maggi", "Maggie"], "price": 14, "unit": "packet", "category": "Snacks"},
+    {"id": "5", "names": ["Anda", "Egg"], "price": 7, "unit": "pic", "category": "Dairy"},
+    {"id": "6", "names": ["Haldi"], "price": 0, "unit": "kg", "category": "Masala"},
+    {"id": "7", "names": ["Dal", "दाल"], "price": 120, "unit": "kg", "category": "Anaaj"},
+    {"id": "8", "names": ["Chai", "Tea"], "price": 50, "unit": "packet", "category": "Chai"},
+]
+
+CASES = [
+    # Clear-cut: number words, units, rates
+    ("do kilo chawal", [("Chawal", 2, 60)]),
+    ("2 kilo chawal", [("Chawal", 2, 60)]),
+    ("chawal 2kg", [("Chawal", 2, 60)]),
+    ("500 gram chini", [("Chini", 0.5, 45)]),
+    ("aadha kilo chini", [("Chini", 0.5, 45)]),
+    ("do kilo chawal aur ek litre sarson tel", [("Chawal", 2, 60), ("Sarson Tel", 1, 180)]),
+    ("teen maggi", [("Maggi", 3, 14)]),
+    ("2 packet maggi", [("Maggi", 2, 14)]),
+    ("maggi 2 packet", [("Maggi", 2, 14)]),
+    ("ek darjan anda", [("Anda", 12, 7)]),
+    ("chawal", [("Chawal", 1, 60)]),
+    ("चावल दो किलो", [("Chawal", 2, 60)]),
+    ("2 kilo chawal 70 rs kilo", [("Chawal", 2, 70)]),
+    ("do kilo chini 40 rs wali", [("Chini", 2, 40)]),
+    ("maggi 12 rs wali", [("Maggi", 1, 12)]),
+    ("chawal de do", [("Chawal", 1, 60)]),
+    ("ek kilo daal", [("Dal", 1, 120)]),
+    ("ek packet tea", [("Chai", 1, 50)]),
+
+    # Not clear-cut: the AI decides
+    ("chawal 50", None),              # 50 kg? 50 rupees' worth?
+    ("50 chawal", None),
+    ("2 maggi", None),                # bare number, no unit or number word
+    ("chini 20 rupaye", None),        # most likely 20 rupees' worth
+    ("₹20 chini", None),
+    ("50 rs ka chawal", None),        # "worth N rupees"
+    ("do kilo anda", None),           # weight for a per-piece item
+    ("ek litre chawal", None),        # wrong dimension
+    ("do kilo haldi", None),          # no price in inventory
+    ("do kilo basmati", None),        # unknown item
+    ("chawal kitne ka hai", None),    # question
+    ("Ramesh ke liye do kilo chawal", None),
+    ("chawal hatao", None),
+    ("ek kilo dalia", None),          # not Dal: only lossless spelling folds bill directly
+    ("ek packet cha", None),          # not Chai
+    ("do packet te", None),           # too short to name anything
+    ("", None),
+]
+
+FOLLOWUPS = [
+    # (utterance, item name, expected line or None)
+    ("aur ek packet", "Maggi", ("Maggi", 1, 14)),
+    ("do kilo aur", "Chawal", ("Chawal", 2, 60)),
+    ("aur 3", "Maggi", None),
+    ("aur 20 rupaye", "Chini", None),
+    ("aur ek kilo chini", "Chawal", None),   # names an item: not a follow-up
+]
+
+
+def lines(result):
+    if result is None:
+        return None
+    return [(line["name"], line["qty"], line["rate"]) for line in result["items"]]
+
+
+def main():
+    snapshot = InventorySnapshot.from_dicts(INVENTORY)
+    by_name = {record.display_name: record for record in snapshot.records}
+    failures = 0
+
+    print("\n" + "=" * 78)
+    print(f"🧮 LOCAL PARSER CHECK - {len(CASES)} utterances, {len(FOLLOWUPS)} follow-ups")
+    print("=" * 78)
+    for text, expected in CASES:
+        got = lines(parse_billing_command(text, snapshot.billing_aliases, snapshot.billing_item))
+        ok = got == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {text!r:<42} -> {got if got is not None else 'AI'}"
+              + ("" if ok else f"  (expected {expected if expected is not None else 'AI'})"))
+
+    for text, name, expected in FOLLOWUPS:
+        line = parse_followup(text, by_name[name])
+        got = (line["name"], line["qty"], line["rate"]) if line is not None else None
+        ok = got == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {text!r:<30} about {name:<10} -> {got if got is not None else 'AI'}"
+              + ("" if ok else f"  (expected {expected if expected is not None else 'AI'})"))
+
+    print("=" * 78)
+    print(f"{'✅ All cases pass' if not failures else f'❌ {failures} case(s) failed'}\n")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
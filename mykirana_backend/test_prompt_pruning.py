@@ -0,0 +1,114 @@
+"""
+Benchmark: full vs relevance-pruned inventory in the billing prompt
+Builds synthetic shops of 50, 500 and 5,000 items and compares prompt size
+(estimated tokens), prompt build time and whether the spoken items survive pruning.
+If GEMINI_API_KEY is set, it also measures real model latency for both prompts.
+
+Usage: python test_prompt_pruning.py
+"""
+import asyncio
+import os
+import random
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services import ai_service as ai_module
+from app.services.ai_service import AIService
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.gemini_client import gemini_client
+
+SHOP_SIZES = [50, 500, 5000]
+
+BASE_ITEMS = [
+    (["Chawal", "Rice", "चावल"], 60, "kg"), (["Aata", "Atta", "Wheat Flour", "आटा"], 40, "kg"),
+    (["Cheeni", "Sugar", "चीनी"], 45, "kg"), (["Toor Dal", "Arhar Dal", "तूर दाल"], 140, "kg"),
+    (["Sarson Tel", "Mustard Oil", "सरसों तेल"], 180, "litre"), (["Maggi", "Noodles"], 14, "packet"),
+    (["Namak", "Salt", "नमक"], 25, "kg"), (["Doodh", "Milk", "दूध"], 60, "litre"),
+    (["Anda", "Egg", "अंडा"], 7, "piece"), (["Sabun", "Soap", "साबुन"], 35, "piece"),
+    (["Haldi", "Turmeric", "हल्दी"], 240, "kg"), (["Besan", "Gram Flour", "बेसन"], 90, "kg"),
+    (["Poha", "Flattened Rice", "पोहा"], 55, "kg"), (["Chai Patti", "Tea", "चाय पत्ती"], 420, "kg"),
+    (["Biscuit", "Parle G"], 10, "packet"), (["Moong Dal", "मूंग दाल"], 120, "kg"),
+]
+BRANDS = ["Tata", "Fortune", "Aashirvaad", "Patanjali", "Amul", "Dabur", "Saffola", "Everest", "MDH", "Haldiram"]
+PRODUCTS = ["Masala", "Ghee", "Pickle", "Papad", "Sauce", "Jam", "Soap", "Shampoo", "Detergent", "Agarbatti",
+            "Namkeen", "Chips", "Juice", "Coffee", "Rava", "Maida", "Sooji", "Vermicelli", "Ketchup", "Honey"]
+
+UTTERANCES = [
+    ("customer raju do kilo chaawal aur ek packet maggie", {"Chawal", "Maggi"}),
+    ("teen kilo cheeni aadha litre sarso tel aur ek dozen ande", {"Cheeni", "Sarson Tel", "Anda"}),
+    ("1kg toor daal aur 500 gram besan, mohan ke liye", {"Toor Dal", "Besan"}),
+    ("chai pati ek paav aur do biscuit, naam sunita", {"Chai Patti", "Biscuit"}),
+]
+
+
+def make_shop(size: int) -> InventorySnapshot:
+    random.seed(size)
+    items = [{"id": str(i), "names": names, "price": price, "unit": unit, "category": "Kirana"}
+             for i, (names, price, unit) in enumerate(BASE_ITEMS)]
+    while len(items) < size:
+        brand, product = random.choice(BRANDS), random.choice(PRODUCTS)
+        grams = random.choice([50, 100, 200, 250, 500, 1000])
+        items.append({
+            "id": str(len(items)),
+            "names": [f"{brand} {product} {grams}g", f"{product} {brand}"],
+            "price": random.randint(10, 500),
+            "unit": "packet",
+            "category": product,
+        })
+    return InventorySnapshot.from_dicts(items[:size])
+
+
+def build(service: AIService, snapshot: InventorySnapshot, text: str, prune: bool):
+    ai_module.PROMPT_PRUNE_MIN_ITEMS = 40 if prune else 10 ** 9
+    start = time.perf_counter()
+    prompt = service.build_prompt(text, snapshot)
+    return prompt, (time.perf_counter() - start) * 1000
+
+
+async def model_latency(prompt: str) -> float:
+    start = time.perf_counter()
+    await gemini_client.generate_content("gemini-2.5-flash", prompt)
+    return time.perf_counter() - start
+
+
+async def main():
+    service = AIService()
+    live = bool(os.getenv("GEMINI_API_KEY"))
+
+    print("\n" + "=" * 92)
+    print("✂️  PROMPT PRUNING BENCHMARK" + ("" if live else "  (no GEMINI_API_KEY - model latency skipped)"))
+    print("=" * 92)
+    print(f"{'items':>6}{'mode':>8}{'~tokens':>10}{'build ms':>10}{'recall':>9}{'model s':>10}")
+
+    for size in SHOP_SIZES:
+        snapshot = make_shop(size)
+        # The alias index is built once per inventory version, not per prompt: time it apart
+        start = time.perf_counter()
+        snapshot.alias_index
+        index_ms = (time.perf_counter() - start) * 1000
+        for prune in (False, True):
+            tokens, build_ms, found, wanted, latencies = [], [], 0, 0, []
+            for text, expected in UTTERANCES:
+                prompt, ms = build(service, snapshot, text, prune)
+                tokens.append(len(prompt) // 4)
+                build_ms.append(ms)
+                wanted += len(expected)
+                found += sum(1 for name in expected if f'"{name}"' in prompt)
+                if live:
+                    try:
+                        latencies.append(await model_latency(prompt))
+                    except Exception as e:
+                        print(f"⚠️ Model call failed: {e}")
+            latency = f"{sum(latencies) / len(latencies):.2f}" if latencies else "-"
+            print(f"{size:>6}{'pruned' if prune else 'full':>8}{sum(tokens) // len(tokens):>10}"
+                  f"{sum(build_ms) / len(build_ms):>10.2f}{found / wanted:>9.0%}{latency:>10}")
+        print(f"{'':>6}{'':>8}  alias index built once per inventory version in {index_ms:.1f} ms")
+        print("-" * 92)
+
+    await gemini_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
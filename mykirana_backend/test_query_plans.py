@@ -0,0 +1,144 @@
+"""
+Query plan check: every dashboard, bill history and inventory read uses an index
+Seeds an isolated database with several shops, runs the real endpoints through TestClient,
+captures each SELECT they send and EXPLAINs it. Fails (exit 1) if any of them scans the
+bill, saleitem, item, itemtombstone or rollup table without an index.
+
+SQLite by default; set QUERY_PLAN_DATABASE_URL to a throwaway Postgres database to check
+its plans too (sequential scans are disabled there, so a Seq Scan means no usable index).
+
+Usage: python test_query_plans.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = os.getenv("QUERY_PLAN_DATABASE_URL") or f"sqlite:///{os.path.join(_db_dir, 'plans.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import Session
+from app.main import app
+from app.db.database import engine
+from app.db.models import Bill, SaleItem, Item
+from app.core.security import create_access_token
+from app.services.inventory_sync import to_cursor
+from app.services.sales_rollups import rebuild_rollups
+
+SHOPS = 20
+BILLS_PER_SHOP = 300
+TABLES = ("bill", "saleitem", "item", "itemtombstone", "daily_sales", "hourly_item_sales")
+ENDPOINTS = [
+    ("bill history", "/analytics/bills?limit=50&fields=id,total_amount,total_items,bill_date"),
+    # {next_cursor} is the previous response's cursor
+    ("bill history page", "/analytics/bills?limit=50&cursor={next_cursor}"),
+    ("dashboard", "/analytics/dashboard?days=30"),
+    ("inventory list", "/items/"),
+    ("inventory changes", f"/items/changes?since={to_cursor(datetime.utcnow() - timedelta(days=1))}"),
+]
+
+
+def seed():
+    random.seed(1)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        for owner in range(1, SHOPS + 1):
+            session.add_all(Item(master_id=str(i), names=[f"Item {i}"], category=f"Cat {i % 8}", price=10 + i,
+                                 unit="kg", owner_id=owner) for i in range(100))
+            for b in range(BILLS_PER_SHOP):
+                when = now - timedelta(days=random.randint(0, 180), hours=random.randint(0, 23))
+                bill = Bill(owner_id=owner, total_amount=100, total_items=2, items_json="[]", bill_date=when)
+                session.add(bill)
+                session.flush()
+                session.add_all(SaleItem(owner_id=owner, bill_id=bill.id, item_name=f"Item {s}",
+                                         item_category=f"Cat {s % 8}", quantity=1, unit="kg", price_per_unit=50,
+                                         total_price=50, sale_date=when, hour_of_day=when.hour) for s in range(2))
+        rebuild_rollups(session)
+        session.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def capture_selects(client, headers):
+    """Endpoint label -> SELECT statements (with parameters) it executed"""
+    captured = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: captured.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", listener)
+    queries = {}
+    next_cursor = ""
+    try:
+        for label, path in ENDPOINTS:
+            captured.clear()
+            response = client.get(path.format(next_cursor=next_cursor), headers=headers)
+            assert response.status_code == 200, f"{path}: {response.status_code} {response.text[:200]}"
+            body = response.json()
+            next_cursor = (body.get("next_cursor") if isinstance(body, dict) else None) or next_cursor
+            queries[label] = [(s, p) for s, p in captured
+                              if s.lstrip().upper().startswith(("SELECT", "WITH")) and re.search(r"\b(" + "|".join(TABLES) + r")\b", s)]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return queries
+
+
+def sqlite_plan(conn, statement, parameters):
+    """(plan lines, problems) - a problem is a full scan of one of TABLES"""
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    lines = [row[-1] for row in rows]
+    problems = [line for line in lines
+                if re.match(r"SCAN (" + "|".join(TABLES) + r")\b", line) and "USING" not in line]
+    return lines, problems
+
+
+def postgres_plan(conn, statement, parameters):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    lines, problems = [], []
+
+    def walk(node):
+        relation = node.get("Relation Name")
+        lines.append(f"{node['Node Type']} {relation or ''} {node.get('Index Name', '')}".strip())
+        if node["Node Type"] == "Seq Scan" and relation in TABLES:
+            problems.append(lines[-1])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return lines, problems
+
+
+def main():
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "3"})}
+    with TestClient(app) as client:
+        seed()
+        queries = capture_selects(client, headers)
+
+    explain = postgres_plan if engine.dialect.name == "postgresql" else sqlite_plan
+    failures = 0
+    print("\n" + "=" * 78)
+    print(f"🔍 QUERY PLAN CHECK ({engine.dialect.name}) - {SHOPS} shops, {SHOPS * BILLS_PER_SHOP} bills")
+    print("=" * 78)
+    with engine.connect() as conn:
+        for label, statements in queries.items():
+            assert statements, f"{label}: no queries captured"
+            for statement, parameters in statements:
+                lines, problems = explain(conn, statement, parameters)
+                ok = not problems
+                failures += 0 if ok else 1
+                summary = " ".join(statement.split())[:60]
+                print(f"{'✅' if ok else '❌'} {label:<18} {summary}")
+                for line in lines:
+                    print(f"      {line}")
+    print("-" * 78)
+    print("✅ Every query uses an index" if not failures else f"❌ {failures} queries scan a table")
+    print("=" * 78 + "\n")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
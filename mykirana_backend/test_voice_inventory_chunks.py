@@ -0,0 +1,93 @@
+"""
+Benchmark: one-shot vs chunked parallel voice-inventory parsing
+Stubs the Gemini call with a model whose latency grows with the number of items it has
+to write and whose chance of returning broken JSON grows with reply length, then parses
+a 200-item onboarding dictation both ways. No network or API key needed.
+
+Usage: python test_voice_inventory_chunks.py [items]
+"""
+import asyncio
+import contextlib
+import io
+import json
+import random
+import re
+import sys
+import time
+
+from app.services import gemini_client as gemini_module
+from app.services import voice_inventory_service as service
+from app.services.inventory_snapshot import InventorySnapshot
+from app.services.model_router import model_router
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+RUNS = 5
+
+CATEGORIES = ["anaaj", "dal", "masale", "tel", "snacks", "cosmetics", "bakery", "dairy"]
+NAMES = ["gehun", "bajra", "chawal", "jowar", "toor dal", "moong", "haldi", "mirchi", "sarson tel", "samosa",
+         "kachori", "sabun", "pav", "doodh", "paneer", "besan", "maida", "sooji", "poha", "chana"]
+UNITS = ["kilo", "kg", "litre", "plate", "piece", "packet"]
+
+PER_ITEM_SECONDS = 0.06       # Output tokens dominate: every item is ~40 tokens of JSON
+BASE_SECONDS = 0.4
+BROKEN_JSON_PER_ITEM = 0.004  # 200 items in one reply -> ~55% chance of broken JSON
+
+
+def make_dictation(items: int) -> str:
+    random.seed(items)
+    parts = []
+    for i in range(items):
+        if i % 25 == 0:
+            parts.append(f"category {CATEGORIES[(i // 25) % len(CATEGORIES)]}")
+        parts.append(f"{random.choice(NAMES)} {i} {random.randint(10, 400)} rs {random.choice(UNITS)}")
+    return " ".join(parts)
+
+
+async def fake_generate(model_name: str, prompt: str) -> str:
+    text = prompt.split('Parse this voice input into structured inventory items:\n"')[1].split('"\n')[0]
+    found = re.findall(r"([a-z ]+ \d+) (\d+) rs (\w+)", text)
+    await asyncio.sleep(BASE_SECONDS + PER_ITEM_SECONDS * len(found))
+    if random.random() < BROKEN_JSON_PER_ITEM * len(found):
+        return '{"categories": [{"name": "Anaaj", "items": [{"name": "Gehun", "price": 25'
+    items = [{"name": name.strip().title(), "price": int(price), "unit": unit, "aliases": []}
+             for name, price, unit in found]
+    return json.dumps({"categories": [{"name": "Anaaj", "items": items}]})
+
+
+async def run(label: str, chunked: bool, dictation: str, snapshot: InventorySnapshot):
+    split = service.split_dictation
+    if not chunked:
+        service.split_dictation = lambda text: [text]
+    random.seed(1)
+    times, parsed, failures = [], [], 0
+    for _ in range(RUNS):
+        model_router.reset()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):   # The service logs every item
+            result = await service.parse_voice_inventory(dictation, snapshot)
+        times.append(time.perf_counter() - start)
+        if result.get("error"):
+            failures += 1
+        else:
+            parsed.append(sum(len(c["items"]) for c in result["categories"]))
+    service.split_dictation = split
+    items = f"{sum(parsed) / len(parsed):.0f}" if parsed else "-"
+    print(f"{label:<30}{sum(times) / len(times):>10.2f}{max(times):>10.2f}{items:>12}{failures:>10}/{RUNS}")
+
+
+async def main():
+    gemini_module.gemini_client.generate_content = fake_generate
+    dictation = make_dictation(ITEMS)
+    snapshot = InventorySnapshot.from_dicts([])
+
+    print("\n" + "=" * 72)
+    print(f"📦 VOICE INVENTORY PARSING - {ITEMS} items, {RUNS} runs each")
+    print("=" * 72)
+    print(f"{'mode':<30}{'avg (s)':>10}{'max (s)':>10}{'items/run':>12}{'failed':>12}")
+    await run("one call (old behaviour)", False, dictation, snapshot)
+    await run(f"chunks of {service.CHUNK_ITEMS}, {service.CHUNK_CONCURRENCY} parallel", True, dictation, snapshot)
+    print("=" * 72 + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
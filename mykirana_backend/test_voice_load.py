@@ -0,0 +1,106 @@
+"""
+Load test for /voice/process concurrency on a single worker
+Stubs the Gemini call with a fixed-latency fake and measures how many concurrent
+voice requests one worker completes, and how long a health check waits meanwhile.
+
+Modes:
+  blocking   - model call blocks the event loop (old sync SDK inside an async route)
+  threadpool - model call holds a threadpool slot (old sync /voice/process route)
+  async      - model call is awaited (current async client)
+
+Usage: python test_voice_load.py [model_latency_seconds]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Isolated SQLite database so the test never touches real data
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'load_test.db')}"
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from app.main import app
+from app.db.database import create_db_and_tables
+from app.core.security import create_access_token
+from app.services import gemini_client as gemini_module
+
+MODEL_LATENCY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+CONCURRENCY_LEVELS = [1, 10, 40, 80, 160]
+FAKE_RESPONSE = '{"type": "BILL", "customer_name": "Raju", "items": [], "msg": "ok", "should_stop": false}'
+
+
+def install_fake_model(mode: str):
+    """Replace the shared Gemini client's call with a fixed-latency fake"""
+    async def blocking(model_name, prompt):
+        time.sleep(MODEL_LATENCY)
+        return FAKE_RESPONSE
+
+    async def threadpool(model_name, prompt):
+        await run_in_threadpool(time.sleep, MODEL_LATENCY)
+        return FAKE_RESPONSE
+
+    async def non_blocking(model_name, prompt):
+        await asyncio.sleep(MODEL_LATENCY)
+        return FAKE_RESPONSE
+
+    fakes = {"blocking": blocking, "threadpool": threadpool, "async": non_blocking}
+    gemini_module.gemini_client.generate_content = fakes[mode]
+
+
+async def run_level(client: httpx.AsyncClient, headers: dict, concurrency: int):
+    """Fire `concurrency` voice requests at once and probe the health endpoint meanwhile"""
+    latencies = []
+
+    async def voice_call():
+        start = time.perf_counter()
+        # Customer name forces the model path (the local parser declines it)
+        response = await client.post("/voice/process", json={"text": "customer raju do kilo chawal"}, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        return response.status_code
+
+    async def health_probe():
+        await asyncio.sleep(MODEL_LATENCY / 4)
+        start = time.perf_counter()
+        await client.get("/")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(health_probe(), *[voice_call() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+
+    health_latency = results[0]
+    ok = sum(1 for status in results[1:] if status == 200)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return ok, wall, p95, health_latency
+
+
+async def main():
+    create_db_and_tables()
+    token = create_access_token({"sub": "1"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=600) as client:
+        await client.post("/items/", json={"id": "101", "names": ["Chawal", "Rice"], "price": 50, "unit": "kg"}, headers=headers)
+
+        print("\n" + "=" * 78)
+        print(f"🚀 VOICE LOAD TEST - one worker, fake model latency {MODEL_LATENCY:.2f}s")
+        print("=" * 78)
+        print(f"{'mode':<11}{'concurrent':>11}{'ok':>6}{'wall (s)':>11}{'req/s':>9}{'p95 (s)':>10}{'health (s)':>13}")
+
+        for mode in ["blocking", "threadpool", "async"]:
+            install_fake_model(mode)
+            for concurrency in CONCURRENCY_LEVELS:
+                if mode == "blocking" and concurrency > 10:
+                    continue  # Serial by construction; larger levels only take longer
+                ok, wall, p95, health = await run_level(client, headers, concurrency)
+                print(f"{mode:<11}{concurrency:>11}{ok:>6}{wall:>11.2f}{ok / wall:>9.1f}{p95:>10.2f}{health:>13.3f}")
+            print("-" * 78)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
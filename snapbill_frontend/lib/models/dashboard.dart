@@ -175,3 +175,10 @@ class BillHistory {
     );
   }
 }
+
+class BillPage {
+  final List<BillHistory> bills;
+  final String? nextCursor; // null on the last page
+
+  BillPage({required this.bills, this.nextCursor});
+}
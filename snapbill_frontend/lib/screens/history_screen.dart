@@ -26,7 +26,9 @@ class _HistoryScreenState extends State<HistoryScreen> {
   final AnalyticsService _analyticsService = AnalyticsService();
   DashboardData? _dashboardData;
   List<BillHistory> _bills = [];
+  String? _nextCursor;
   bool _isLoading = true;
+  bool _isLoadingMore = false;
   String? _token;
 
   @override
@@ -44,15 +46,18 @@ class _HistoryScreenState extends State<HistoryScreen> {
     print('🔑 Auth token: ${_token != null ? "Found" : "Not found"}');
 
     if (_token != null) {
+      // Bills saved offline first, so the dashboard and list include them
+      await _analyticsService.syncPendingBills(_token!);
       final dashboard = await _analyticsService.getDashboard(_token!);
-      final bills = await _analyticsService.getBills(_token!);
+      final page = await _analyticsService.getBills(_token!);
       
       print('📊 Dashboard loaded: ${dashboard != null}');
-      print('📋 Bills loaded: ${bills.length} bills');
+      print('📋 Bills loaded: ${page.bills.length} bills');
       
       setState(() {
         _dashboardData = dashboard;
-        _bills = bills;
+        _bills = page.bills;
+        _nextCursor = page.nextCursor;
         _isLoading = false;
       });
     } else {
@@ -61,6 +66,20 @@ class _HistoryScreenState extends State<HistoryScreen> {
     }
   }
 
+  Future<void> _loadMoreBills() async {
+    if (_token == null || _nextCursor == null || _isLoadingMore) return;
+    setState(() => _isLoadingMore = true);
+
+    final page = await _analyticsService.getBills(_token!, cursor: _nextCursor);
+
+    if (!mounted) return;
+    setState(() {
+      _bills.addAll(page.bills);
+      _nextCursor = page.nextCursor;
+      _isLoadingMore = false;
+    });
+  }
+
   String _formatNumber(double value) {
     if (value == value.toInt()) {
       return value.toInt().toString();
@@ -303,6 +322,18 @@ class _HistoryScreenState extends State<HistoryScreen> {
                           );
                         },
                       ),
+                    if (_nextCursor != null)
+                      Center(
+                        child: _isLoadingMore
+                            ? const Padding(
+                                padding: EdgeInsets.all(12),
+                                child: CircularProgressIndicator(),
+                              )
+                            : TextButton(
+                                onPressed: _loadMoreBills,
+                                child: const Text('Load more bills'),
+                              ),
+                      ),
                   ],
                 ),
               ),
@@ -310,7 +341,14 @@ class _HistoryScreenState extends State<HistoryScreen> {
     );
   }
 
-  void _showBillDetails(BillHistory bill) {
+  Future<void> _showBillDetails(BillHistory bill) async {
+    // The list is loaded without items: fetch the full bill when it is opened
+    if (bill.items.isEmpty && bill.totalItems > 0 && _token != null) {
+      final fullBill = await _analyticsService.getBill(_token!, bill.id);
+      if (fullBill != null) bill = fullBill;
+    }
+    if (!mounted) return;
+
     // Get shop details from widget
     final shopName = widget.shopDetails.shopName;
     final shopAddress = widget.shopDetails.address;
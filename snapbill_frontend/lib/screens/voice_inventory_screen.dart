@@ -236,6 +236,16 @@ class _VoiceInventoryScreenState extends State<VoiceInventoryScreen>
     });
   }
 
+  // Wrong match to existing stock: save this line as a new item instead of overwriting it
+  void _unlinkExisting(ParsedItem item) {
+    setState(() {
+      item.isExisting = false;
+      item.existingId = null;
+      item.oldPrice = null;
+      item.oldUnit = null;
+    });
+  }
+
   void _addManualItem() {
     setState(() {
       if (_parsedCategories.isEmpty) {
@@ -272,6 +282,10 @@ class _VoiceInventoryScreenState extends State<VoiceInventoryScreen>
     int savedCount = 0;
     int updatedCount = 0;
     
+    // Parsed items go back to the staged batch in one request; manual items are posted one by one
+    final batchId = _service.lastBatchId;
+    final List<Map<String, dynamic>> acceptedLines = [];
+    
     for (var category in _parsedCategories) {
       for (var item in category.items) {
         // Skip OLD reference items (they're just for comparison)
@@ -280,6 +294,21 @@ class _VoiceInventoryScreenState extends State<VoiceInventoryScreen>
         // Validate item
         if (item.name.isEmpty || item.price <= 0) continue;
         
+        if (batchId != null && item.line != null) {
+          acceptedLines.add({
+            'line': item.line,
+            'name': item.name,
+            'price': item.price,
+            'unit': item.unit,
+            'category': category.name,
+            'aliases': item.aliases,
+            // The owner may have unlinked a wrong match: then it is saved as a new item
+            'as_new': item.existingId == null,
+            if (item.existingId != null) 'existing_id': item.existingId,
+          });
+          continue;
+        }
+        
         // Use existingId from backend if available (this means it's an update)
         final isUpdate = item.existingId != null && item.existingId!.isNotEmpty;
         
@@ -305,6 +334,18 @@ class _VoiceInventoryScreenState extends State<VoiceInventoryScreen>
       }
     }
     
+    if (acceptedLines.isNotEmpty) {
+      print('💾 Committing ${acceptedLines.length} item(s) from batch $batchId');
+      try {
+        final result = await _service.commitBatch(batchId!, acceptedLines);
+        savedCount += (result['created'] ?? 0) as int;
+        updatedCount += (result['updated'] ?? 0) as int;
+      } catch (e) {
+        _showNotification('Error saving items, please try again');
+        return;
+      }
+    }
+    
     // Force refresh from backend to ensure UI is in sync
     await provider.fetchItems();
     
@@ -599,6 +640,10 @@ class _VoiceInventoryScreenState extends State<VoiceInventoryScreen>
                     style: TextStyle(fontSize: 10, color: Colors.white),
                   ),
                 ),
+                TextButton(
+                  onPressed: () => _unlinkExisting(item),
+                  child: const Text('Save as new', style: TextStyle(fontSize: 12)),
+                ),
               ],
             ),
           ),
@@ -735,6 +780,7 @@ class ParsedItem {
   String? oldUnit;
   String? existingId;
   List<String> aliases;
+  int? line; // Line in the server-side staged batch (null for manually added items)
 
   ParsedItem({
     required this.name,
@@ -745,5 +791,6 @@ class ParsedItem {
     this.oldUnit,
     this.existingId,
     required this.aliases,
+    this.line,
   });
 }
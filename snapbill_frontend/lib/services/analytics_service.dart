@@ -1,11 +1,17 @@
 import 'dart:convert';
 import 'package:http/http.dart' as http;
+import 'package:shared_preferences/shared_preferences.dart';
+import 'package:uuid/uuid.dart';
 import '../core/config.dart';
 import '../models/dashboard.dart';
 
 class AnalyticsService {
   final String baseUrl = ApiConfig.baseUrl;
 
+  // Bills that could not be uploaded, kept until /analytics/bills/batch acknowledges them
+  static const String _pendingBillsKey = 'pending_bills';
+  static const int _syncBatchSize = 500;
+
   Future<DashboardData?> getDashboard(String token, {int days = 30}) async {
     try {
       print('📊 Fetching dashboard from: $baseUrl/analytics/dashboard?days=$days');
@@ -33,11 +39,21 @@ class AnalyticsService {
     }
   }
 
-  Future<List<BillHistory>> getBills(String token, {int limit = 50, int offset = 0}) async {
+  // Bill list fields: everything except items, which getBill loads when a bill is opened
+  static const String billListFields =
+      'id,total_amount,total_items,customer_phone,customer_name,payment_method,bill_date';
+
+  Future<BillPage> getBills(String token,
+      {int limit = 50, String? cursor, String fields = billListFields}) async {
     try {
-      print('📋 Fetching bills from: $baseUrl/analytics/bills?limit=$limit&offset=$offset');
+      final uri = Uri.parse('$baseUrl/analytics/bills').replace(queryParameters: {
+        'limit': '$limit',
+        'fields': fields,
+        if (cursor != null) 'cursor': cursor,
+      });
+      print('📋 Fetching bills from: $uri');
       final response = await http.get(
-        Uri.parse('$baseUrl/analytics/bills?limit=$limit&offset=$offset'),
+        uri,
         headers: {
           'Authorization': 'Bearer $token',
           'Content-Type': 'application/json',
@@ -45,23 +61,51 @@ class AnalyticsService {
       );
 
       print('📋 Bills response status: ${response.statusCode}');
-      print('📋 Bills response body: ${response.body}');
 
       if (response.statusCode == 200) {
         final data = json.decode(response.body);
         if (data['success'] == true) {
-          return (data['bills'] as List)
-              .map((bill) => BillHistory.fromJson(bill))
-              .toList();
+          return BillPage(
+            bills: (data['bills'] as List)
+                .map((bill) => BillHistory.fromJson(bill))
+                .toList(),
+            nextCursor: data['next_cursor'],
+          );
         }
       }
-      return [];
+      return BillPage(bills: []);
     } catch (e) {
       print('❌ Error fetching bills: $e');
-      return [];
+      return BillPage(bills: []);
+    }
+  }
+
+  Future<BillHistory?> getBill(String token, int billId) async {
+    try {
+      final response = await http.get(
+        Uri.parse('$baseUrl/analytics/bills/$billId'),
+        headers: {
+          'Authorization': 'Bearer $token',
+          'Content-Type': 'application/json',
+        },
+      );
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        if (data['success'] == true) {
+          return BillHistory.fromJson(data['bill']);
+        }
+      }
+      return null;
+    } catch (e) {
+      print('❌ Error fetching bill $billId: $e');
+      return null;
     }
   }
 
+  /// Saves a bill; when offline it is queued and uploaded by [syncPendingBills].
+  /// Every bill carries a client_id so an upload retried after a lost response
+  /// is not saved twice. Returns true only when the server saved it now.
   Future<bool> saveBill(
     String token, {
     required double totalAmount,
@@ -70,6 +114,16 @@ class AnalyticsService {
     String? customerName,
     String paymentMethod = 'cash',
   }) async {
+    final bill = {
+      'client_id': const Uuid().v4(),
+      'total_amount': totalAmount,
+      'items': items,
+      'customer_phone': customerPhone,
+      'customer_name': customerName,
+      'payment_method': paymentMethod,
+      'bill_date': DateTime.now().toUtc().toIso8601String(),
+    };
+
     try {
       print('💾 Saving bill to database...');
       print('💾 Total: $totalAmount, Items: ${items.length}');
@@ -81,13 +135,7 @@ class AnalyticsService {
           'Authorization': 'Bearer $token',
           'Content-Type': 'application/json',
         },
-        body: json.encode({
-          'total_amount': totalAmount,
-          'items': items,
-          'customer_phone': customerPhone,
-          'customer_name': customerName,
-          'payment_method': paymentMethod,
-        }),
+        body: json.encode(bill),
       );
 
       print('💾 Save bill response status: ${response.statusCode}');
@@ -97,12 +145,90 @@ class AnalyticsService {
         final data = json.decode(response.body);
         final success = data['success'] == true;
         print('💾 Bill saved: $success');
+        if (success) {
+          // Online again: upload anything queued earlier
+          syncPendingBills(token);
+        }
         return success;
       }
+      if (response.statusCode >= 500) {
+        await _queueBill(bill);
+      }
       return false;
     } catch (e) {
       print('❌ Error saving bill: $e');
+      await _queueBill(bill);
       return false;
     }
   }
+
+  Future<List<Map<String, dynamic>>> _pendingBills(SharedPreferences prefs) async {
+    final stored = prefs.getString(_pendingBillsKey);
+    if (stored == null) return [];
+    return (json.decode(stored) as List).cast<Map<String, dynamic>>();
+  }
+
+  Future<void> _queueBill(Map<String, dynamic> bill) async {
+    final prefs = await SharedPreferences.getInstance();
+    final pending = await _pendingBills(prefs);
+    pending.add(bill);
+    await prefs.setString(_pendingBillsKey, json.encode(pending));
+    print('📥 Bill queued for sync (${pending.length} pending)');
+  }
+
+  Future<int> pendingBillCount() async {
+    final prefs = await SharedPreferences.getInstance();
+    return (await _pendingBills(prefs)).length;
+  }
+
+  static bool _syncing = false;
+
+  /// Uploads queued bills in batches and drops the ones the server acknowledged.
+  /// Safe to call any time: bills already saved come back as duplicates.
+  Future<int> syncPendingBills(String token) async {
+    if (_syncing) return 0;
+    _syncing = true;
+    var synced = 0;
+    try {
+      final prefs = await SharedPreferences.getInstance();
+      final pending = await _pendingBills(prefs);
+      if (pending.isEmpty) return 0;
+      print('📤 Syncing ${pending.length} queued bills...');
+
+      for (var start = 0; start < pending.length; start += _syncBatchSize) {
+        final batch = pending.skip(start).take(_syncBatchSize).toList();
+        final response = await http.post(
+          Uri.parse('$baseUrl/analytics/bills/batch'),
+          headers: {
+            'Authorization': 'Bearer $token',
+            'Content-Type': 'application/json',
+          },
+          body: json.encode({'bills': batch}),
+        );
+        print('📤 Batch response status: ${response.statusCode}');
+        if (response.statusCode != 200) break;
+
+        final data = json.decode(response.body);
+        // Saved, already saved, or "invalid" (can never be saved): all leave the queue
+        final results = (data['bills'] as List).where((bill) => bill['client_id'] != null);
+        final acknowledged = results.map((bill) => bill['client_id'] as String).toSet();
+        for (final bill in results.where((bill) => bill['status'] == 'invalid')) {
+          print('⚠️ Dropping invalid queued bill ${bill['client_id']}: ${bill['error']}');
+        }
+        synced += acknowledged.length;
+
+        // Re-read: bills queued while this batch was uploading must be kept
+        final remaining = (await _pendingBills(prefs))
+            .where((bill) => !acknowledged.contains(bill['client_id']))
+            .toList();
+        await prefs.setString(_pendingBillsKey, json.encode(remaining));
+      }
+      print('📤 Synced $synced bills');
+    } catch (e) {
+      print('❌ Error syncing bills: $e');
+    } finally {
+      _syncing = false;
+    }
+    return synced;
+  }
 }
@@ -50,6 +50,26 @@ class ApiClient {
     }
   }
 
+  // GET that returns the raw response (status + headers), for ETag / 304 handling
+  Future<http.Response> getRaw(String endpoint, {Map<String, String> headers = const {}}) async {
+    final url = Uri.parse('$baseUrl$endpoint');
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('user_token');
+
+    try {
+      return await http.get(
+        url,
+        headers: {
+          "Content-Type": "application/json",
+          if (token != null) "Authorization": "Bearer $token",
+          ...headers,
+        },
+      );
+    } catch (e) {
+      throw Exception("Connection Error: $e");
+    }
+  }
+
   // PUT method for profile and item updates
   Future<dynamic> put(String endpoint, Map<String, dynamic> data) async {
     final url = Uri.parse('$baseUrl$endpoint');
@@ -1,3 +1,6 @@
+import 'dart:convert';
+import 'package:http/http.dart' as http;
+import 'package:shared_preferences/shared_preferences.dart';
 import '../core/config.dart';
 import 'api_client.dart';
 import '../models/item.dart';
@@ -6,10 +9,64 @@ class InventoryService {
   final ApiClient _api = ApiClient();
 
   // 1. Get All Items - ADD TRAILING SLASH
+  // Keeps the last catalog on the device and only downloads what changed since:
+  // /items/changes when we have a cursor, otherwise GET /items/ with If-None-Match (304 = unchanged)
   Future<List<Item>> getItems() async {
-    final response = await _api.get('/items/'); // ← Added /
+    final prefs = await SharedPreferences.getInstance();
+    final token = prefs.getString('user_token');
+    final cached = prefs.getString('inventory_cache');
+    final sameUser = prefs.getString('inventory_cache_token') == token;
+
+    if (cached != null && sameUser) {
+      final items = {
+        for (var e in jsonDecode(cached) as List) e['id'].toString(): Map<String, dynamic>.from(e)
+      };
+      final cursor = prefs.getString('inventory_cursor');
+
+      if (cursor != null) {
+        final changes = await _api.get('/items/changes?since=$cursor');
+        if (changes['reset'] != true) {
+          for (var id in changes['deleted'] as List) {
+            items.remove(id.toString());
+          }
+          for (var e in changes['items'] as List) {
+            items[e['id'].toString()] = Map<String, dynamic>.from(e);
+          }
+          await _saveCache(prefs, token, items.values.toList(), cursor: changes['cursor']);
+          return items.values.map((e) => Item.fromJson(e)).toList();
+        }
+      }
+
+      final etag = prefs.getString('inventory_etag');
+      final response = await _api.getRaw('/items/', headers: {if (etag != null) 'If-None-Match': etag});
+      if (response.statusCode == 304) {
+        await _saveCache(prefs, token, items.values.toList(), cursor: response.headers['x-inventory-cursor']);
+        return items.values.map((e) => Item.fromJson(e)).toList();
+      }
+      return _fromFullResponse(prefs, token, response);
+    }
+
+    final response = await _api.getRaw('/items/'); // ← Added /
+    return _fromFullResponse(prefs, token, response);
+  }
+
+  Future<List<Item>> _fromFullResponse(SharedPreferences prefs, String? token, http.Response response) async {
+    if (response.statusCode < 200 || response.statusCode >= 300) {
+      throw Exception("Server Error ${response.statusCode}: ${response.body}");
+    }
     // Assuming backend returns a list: [ {item1}, {item2} ]
-    return (response as List).map((e) => Item.fromJson(e)).toList();
+    final list = (jsonDecode(response.body) as List).map((e) => Map<String, dynamic>.from(e)).toList();
+    await _saveCache(prefs, token, list,
+        cursor: response.headers['x-inventory-cursor'], etag: response.headers['etag']);
+    return list.map((e) => Item.fromJson(e)).toList();
+  }
+
+  Future<void> _saveCache(SharedPreferences prefs, String? token, List<Map<String, dynamic>> items,
+      {String? cursor, String? etag}) async {
+    await prefs.setString('inventory_cache', jsonEncode(items));
+    if (token != null) await prefs.setString('inventory_cache_token', token);
+    if (cursor != null) await prefs.setString('inventory_cursor', cursor);
+    if (etag != null) await prefs.setString('inventory_etag', etag);
   }
 
   // 2. Add Item - ADD TRAILING SLASH
@@ -4,6 +4,9 @@ import '../screens/voice_inventory_screen.dart';
 class VoiceInventoryService {
   final ApiClient _api = ApiClient();
 
+  // Server-side staged batch of the last parse (null if nothing was staged)
+  int? lastBatchId;
+
   Future<List<ParsedCategory>> parseVoiceInventory(String rawText) async {
     try {
       final response = await _api.post('/inventory/voice-parse', {
@@ -12,6 +15,7 @@ class VoiceInventoryService {
 
       // Parse response
       final categories = response['categories'] as List;
+      lastBatchId = response['batch_id'];
       
       return categories.map((catData) {
         final items = (catData['items'] as List).map((itemData) {
@@ -24,6 +28,7 @@ class VoiceInventoryService {
             oldUnit: itemData['old_unit'],
             existingId: itemData['existing_id'],
             aliases: List<String>.from(itemData['aliases'] ?? []),
+            line: itemData['line'],
           );
         }).toList();
 
@@ -37,4 +42,17 @@ class VoiceInventoryService {
       rethrow;
     }
   }
+
+  // Save the accepted lines of a staged batch in one request (one transaction on the server)
+  Future<Map<String, dynamic>> commitBatch(int batchId, List<Map<String, dynamic>> items) async {
+    try {
+      final response = await _api.post('/inventory/voice-parse/$batchId/commit', {
+        'items': items,
+      });
+      return Map<String, dynamic>.from(response);
+    } catch (e) {
+      print('❌ Voice inventory commit error: $e');
+      rethrow;
+    }
+  }
 }